@@ -0,0 +1,288 @@
+"""
+평가 집계와 평가자 간 일치도 (Streamlit 비의존).
+
+저장소마다 EvaluationAggregates 하나를 두고, 평가를 쓸 때(add_evaluation) 그 레코드의 이전 기여분을
+빼고 새 기여분을 더해 갱신합니다. 요약 화면은 코퍼스를 다시 훑지 않고 이 집계만 읽습니다.
+저장소 version()이 바뀌면 store.changes_since() 로 마지막으로 맞춘 위치 이후 추가/수정/삭제된 레코드만 다시 읽으므로
+다른 프로세스(CLI, 다른 앱 인스턴스, 작업 워커)가 남긴 평가도 반영됩니다.
+
+한 대화에 평가자별 평가(evaluations: {평가자: 평가})가 여럿이면 평가 하나하나를 집계하고,
+두 명 이상이 평가한 대화로 평가자 간 일치도(KTAS: Fleiss kappa, 점수: Krippendorff alpha)를 계산합니다.
+"""
+import os
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from scheduler import cell_of
+from scoring import KTAS_CHOICES
+from storage import evaluations_of
+
+SCORE_DIMENSIONS = ("question", "realism")
+SCORE_BINS = 11  # 0~10점
+CHUNK_SIZE = 1000
+
+
+def _score(value):
+    try:
+        score = int(value)
+    except (TypeError, ValueError):
+        return None
+    return score if 0 <= score < SCORE_BINS else None
+
+
+class GroupStats:
+    """평가 수, KTAS 응답 분포, 점수 합계/히스토그램."""
+
+    __slots__ = ("n", "ktas", "sums", "counts", "hist")
+
+    def __init__(self):
+        self.n = 0
+        self.ktas = Counter()
+        self.sums = dict.fromkeys(SCORE_DIMENSIONS, 0)
+        self.counts = dict.fromkeys(SCORE_DIMENSIONS, 0)
+        self.hist = {dim: [0] * SCORE_BINS for dim in SCORE_DIMENSIONS}
+
+    def add(self, evaluation, sign=1):
+        self.n += sign
+        self.ktas[evaluation.get("ktas", "")] += sign
+        for dim in SCORE_DIMENSIONS:
+            score = _score(evaluation.get(dim))
+            if score is not None:
+                self.sums[dim] += sign * score
+                self.counts[dim] += sign
+                self.hist[dim][score] += sign
+
+    def as_dict(self):
+        row = {"n": self.n}
+        for choice in KTAS_CHOICES:
+            row[choice] = self.ktas.get(choice, 0)
+        for dim in SCORE_DIMENSIONS:
+            row[f"{dim}_mean"] = round(self.sums[dim] / self.counts[dim], 3) if self.counts[dim] else None
+        return row
+
+
+class _Contribution:
+    """레코드 한 건이 집계에 더한 값 (다시 빼기 위해 보관)."""
+
+    __slots__ = ("groups", "evaluations", "latest_ktas")
+
+    def __init__(self, rec):
+        persona = rec.get("persona") or {}
+        cell = cell_of(persona)
+        self.groups = [("ktas_level", cell[4]), ("main_category", cell[2]), ("cell", cell)]
+        self.evaluations = dict(evaluations_of(rec))
+        # 대화당 하나(가장 최근 평가)로 세는 기존 KTAS 적절성 요약용
+        self.latest_ktas = (rec.get("evaluation") or {}).get("ktas", "")
+
+
+class EvaluationAggregates:
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.version = None
+        self.stamp = None  # 마지막으로 맞춘 store.change_stamp() (None 이면 전체를 다시 셈)
+        self.by_id = {}
+        self.groups = defaultdict(GroupStats)  # ("all",) / (kind, key)
+        self.latest = Counter()  # 대화별 최근 평가의 KTAS 응답 ("" = 미평가)
+        self.multi = {}  # 두 명 이상이 평가한 대화: id → {평가자: 평가}
+        self._agreement = None  # (version, 결과)
+
+    # ---------- 갱신 ----------
+    def _apply(self, rid, contrib, sign):
+        for evaluator, evaluation in contrib.evaluations.items():
+            self.groups[("all",)].add(evaluation, sign)
+            self.groups[("evaluator", evaluator)].add(evaluation, sign)
+            for key in contrib.groups:
+                self.groups[key].add(evaluation, sign)
+        self.latest[contrib.latest_ktas] += sign
+        if sign > 0 and len(contrib.evaluations) > 1:
+            self.multi[rid] = contrib.evaluations
+        elif sign < 0:
+            self.multi.pop(rid, None)
+
+    def _add(self, rec):
+        contrib = _Contribution(rec)
+        self.by_id[rec["id"]] = contrib
+        self._apply(rec["id"], contrib, 1)
+
+    def _remove(self, rid):
+        self._apply(rid, self.by_id.pop(rid), -1)
+
+    def _reset(self):
+        self.by_id.clear()
+        self.groups.clear()
+        self.latest.clear()
+        self.multi.clear()
+
+    def _refresh_locked(self):
+        version = self.store.version()
+        if version == self.version:
+            return
+        changes = None
+        if self.stamp is not None:
+            changes, stamp = self.store.changes_since(self.stamp)
+        if changes is None:
+            # 처음이거나 이어갈 수 없음(replace_all 등): 전체를 다시 셈
+            stamp = self.store.change_stamp()
+            self._reset()
+            ids = self.store.ids()
+            for start in range(0, len(ids), CHUNK_SIZE):
+                for rec in self.store.get_many(ids[start:start + CHUNK_SIZE]):
+                    self._add(rec)
+        else:
+            last = {change["id"]: change["change"] for change in changes}
+            for rid in last:
+                if rid in self.by_id:
+                    self._remove(rid)
+            changed = [rid for rid, change in last.items() if change != "delete"]
+            for start in range(0, len(changed), CHUNK_SIZE):
+                for rec in self.store.get_many(changed[start:start + CHUNK_SIZE]):
+                    self._add(rec)
+        self.version = version
+        self.stamp = stamp
+
+    def refresh(self):
+        with self.lock:
+            self._refresh_locked()
+        return self
+
+    def rebuild(self):
+        """전체를 다시 셉니다 (증분 집계 검증용)."""
+        with self.lock:
+            self.version = self.stamp = None
+            self._refresh_locked()
+        return self
+
+    def add_evaluation(self, record_id, evaluation):
+        """
+        store.add_evaluation 후 바뀐 레코드의 기여분만 다시 셉니다. 변경 위치는 쓰기 전에 잡혀 있으므로
+        그 사이 다른 프로세스가 쓴 변경도 이 쓰기와 함께 반영됩니다.
+        """
+        with self.lock:
+            self._refresh_locked()
+            self.store.add_evaluation(record_id, evaluation)
+            self._refresh_locked()
+
+    # ---------- 읽기 ----------
+    def overall(self):
+        return self.groups[("all",)].as_dict() if ("all",) in self.groups else GroupStats().as_dict()
+
+    def ktas_summary(self):
+        """scoring.ktas_summary 와 같은 형식 (대화당 최근 평가 기준)."""
+        summary = {choice: self.latest.get(choice, 0) for choice in KTAS_CHOICES}
+        summary["미평가"] = self.latest.get("", 0)
+        return summary
+
+    def histogram(self, dim, kind="all", key=None):
+        stats = self.groups.get(("all",) if kind == "all" else (kind, key))
+        return list(stats.hist[dim]) if stats else [0] * SCORE_BINS
+
+    def breakdown(self, kind):
+        """kind(evaluator/ktas_level/main_category/cell)별 집계 행 목록."""
+        rows = []
+        for group_key, stats in self.groups.items():
+            if group_key[0] == kind and stats.n > 0:
+                rows.append({kind: group_key[1], **stats.as_dict()})
+        rows.sort(key=lambda r: str(r[kind]))
+        return rows
+
+    def agreement(self):
+        with self.lock:
+            if self._agreement is None or self._agreement[0] != self.version:
+                self._agreement = (self.version, inter_rater_agreement(list(self.multi.values())))
+            return self._agreement[1]
+
+
+def fleiss_kappa(counts):
+    """counts: (대화 수, 범주 수) 평가 수 행렬. 대화마다 평가자 수가 달라도 됩니다."""
+    counts = np.asarray(counts, dtype=float)
+    n_i = counts.sum(axis=1)
+    counts, n_i = counts[n_i > 1], n_i[n_i > 1]
+    if not len(counts):
+        return None, None
+    p_i = ((counts ** 2).sum(axis=1) - n_i) / (n_i * (n_i - 1))
+    p_bar = p_i.mean()
+    p_j = counts.sum(axis=0) / n_i.sum()
+    p_e = (p_j ** 2).sum()
+    kappa = (p_bar - p_e) / (1 - p_e) if p_e < 1 else None
+    return kappa, p_bar
+
+
+def krippendorff_alpha_interval(values):
+    """values: (대화 수, 최대 평가자 수), 빈 칸은 NaN. 구간 척도 Krippendorff alpha."""
+    values = np.asarray(values, dtype=float)
+    mask = ~np.isnan(values)
+    m_u = mask.sum(axis=1)
+    values, mask, m_u = values[m_u > 1], mask[m_u > 1], m_u[m_u > 1]
+    n = m_u.sum()
+    if n < 2:
+        return None
+    x = np.where(mask, values, 0.0)
+    # Σ_{i≠j} (x_i - x_j)^2 = 2 (m Σx² - (Σx)²)
+    within = 2 * (m_u * (x ** 2).sum(axis=1) - x.sum(axis=1) ** 2)
+    d_o = (within / (m_u - 1)).sum() / n
+    total = 2 * (n * (x ** 2).sum() - x.sum() ** 2)
+    d_e = total / (n * (n - 1))
+    return 1 - d_o / d_e if d_e > 0 else None
+
+
+def inter_rater_agreement(items):
+    """
+    items: [{평가자: 평가}, ...] (두 명 이상이 평가한 대화만).
+    KTAS 응답은 Fleiss kappa 와 쌍별 일치율, 점수는 Krippendorff alpha 와 평가자 쌍의 평균 절대 차이.
+    """
+    result = {"dialogues": len(items), "ratings": sum(len(e) for e in items)}
+    if not items:
+        return result
+    width = max(len(e) for e in items)
+    ktas_index = {choice: j for j, choice in enumerate(KTAS_CHOICES)}
+    counts = np.zeros((len(items), len(KTAS_CHOICES)))
+    scores = {dim: np.full((len(items), width), np.nan) for dim in SCORE_DIMENSIONS}
+    for i, evaluations in enumerate(items):
+        for j, evaluation in enumerate(evaluations.values()):
+            k = ktas_index.get(evaluation.get("ktas"))
+            if k is not None:
+                counts[i, k] += 1
+            for dim in SCORE_DIMENSIONS:
+                score = _score(evaluation.get(dim))
+                if score is not None:
+                    scores[dim][i, j] = score
+
+    kappa, observed = fleiss_kappa(counts)
+    result["ktas_fleiss_kappa"] = None if kappa is None else round(float(kappa), 4)
+    result["ktas_pairwise_agreement"] = None if observed is None else round(float(observed), 4)
+    for dim in SCORE_DIMENSIONS:
+        values = scores[dim]
+        alpha = krippendorff_alpha_interval(values)
+        diffs = np.abs(values[:, :, None] - values[:, None, :])
+        upper = np.triu(np.ones((width, width), dtype=bool), k=1)
+        pair_diffs = diffs[:, upper]
+        pair_diffs = pair_diffs[~np.isnan(pair_diffs)]
+        result[f"{dim}_alpha"] = None if alpha is None else round(float(alpha), 4)
+        result[f"{dim}_mean_abs_diff"] = round(float(pair_diffs.mean()), 3) if pair_diffs.size else None
+    return result
+
+
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+def evaluation_aggregates(store):
+    """저장소별로 하나씩 유지되는 EvaluationAggregates (최신 상태로 맞춘 뒤 반환)."""
+    key = (os.path.abspath(store.path), getattr(store, "collection", None))
+    with _aggregates_lock:
+        agg = _aggregates.get(key)
+        if agg is None:
+            agg = _aggregates[key] = EvaluationAggregates(store)
+    return agg.refresh()
+
+
+def add_evaluation(store, record_id, evaluation):
+    """
+    평가자별 평가를 남기고(같은 평가자의 이전 평가는 덮어씀) 집계를 갱신합니다.
+    evaluation 에는 최근 평가가 그대로 들어가므로 기존 화면/내보내기는 그대로 동작합니다.
+    저장은 레코드 단위 원자적 연산이라 여러 평가자가 동시에 저장해도 서로 덮어쓰지 않습니다.
+    """
+    evaluation_aggregates(store).add_evaluation(record_id, evaluation)
@@ -1,15 +1,29 @@
+import threading
 import streamlit as st
-from persona_input import persona_input_tab
-from evaluate_dialogue import evaluate_dialogue_tab
-from dialogue_list import dialogue_list_tab
-from own_dialogue_list import upload_and_evaluate_tab, own_dialogue_list_tab
+
+# 탭 모듈(pandas, numpy, 엑셀, 저장소 등)은 선택된 메뉴를 그릴 때만 불러옵니다.
+# 사이드바는 탭 import 전에 그려지고, 한 번 불러온 모듈은 이후 rerun 에서 재사용됩니다.
+
+
+def _warm_up():
+    # 탭과 같은 모듈을 쓰지만 첫 화면을 그린 뒤 별도 스레드에서 불러오므로 first paint 를 늦추지 않음
+    from utils import warm_near_duplicate_index
+    warm_near_duplicate_index()
+
+
+@st.cache_resource(show_spinner=False)
+def _start_warm_up():
+    """프로세스당 한 번: 유사 중복 색인을 백그라운드에서 만들어 첫 대화 저장이 기다리지 않게 합니다."""
+    threading.Thread(target=_warm_up, daemon=True, name="near-dup-warmup").start()
+    return True
+
 
 st.set_page_config(page_title="응급실 대화 생성 TOOL", layout="wide")
 
 # 상위 섹션
 section = st.sidebar.radio(
     "SECTION",
-    ["생성한 대화", "자체 대화"],
+    ["생성한 대화", "자체 대화", "운영"],
     index=0,
     key="section_radio"
 )
@@ -26,13 +40,16 @@ if section == "생성한 대화":
     )
 
     if sub == "1. 환자 페르소나 및 대화 생성":
+        from persona_input import persona_input_tab
         persona_input_tab()
     elif sub == "2. 생성 대화 평가":
+        from evaluate_dialogue import evaluate_dialogue_tab
         evaluate_dialogue_tab()
     elif sub == "3. 전체 대화 확인 및 저장":
+        from dialogue_list import dialogue_list_tab
         dialogue_list_tab()
 
-else:  # "자체 대화"
+elif section == "자체 대화":
     st.sidebar.markdown("### [ 자체 대화 ]")
     sub = st.sidebar.radio(
         "메뉴",
@@ -42,6 +59,28 @@ else:  # "자체 대화"
     )
 
     if sub == "1. 대화 업로드 및 평가":
+        from own_dialogue_list import upload_and_evaluate_tab
         upload_and_evaluate_tab()
     elif sub == "2. 전체 대화 확인 및 저장":
+        from own_dialogue_list import own_dialogue_list_tab
         own_dialogue_list_tab()
+
+else:  # "운영"
+    st.sidebar.markdown("### [ 운영 ]")
+    sub = st.sidebar.radio(
+        "메뉴",
+        ["1. 생성 모니터링",
+         "2. 생성 작업 큐"],
+        key="ops_submenu"
+    )
+
+    if sub == "1. 생성 모니터링":
+        from metrics_tab import metrics_tab
+        metrics_tab()
+    elif sub == "2. 생성 작업 큐":
+        from jobs_tab import jobs_tab
+        jobs_tab()
+
+
+# 첫 화면을 그린 뒤에 시작 (탭 import 와 겹쳐 first paint 를 늦추지 않도록)
+_start_warm_up()
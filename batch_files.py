@@ -0,0 +1,231 @@
+"""
+오프라인 일괄 생성: 요청 파일(JSONL) 내보내기 → (Batch API 등 외부에서 처리) → 결과 파일(JSONL) 가져오기.
+
+수천 개의 연결을 열어 두는 대신, 페르소나마다 시스템 프롬프트를 렌더링한 요청을
+OpenAI Batch 입력 형식({"custom_id", "method", "url", "body"})의 JSONL 로 씁니다.
+custom_id 는 (모델, 온도, 메시지, 샘플 번호)의 해시라 같은 계획을 다시 내보내도 같고,
+가져올 때 그대로 대화 id 로 쓰므로 같은 결과 파일을 두 번 가져와도 중복 저장되지 않습니다.
+페르소나는 요청 파일 옆의 사이드카(<이름>.personas.jsonl)에 custom_id 와 함께 적어 둡니다.
+유사 중복 거부 모드(NEAR_DUP_MODE=reject)에서 저장되지 않은 custom_id 는 <이름>.rejected.jsonl 에 남겨
+다시 내보낼 때 빼므로, 같은 요청을 또 제출해 비용을 내지 않습니다.
+
+결과 파일은 한 줄씩 읽어 묶음 단위로 저장하므로 10만 줄 파일도 메모리에 다 올리지 않습니다.
+fake_openai.write_fake_batch_results 로 만든 결과 파일로 API 없이 전체 과정을 시험할 수 있습니다.
+"""
+import json
+import os
+
+from batch_generation import _with_sample_numbers
+from ingest import validate_turns
+from response_cache import cache_key
+from utils import MODEL, TEMPERATURE, build_system_prompt, save_conversations_json, store
+from validation import is_valid
+
+BATCH_URL = "/v1/chat/completions"
+MAX_REQUESTS_PER_FILE = 50_000  # Batch API 입력 파일 하나당 최대 요청 수
+IMPORT_CHUNK = 1000  # 이 개수만큼 모이면 한 번에 저장
+MAX_ERRORS = 100  # 결과에 담을 오류 예시 수 (전체 개수는 따로 셈)
+
+
+def personas_path(path):
+    """요청 파일 batch.jsonl → 페르소나 사이드카 batch.personas.jsonl"""
+    return os.path.splitext(path)[0] + ".personas.jsonl"
+
+
+def rejected_path(personas_file):
+    """페르소나 사이드카 batch.personas.jsonl → 유사 중복으로 거부된 custom_id 사이드카 batch.rejected.jsonl"""
+    suffix = ".personas.jsonl"
+    stem = personas_file[:-len(suffix)] if personas_file.endswith(suffix) else os.path.splitext(personas_file)[0]
+    return stem + ".rejected.jsonl"
+
+
+def load_rejected(path):
+    """거부 사이드카 → custom_id 집합 (없으면 빈 집합)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {json.loads(line)["custom_id"] for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def _part_path(path, part, parts):
+    if parts == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{part + 1:03d}{ext}"
+
+
+def batch_request(persona, sample=0, model=MODEL, temperature=TEMPERATURE):
+    """페르소나 하나의 요청 줄. custom_id 는 응답 캐시 키와 같은 입력에서 만들어 항상 같습니다."""
+    messages = [{"role": "system", "content": build_system_prompt(persona)}]
+    return {
+        "custom_id": cache_key(model, temperature, messages, sample)[:32],  # 저장소 id 와 같은 32자
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {"model": model, "temperature": temperature, "messages": messages},
+    }
+
+
+def export_batch_requests(personas, path, max_per_file=MAX_REQUESTS_PER_FILE, skip_existing=True):
+    """
+    요청 JSONL 과 페르소나 사이드카를 씁니다. 요청이 max_per_file 을 넘으면
+    batch.001.jsonl, batch.002.jsonl ... 로 나눕니다 (사이드카는 하나).
+    skip_existing: 이미 저장소에 있는 custom_id 와 유사 중복으로 거부된 custom_id(<이름>.rejected.jsonl)는
+    빼고 씀 (중단된 계획의 남은 부분만 다시 내보내기).
+    """
+    requests, sidecar = [], []
+    for persona, sample in _with_sample_numbers(personas):
+        req = batch_request(persona, sample)
+        requests.append(req)
+        sidecar.append({"custom_id": req["custom_id"], "sample": sample, "persona": persona})
+    skipped = rejected = 0
+    if skip_existing and requests:
+        existing = {rec["id"] for rec in store.get_many([r["custom_id"] for r in requests])}
+        refused = load_rejected(rejected_path(personas_path(path))) - existing
+        if existing or refused:
+            keep = [r["custom_id"] not in existing and r["custom_id"] not in refused for r in requests]
+            rejected = sum(1 for r in requests if r["custom_id"] in refused)
+            requests = [r for r, k in zip(requests, keep) if k]
+            sidecar = [s for s, k in zip(sidecar, keep) if k]
+            skipped = len(keep) - len(requests) - rejected
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    parts = max(1, -(-len(requests) // max_per_file))
+    files = []
+    for part in range(parts):
+        part_path = _part_path(path, part, parts)
+        with open(part_path, "w", encoding="utf-8") as f:
+            for req in requests[part * max_per_file:(part + 1) * max_per_file]:
+                f.write(json.dumps(req, ensure_ascii=False) + "\n")
+        files.append(part_path)
+    side = personas_path(path)
+    with open(side, "w", encoding="utf-8") as f:
+        for row in sidecar:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return {"requests": len(requests), "skipped_existing": skipped, "skipped_rejected": rejected, "files": files,
+            "personas": side}
+
+
+def load_personas(path):
+    """사이드카 → {custom_id: persona}. 같은 페르소나는 객체 하나를 같이 씀 (10만 줄에도 작게)."""
+    by_id, shared = {}, {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            persona = row["persona"]
+            key = json.dumps(persona, ensure_ascii=False, sort_keys=True)
+            by_id[row["custom_id"]] = shared.setdefault(key, persona)
+    return by_id
+
+
+def parse_result_line(line):
+    """
+    결과 한 줄 → (custom_id, dialogue, usage, 오류). 오류가 있으면 dialogue 는 None.
+    Batch 출력 형식: {"custom_id", "response": {"status_code", "body": ChatCompletion}, "error"}
+    """
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return None, None, None, f"결과 줄 JSON 파싱 실패: {e}"
+    custom_id = row.get("custom_id")
+    if row.get("error"):
+        return custom_id, None, None, f"요청 오류: {row['error']}"
+    response = row.get("response") or {}
+    if response.get("status_code") != 200:
+        return custom_id, None, None, f"HTTP {response.get('status_code')}"
+    body = response.get("body") or {}
+    try:
+        choice = body["choices"][0]
+        content = choice["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return custom_id, None, None, "응답에 choices[0].message.content 없음"
+    if choice.get("finish_reason") == "length":
+        return custom_id, None, None, "응답이 길이 제한으로 잘림"
+    try:
+        dialogue = json.loads(content)
+    except (TypeError, ValueError) as e:
+        return custom_id, None, None, f"대화 JSON 파싱 실패: {e}"
+    error = validate_turns(dialogue)
+    if error is not None:
+        return custom_id, None, None, error
+    return custom_id, dialogue, body.get("usage") or {}, None
+
+
+def import_batch_results(results_paths, personas_file, chunk_size=IMPORT_CHUNK, on_progress=None):
+    """
+    결과 JSONL(여러 개 가능)을 한 줄씩 읽어 검증/파싱하고 페르소나를 붙여 묶음 단위로 저장합니다.
+    이미 저장된 custom_id 와 같은 파일 안의 중복 줄은 건너뜁니다. 유사 중복으로 거부된 custom_id 는
+    거부 사이드카(rejected_path)에 덧붙여 다음 batch-export 에서 빠지게 합니다. 규칙 검사에 걸린 대화도 저장하되
+    (validation 표시, 평가 큐에서 뒤로) invalid 로 셉니다. 다시 생성하려면 지우고 batch-export 를 다시 실행합니다.
+    on_progress(lines, saved) 는 묶음을 저장할 때마다 호출됩니다.
+    """
+    if isinstance(results_paths, str):
+        results_paths = [results_paths]
+    personas = load_personas(personas_file)
+    rejected_file = rejected_path(personas_file)
+    rejected = load_rejected(rejected_file)
+    stats = {"lines": 0, "saved": 0, "skipped_existing": 0, "skipped_rejected": 0, "duplicate_lines": 0,
+             "near_duplicates": 0,
+             "rejected_near_duplicates": 0, "invalid": 0, "failed": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "errors": []}
+    seen = set()
+    pending = []
+
+    def fail(custom_id, error):
+        stats["failed"] += 1
+        if len(stats["errors"]) < MAX_ERRORS:
+            stats["errors"].append({"line": stats["lines"], "custom_id": custom_id, "error": error})
+
+    def flush():
+        existing = {rec["id"] for rec in store.get_many([rec["id"] for rec in pending])}
+        fresh = [rec for rec in pending if rec["id"] not in existing]
+        stats["skipped_existing"] += len(pending) - len(fresh)
+        if fresh:
+            saved = save_conversations_json(fresh)
+            stats["saved"] += len(saved)
+            stats["rejected_near_duplicates"] += len(fresh) - len(saved)
+            if len(saved) < len(fresh):
+                kept = set(saved)
+                refused = [rec for rec in fresh if rec["id"] not in kept]
+                with open(rejected_file, "a", encoding="utf-8") as f:
+                    for rec in refused:
+                        f.write(json.dumps({"custom_id": rec["id"], **rec.get("near_duplicate", {})},
+                                           ensure_ascii=False) + "\n")
+                rejected.update(rec["id"] for rec in refused)
+            stats["near_duplicates"] += sum(1 for rec in fresh if "near_duplicate" in rec)
+            stats["invalid"] += sum(1 for rec in fresh if not is_valid(rec))  # 저장 시 붙은 규칙 검사 결과
+        pending.clear()
+        if on_progress is not None:
+            on_progress(stats["lines"], stats["saved"])
+
+    for path in results_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                stats["lines"] += 1
+                custom_id, dialogue, usage, error = parse_result_line(line)
+                if error is not None:
+                    fail(custom_id, error)
+                    continue
+                persona = personas.get(custom_id)
+                if persona is None:
+                    fail(custom_id, "사이드카에 없는 custom_id")
+                    continue
+                if custom_id in seen:
+                    stats["duplicate_lines"] += 1
+                    continue
+                if custom_id in rejected:
+                    stats["skipped_rejected"] += 1
+                    continue
+                seen.add(custom_id)
+                stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+                stats["completion_tokens"] += usage.get("completion_tokens") or 0
+                pending.append({"id": custom_id, "persona": dict(persona), "dialogue": dialogue})
+                if len(pending) >= chunk_size:
+                    flush()
+    if pending:
+        flush()
+    return stats
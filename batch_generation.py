@@ -0,0 +1,151 @@
+"""
+페르소나 목록(또는 그리드)에 대해 대화를 동시에 생성하는 일괄 생성 엔진.
+
+스레드 풀로 동시 요청 수를 제한하고, 요청마다 타임아웃을 적용하며,
+완료되는 순서대로 결과를 돌려주고 저장은 묶음 단위로 처리합니다.
+"""
+import itertools
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils import generate_conversation, save_conversation_json, save_conversations_json
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 120  # 요청당 타임아웃(초)
+SAVE_EVERY = 20  # 이 개수만큼 모이면 한 번에 저장
+
+
+def persona_grid(ages, genders, categories, ktas_levels, repeat=1):
+    """
+    나이 × 성별 × (대분류, 중분류) × KTAS 조합으로 페르소나 목록을 만듭니다.
+    categories: [(main_category, middle_category), ...]
+    """
+    personas = []
+    for age, gender, (main, middle), ktas in itertools.product(ages, genders, categories, ktas_levels):
+        for _ in range(repeat):
+            personas.append({
+                "age": age,
+                "gender": gender,
+                "main_category": main,
+                "middle_category": middle,
+                "ktas_level": ktas
+            })
+    return personas
+
+
+def _with_sample_numbers(personas):
+    """같은 페르소나가 반복되면 0, 1, 2... 샘플 번호를 붙여 서로 다른 캐시 항목을 쓰게 합니다."""
+    seen = {}
+    for persona in personas:
+        key = json.dumps(persona, ensure_ascii=False, sort_keys=True)
+        sample = seen.get(key, 0)
+        seen[key] = sample + 1
+        yield persona, sample
+
+
+def iter_generate(personas, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                  use_cache=True, generate=generate_conversation):
+    """
+    완료된 순서대로 (persona, result, error)를 yield 합니다.
+    동시에 진행 중인 요청은 max_workers 개로 제한됩니다.
+    """
+    personas = _with_sample_numbers(personas)
+
+    def submit(persona, sample):
+        return pool.submit(generate, persona, request_timeout=timeout, use_cache=use_cache, sample=sample)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        for persona, sample in itertools.islice(personas, max_workers):
+            pending[submit(persona, sample)] = persona
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                persona = pending.pop(fut)
+                try:
+                    yield persona, fut.result(), None
+                except Exception as e:
+                    yield persona, None, e
+                nxt = next(personas, None)
+                if nxt is not None:
+                    pending[submit(*nxt)] = nxt[0]
+
+
+def generate_batch(personas, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, use_cache=True,
+                   save=True, save_every=SAVE_EVERY, on_result=None, generate=generate_conversation,
+                   on_saved=None):
+    """
+    페르소나 목록 전체를 동시 생성하고 요약 리포트를 반환합니다.
+    on_result(done_count, total, persona, result, error)는 결과가 나올 때마다 호출됩니다.
+    on_saved(records)는 묶음이 저장될 때마다 저장된 레코드(id 포함)로 호출됩니다 (커버리지 갱신 등).
+    """
+    personas = list(personas)
+    total = len(personas)
+    buffer, errors = [], []
+    succeeded = saved = near_duplicates = 0
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal saved, near_duplicates
+        ids = set(save_conversations_json(buffer))
+        saved += len(ids)
+        near_duplicates += sum(1 for r in buffer if "near_duplicate" in r)
+        if on_saved is not None and ids:
+            on_saved([r for r in buffer if r.get("id") in ids])
+
+    for n, (persona, result, error) in enumerate(
+            iter_generate(personas, max_workers, timeout, use_cache, generate), start=1):
+        if error is None:
+            succeeded += 1
+            buffer.append(result)
+            if save and len(buffer) >= save_every:
+                flush()
+                buffer = []
+        else:
+            errors.append({"persona": persona, "error": repr(error)})
+        if on_result is not None:
+            on_result(n, total, persona, result, error)
+
+    if save and buffer:
+        flush()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": len(errors),
+        "elapsed_sec": round(elapsed, 3),
+        "dialogues_per_min": round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "workers": max_workers,
+        "saved": saved,
+        "near_duplicates": near_duplicates,  # 기존/같은 묶음의 대화와 거의 같은 대화 수 (NEAR_DUP_MODE)
+        "errors": errors,
+    }
+
+
+def generate_serial(personas, timeout=DEFAULT_TIMEOUT, use_cache=True, save=True, generate=generate_conversation):
+    """기존 버튼과 같은 직렬 경로(생성 1건 → 저장 1건). 처리량 비교용."""
+    personas = list(personas)
+    succeeded, errors = 0, []
+    start = time.perf_counter()
+    for persona, sample in _with_sample_numbers(personas):
+        try:
+            result = generate(persona, request_timeout=timeout, use_cache=use_cache, sample=sample)
+        except Exception as e:
+            errors.append({"persona": persona, "error": repr(e)})
+            continue
+        succeeded += 1
+        if save:
+            save_conversation_json(result)
+    elapsed = time.perf_counter() - start
+    return {
+        "total": len(personas),
+        "succeeded": succeeded,
+        "failed": len(errors),
+        "elapsed_sec": round(elapsed, 3),
+        "dialogues_per_min": round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "workers": 1,
+        "errors": errors,
+    }
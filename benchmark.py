@@ -0,0 +1,1183 @@
+"""
+성능 측정 스크립트.
+
+    python benchmark.py generation --n 40 --workers 8 --delay 0.5
+    python benchmark.py storage --sizes 1000 10000 50000
+    python benchmark.py streaming --n 5 --delay 2.0
+    python benchmark.py imports
+    python benchmark.py startup --repeat 3 --budget-ms 100
+    python benchmark.py export --sizes 10000 50000
+    python benchmark.py ingest --rows 100000
+    python benchmark.py parse --rows 100000 --workers 4
+    python benchmark.py merge --corpus 10000 100000 --upload 20000
+    python benchmark.py neardup --sizes 10000 100000
+    python benchmark.py categories --repeat 5
+    python benchmark.py aggregates --sizes 10000 100000
+    python benchmark.py evaluators --processes 4 --threads 4 --writes 100
+    python benchmark.py jobs --n 40 --processes 1 2 4 --delay 0.5
+    python benchmark.py batchfile --n 100000
+    python benchmark.py validation --sizes 10000 100000
+    python benchmark.py memory --n 100000
+    python benchmark.py delta --sizes 10000 100000
+    python benchmark.py suite --sizes 1000 10000 100000 --out bench.json
+    python benchmark.py compare old.json new.json --threshold 0.2
+
+모든 측정은 임시 디렉터리에서 실행되므로 실제 data/ 폴더를 건드리지 않습니다.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def _scratch_dir():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+
+def _sample_personas(n):
+    from batch_generation import persona_grid
+
+    grid = persona_grid(
+        ["15세 이상", "15세 미만"], ["남성", "여성"],
+        [("호흡기", "호흡곤란"), ("심혈관", "흉통")], [1, 2, 3, 4, 5],
+    )
+    return [grid[i % len(grid)] for i in range(n)]
+
+
+def synthetic_record(i, rng=random):
+    """{"persona", "dialogue", "evaluation"} 스키마의 가짜 레코드."""
+    n_turns = rng.randint(6, 10)
+    dialogue = []
+    for t in range(1, n_turns + 1):
+        dialogue.append({"turn": t, "speaker": "I", "utterance": f"{i}번 환자분, {t}번째 질문입니다. 증상이 언제부터 있었나요?"})
+        dialogue.append({"turn": t, "speaker": "CHATGPT", "utterance": f"어제 저녁부터 가슴이 답답하고 숨이 찹니다. ({t})"})
+    rec = {
+        "persona": {
+            "age": rng.choice(["15세 이상", "15세 미만"]),
+            "gender": rng.choice(["남성", "여성"]),
+            "main_category": rng.choice(["호흡기", "심혈관", "소화기", "신경"]),
+            "middle_category": rng.choice(["호흡곤란", "흉통", "복통", "두통", "어지러움"]),
+            "ktas_level": rng.randint(1, 5),
+        },
+        "dialogue": dialogue,
+    }
+    if rng.random() < 0.5:
+        rec["evaluation"] = {"ktas": rng.choice(["Y", "N", "판단 불가"]), "question": rng.randint(0, 10),
+                             "realism": rng.randint(0, 10), "evaluator": rng.choice(["kim", "lee", "park"])}
+    return rec
+
+
+def _legacy_save(path, data):
+    """JSON 배열 전체를 다시 쓰던 이전 save_conversation_json."""
+    all_data = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            all_data = json.load(f)
+    all_data.append(data)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(all_data, f, ensure_ascii=False, indent=2)
+
+
+def _latency_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "max_ms": round(max(samples), 3)}
+
+
+def bench_storage(sizes=(1000, 10000, 50000), repeat=20, legacy_max=10000):
+    """코퍼스 크기별 저장 1건 지연: 이전 JSON 배열 방식 vs JSONL 로그."""
+    from storage import JsonlStore
+
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        corpus = [synthetic_record(i, rng) for i in range(size)]
+        extra = synthetic_record(size, rng)
+        row = {"corpus_size": size}
+        with _scratch_dir():
+            store = JsonlStore("dialogues.jsonl")
+            store.extend(corpus)
+            row["jsonl_save"] = _latency_ms(lambda: store.append(extra), repeat)
+            t0 = time.perf_counter()
+            store.load_all()
+            row["jsonl_load_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            row["jsonl_load_cached"] = _latency_ms(store.load_all, repeat)
+            row["jsonl_load_after_append"] = _latency_ms(lambda: (store.append(extra), store.load_all()), repeat)
+            if size <= legacy_max:
+                with open("dialogues.json", "w", encoding="utf-8") as f:
+                    json.dump(corpus, f, ensure_ascii=False, indent=2)
+                row["legacy_json_save"] = _latency_ms(lambda: _legacy_save("dialogues.json", extra), min(repeat, 5))
+                t0 = time.perf_counter()
+                migrated = JsonlStore("migrated.jsonl", legacy_path="dialogues.json")
+                migrated.count()
+                row["migration_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        results.append(row)
+    return {"storage": results}
+
+
+def bench_generation(n=40, workers=8, delay=0.5):
+    """가짜 OpenAI 서버를 대상으로 직렬 경로와 일괄(동시) 경로의 처리량을 비교합니다."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    import openai
+    from fake_openai import start_fake_server
+    from batch_generation import generate_batch, generate_serial
+
+    server, base_url = start_fake_server(delay=delay)
+    openai.api_base = base_url
+    personas = _sample_personas(n)
+    try:
+        with _scratch_dir():
+            serial = generate_serial(personas, use_cache=False)
+        with _scratch_dir():
+            batch = generate_batch(personas, max_workers=workers, use_cache=False)
+    finally:
+        server.shutdown()
+
+    for r in (serial, batch):
+        r.pop("errors", None)
+    return {
+        "n": n,
+        "server_delay_sec": delay,
+        "serial": serial,
+        "batch": batch,
+        "speedup": round(batch["dialogues_per_min"] / serial["dialogues_per_min"], 2)
+        if serial["dialogues_per_min"] else None,
+    }
+
+
+def bench_streaming(n=5, delay=2.0):
+    """가짜 서버에서 일반 호출과 스트리밍 호출의 첫 턴 표시 시간/전체 지연을 비교합니다."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    import openai
+    from fake_openai import start_fake_server
+    from utils import generate_conversation
+    from streaming import stream_conversation
+
+    server, base_url = start_fake_server(delay=delay)
+    openai.api_base = base_url
+    blocking, streamed = [], []
+    try:
+        with _scratch_dir():
+            for persona in _sample_personas(n):
+                t0 = time.perf_counter()
+                generate_conversation(persona, use_cache=False)
+                blocking.append(time.perf_counter() - t0)
+                _, metrics = stream_conversation(persona, use_cache=False)
+                streamed.append(metrics)
+    finally:
+        server.shutdown()
+
+    def ms(values):
+        return round(statistics.median(values) * 1000, 1)
+
+    return {
+        "n": n,
+        "server_delay_sec": delay,
+        "blocking": {"time_to_first_turn_ms": ms(blocking), "total_ms": ms(blocking)},
+        "streaming": {
+            "time_to_first_turn_ms": ms([m["time_to_first_turn_sec"] for m in streamed]),
+            "total_ms": ms([m["total_sec"] for m in streamed]),
+        },
+    }
+
+
+HEADLESS_IMPORTS = "import cli, utils, storage, export, scoring"
+APP_IMPORTS = "import streamlit, persona_input, evaluate_dialogue, dialogue_list, own_dialogue_list"
+
+
+def _import_time_ms(statement, repeat, setup="pass"):
+    """새 프로세스에서 setup 을 실행한 뒤 statement 한 번의 시간(중앙값)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = f"{setup}; import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return round(statistics.median(samples), 1)
+
+
+def bench_imports(repeat=5):
+    """headless 경로와 Streamlit 앱 탭 모듈의 import 시간(새 프로세스, 중앙값)."""
+    headless = _import_time_ms(HEADLESS_IMPORTS, repeat)
+    app = _import_time_ms(APP_IMPORTS, repeat)
+    return {
+        "headless_ms": headless,
+        "app_ms": app,
+        "ratio": round(headless / app, 3) if app else None,
+    }
+
+
+# 앱 메뉴 → (섹션, 하위 메뉴 위젯 key, 하위 메뉴 값). app.py 의 사이드바와 같게 유지
+APP_MENUS = {
+    "generate": ("생성한 대화", "generated_submenu", "1. 환자 페르소나 및 대화 생성"),
+    "evaluate": ("생성한 대화", "generated_submenu", "2. 생성 대화 평가"),
+    "list": ("생성한 대화", "generated_submenu", "3. 전체 대화 확인 및 저장"),
+    "own_upload": ("자체 대화", "own_submenu", "1. 대화 업로드 및 평가"),
+    "own_list": ("자체 대화", "own_submenu", "2. 전체 대화 확인 및 저장"),
+    "metrics": ("운영", "ops_submenu", "1. 생성 모니터링"),
+    "jobs": ("운영", "ops_submenu", "2. 생성 작업 큐"),
+}
+FIRST_PAINT_BUDGET_MS = 100  # 첫 실행에서 사이드바까지 걸리는 시간 중 Streamlit 자체 첫 실행 비용을 뺀 허용치
+STARTUP_MARKER = "--startup-run--"
+# 사이드바만 있는 최소 스크립트: Streamlit 첫 실행 자체의 비용(기준선)을 잽니다
+BASELINE_APP = """import streamlit as st
+st.set_page_config(page_title="baseline", layout="wide")
+st.sidebar.radio("SECTION", ["a", "b"], key="section_radio")
+st.sidebar.radio("MENU", ["c"], key="generated_submenu")
+"""
+
+
+def _startup_probe(menu, script=None):
+    """
+    새 프로세스에서 실행: 서버가 막 뜬 상태처럼 app.py(또는 script)를 처음 한 번 실행하고
+    first_paint_ms(사이드바 메뉴까지 그려진 시점)와 total_ms(선택한 탭까지 다 그린 시점)를 출력합니다.
+    streamlit 자체 import 는 서버 시작 시 한 번이므로 재지 않습니다.
+    """
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+
+    section, key, value = APP_MENUS[menu]
+    painted = []
+    radio = DeltaGenerator.radio
+
+    def timed_radio(self, *args, **kwargs):
+        result = radio(self, *args, **kwargs)
+        painted.append(time.perf_counter())
+        return result
+
+    DeltaGenerator.radio = timed_radio  # st.sidebar.radio 만 잡힘 (st.radio 는 import 때 묶인 메서드)
+    here = os.path.dirname(os.path.abspath(__file__))
+    at = AppTest.from_file(script or os.path.join(here, "app.py"), default_timeout=300)
+    if script is None:
+        at.session_state["section_radio"] = section
+        at.session_state[key] = value
+    print(STARTUP_MARKER, file=sys.stderr, flush=True)
+    t0 = time.perf_counter()
+    at.run()
+    total = time.perf_counter() - t0
+    print(json.dumps({
+        "first_paint_ms": round((painted[1] - t0) * 1000, 1),
+        "total_ms": round(total * 1000, 1),
+        "exceptions": [e.value for e in at.exception],
+    }, ensure_ascii=False))
+
+
+def _import_profile(stderr, top):
+    """-X importtime 출력에서 앱 실행 중 새로 불러온 최상위 모듈을 누적 시간 순으로."""
+    lines = stderr.split(STARTUP_MARKER, 1)[-1].splitlines()
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # 다른 모듈 안에서 불린 import 는 부모 누적 시간에 포함됨
+        rows.append((name.strip(), round(int(cumulative) / 1000, 1)))
+    rows.sort(key=lambda r: -r[1])
+    return [{"module": name, "cumulative_ms": ms} for name, ms in rows[:top]]
+
+
+def bench_startup(menus=tuple(APP_MENUS), repeat=3, budget_ms=FIRST_PAINT_BUDGET_MS, top=8):
+    """
+    앱 콜드 스타트: 메뉴마다 새 프로세스에서 첫 실행의 first paint/전체 시간(중앙값)과
+    그 실행에서 불러온 모듈의 import 시간 프로파일. first paint 에서 사이드바만 있는 최소 스크립트의
+    first paint(기준선)를 뺀 값이 budget_ms 를 넘는 메뉴를 over_budget 에 담습니다.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    excel = os.path.join(here, "data", "GT_KTAS카테고리_분류.xlsx")
+    results = {}
+    with _scratch_dir() as tmp:
+        os.makedirs("data", exist_ok=True)
+        if os.path.exists(excel):
+            import shutil
+            shutil.copy(excel, "data")
+        with open("baseline_app.py", "w", encoding="utf-8") as f:
+            f.write(BASELINE_APP)
+
+        def probe(call, importtime=False):
+            code = f"import sys; sys.path.insert(0, {here!r}); import benchmark; benchmark.{call}"
+            flags = ["-X", "importtime"] if importtime else []
+            return subprocess.run([sys.executable, *flags, "-c", code], cwd=tmp, capture_output=True, text=True,
+                                  check=True)
+
+        baseline_call = f"_startup_probe('list', {os.path.join(tmp, 'baseline_app.py')!r})"
+        baseline = statistics.median(json.loads(probe(baseline_call).stdout.strip().splitlines()[-1])["first_paint_ms"]
+                                     for _ in range(repeat))
+        for menu in menus:
+            samples = [json.loads(probe(f"_startup_probe({menu!r})").stdout.strip().splitlines()[-1])
+                       for _ in range(repeat)]
+            profile = probe(f"_startup_probe({menu!r})", importtime=True)
+            first_paint = statistics.median(s["first_paint_ms"] for s in samples)
+            results[menu] = {
+                "first_paint_ms": first_paint,
+                "first_paint_over_baseline_ms": round(first_paint - baseline, 1),
+                "total_ms": statistics.median(s["total_ms"] for s in samples),
+                "exceptions": samples[-1]["exceptions"],
+                "imports": _import_profile(profile.stderr, top),
+            }
+            print(f"{menu} 완료", file=sys.stderr)
+    over = [menu for menu, row in results.items() if row["first_paint_over_baseline_ms"] > budget_ms]
+    return {"startup": results, "baseline_first_paint_ms": baseline, "budget_ms": budget_ms, "over_budget": over}
+
+
+def bench_categories(repeat=5):
+    """
+    페르소나 탭 콜드 스타트(새 프로세스, 중앙값): 탭 모듈 import 와, 그 뒤 카테고리 계층 로드를
+    매번 엑셀 파싱(openpyxl import 포함)으로 할 때와 사이드카로 할 때.
+    사이드카는 임시 디렉터리의 엑셀 사본 옆에 만듭니다.
+    """
+    import shutil
+    import categories
+
+    with _scratch_dir() as tmp:
+        excel = os.path.join(tmp, os.path.basename(categories.EXCEL_PATH))
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), categories.EXCEL_PATH), excel)
+        setup = "import persona_input, categories"
+        import_ms = _import_time_ms(setup, repeat)
+        excel_ms = _import_time_ms(f"categories.build_hierarchy(categories.load_category_table({excel!r}))",
+                                   repeat, setup)
+        categories.load_hierarchy(excel)  # 사이드카 생성
+        sidecar_ms = _import_time_ms(f"categories.load_hierarchy({excel!r})", repeat, setup)
+    return {
+        "tab_import_ms": import_ms,
+        "hierarchy_excel_ms": excel_ms,
+        "hierarchy_sidecar_ms": sidecar_ms,
+        "cold_start_excel_ms": round(import_ms + excel_ms, 1),
+        "cold_start_sidecar_ms": round(import_ms + sidecar_ms, 1),
+    }
+
+
+def _legacy_export(data):
+    """이전 dialogue_list_tab: 행 dict → DataFrame → CSV 바이트 전체를 메모리에 만듦."""
+    import pandas as pd
+    from export import build_rows, to_csv_bytes, GENERATED_COLUMNS
+
+    rows = build_rows(data)
+    pd.DataFrame(rows, columns=GENERATED_COLUMNS)
+    return to_csv_bytes(rows, GENERATED_COLUMNS)
+
+
+def bench_export(sizes=(10000, 50000), chunk_size=1000):
+    """형식별 스트리밍 내보내기의 처리량과 최대 메모리(tracemalloc) vs 이전 CSV 내보내기."""
+    import tracemalloc
+    import storage
+    from export import EXPORT_FORMATS, export_store
+
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        row = {"corpus_size": size}
+        with _scratch_dir():
+            store = storage.open_store("dialogues")
+            store.extend(synthetic_record(i, rng) for i in range(size))
+            data = store.load_all()  # 파싱 캐시를 채워 두 경로 모두 같은 조건에서 시작
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            csv_bytes = _legacy_export(data)
+            elapsed = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            row["legacy_csv"] = {"rows": size, "bytes": len(csv_bytes), "elapsed_sec": round(elapsed, 3),
+                                 "rows_per_sec": round(size / elapsed, 1), "peak_mem_mb": round(peak / 1e6, 2)}
+            del csv_bytes, data
+
+            for fmt in EXPORT_FORMATS:
+                row[fmt] = export_store(store, fmt, f"export.{fmt}", chunk_size=chunk_size, trace_memory=True)
+        results.append(row)
+        print(f"size={size} 완료", file=sys.stderr)
+    return {"export": results, "note": "peak_mem_mb 은 파이썬 힙(tracemalloc) 기준이며 pyarrow 버퍼는 포함하지 않습니다."}
+
+
+def _legacy_read_csv_any_encoding(uploaded_file):
+    """이전 read_csv_any_encoding: 인코딩마다 python 엔진으로 전체를 다시 파싱."""
+    import pandas as pd
+
+    for enc in ["utf-8", "utf-8-sig", "cp949", "euc-kr", "latin1"]:
+        try:
+            uploaded_file.seek(0)
+            return pd.read_csv(uploaded_file, encoding=enc, sep=None, engine="python")
+        except Exception:
+            continue
+    uploaded_file.seek(0)
+    return pd.read_excel(uploaded_file)
+
+
+def _upload_csv_bytes(rows, encoding, rng, korean_from=0.0):
+    """
+    업로드용 CSV 바이트. korean_from 비율 이전 행은 ASCII 대화만 넣어, 인코딩 오류가 파일
+    뒤쪽에서야 드러나는 경우(이전 함수가 인코딩마다 거의 전체를 다시 읽는 경우)를 만듭니다.
+    """
+    import csv
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(["source", "dialogue", "evaluator"])
+    templates = [synthetic_record(i, rng)["dialogue"] for i in range(100)]
+    for i in range(rows):
+        dialogue = templates[i % len(templates)]
+        if i < rows * korean_from:
+            dialogue = [dict(t, utterance=f"utterance {t['turn']} of row {i}") for t in dialogue]
+        writer.writerow(["upload", json.dumps(dialogue, ensure_ascii=False), "bench"])
+    return buf.getvalue().encode(encoding)
+
+
+def bench_ingest(rows=100000, legacy=True):
+    """큰 CP949 / UTF-8-sig 업로드 CSV 읽기: 이전 함수 vs 샘플 추정 + C 엔진 한 번 파싱."""
+    from ingest import read_csv_any_encoding
+
+    rng = random.Random(0)
+    cases = [("cp949", "cp949", 0.0), ("cp949_korean_late", "cp949", 0.95), ("utf-8-sig", "utf-8-sig", 0.0)]
+    results = []
+    for name, encoding, korean_from in cases:
+        data = _upload_csv_bytes(rows, encoding, rng, korean_from)
+        row = {"case": name, "rows": rows, "mb": round(len(data) / 1e6, 1)}
+        df = []
+        row["read_csv_any_encoding_ms"] = _once_ms(lambda: df.append(read_csv_any_encoding(io.BytesIO(data))))
+        row["columns"] = list(df[0].columns)
+        if legacy:
+            legacy_df = []
+            row["legacy_ms"] = _once_ms(lambda: legacy_df.append(_legacy_read_csv_any_encoding(io.BytesIO(data))))
+            row["legacy_columns"] = list(legacy_df[0].columns)
+            row["speedup"] = round(row["legacy_ms"] / row["read_csv_any_encoding_ms"], 1)
+        results.append(row)
+        print(f"{name} 완료", file=sys.stderr)
+    return {"ingest": results}
+
+
+def _legacy_rows_to_own_dialogues(df, dialogue_col):
+    """이전 업로드 변환: df.iterrows() 로 한 행씩 json.loads."""
+    own_list = []
+    for _, row in df.iterrows():
+        raw = row.get(dialogue_col, "")
+        parsed = None
+        if isinstance(raw, str):
+            s = raw.strip()
+            if s.startswith("{") or s.startswith("["):
+                try:
+                    parsed = json.loads(s)
+                except Exception:
+                    parsed = None
+        own_list.append({"dialogue": parsed if parsed is not None else raw, "source": "업로드", "evaluation": {}})
+    return own_list
+
+
+def bench_parse(rows=100000, workers=4):
+    """업로드 대화 컬럼 변환 처리량(rows/sec): 이전 iterrows 루프 vs 컬럼 단위 직렬/병렬."""
+    from ingest import ingest_dialogues, read_csv_any_encoding
+
+    df = read_csv_any_encoding(io.BytesIO(_upload_csv_bytes(rows, "utf-8", random.Random(0))))
+    result = {"rows": rows, "workers": workers}
+    paths = [
+        ("legacy_iterrows", lambda: _legacy_rows_to_own_dialogues(df, "dialogue")),
+        ("columnar_serial", lambda: ingest_dialogues(df, "dialogue", workers=1)),
+        ("columnar_parallel", lambda: ingest_dialogues(df, "dialogue", workers=workers)),
+    ]
+    for name, fn in paths:
+        ms = _once_ms(fn)
+        result[name] = {"ms": ms, "rows_per_sec": round(rows / (ms / 1000), 1)}
+        print(f"{name} 완료", file=sys.stderr)
+    return {"parse": result}
+
+
+def bench_merge(corpus_sizes=(10000, 100000), upload=20000):
+    """자체 대화 병합 업로드 시간: 코퍼스가 커져도 (업로드 행 수에만 비례해) 일정해야 합니다."""
+    import storage
+    from dedup import merge_into
+
+    rng = random.Random(0)
+    results = []
+    for size in corpus_sizes:
+        corpus = [{"dialogue": synthetic_record(i, rng)["dialogue"], "source": "업로드"} for i in range(size)]
+        # 절반은 기존 대화(중복), 절반은 새 대화
+        rows = corpus[:upload // 2] + [{"dialogue": synthetic_record(size + i, rng)["dialogue"], "source": "업로드"}
+                                       for i in range(upload - upload // 2)]
+        with _scratch_dir():
+            store = storage.open_store("own_dialogues")
+            merge_into(store, corpus)
+            store.load_all()
+            report = []
+            ms = _once_ms(lambda: report.append(merge_into(store, rows)))
+        results.append({"corpus_size": size, "upload_rows": upload, "merge_ms": ms,
+                        "rows_per_sec": round(upload / (ms / 1000), 1),
+                        **{k: report[0][k] for k in ("added", "duplicate", "changed")}})
+        print(f"corpus={size} 완료", file=sys.stderr)
+    return {"merge": results}
+
+
+def _vocab(rng, size=3000):
+    """서로 다른 대화를 만들 때 쓰는 2~4음절 가짜 단어 목록."""
+    syllables = "가나다라마바사아자차카타파하거너더러머버서어저처고노도로모보소오조초구누두루무부수우주추"
+    return ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+
+def _diverse_record(i, rng, vocab):
+    """synthetic_record 와 같은 스키마지만 대화 내용이 레코드마다 다름 (유사 중복 검사가 실제처럼 동작하도록)."""
+    rec = synthetic_record(i, rng)
+    rec["dialogue"] = _diverse_dialogue(rng, vocab)
+    return rec
+
+
+def _diverse_dialogue(rng, vocab):
+    return [{"turn": t // 2 + 1, "speaker": "I" if t % 2 == 0 else "CHATGPT",
+             "utterance": " ".join(rng.choice(vocab) for _ in range(rng.randint(5, 10)))} for t in range(12)]
+
+
+def _perturb(dialogue, rng, vocab):
+    """발화 한 곳의 단어 하나만 바꾼 거의 같은 대화."""
+    copy = [dict(t) for t in dialogue]
+    turn = rng.choice(copy)
+    words = turn["utterance"].split()
+    words[rng.randrange(len(words))] = rng.choice(vocab)
+    turn["utterance"] = " ".join(words)
+    return copy
+
+
+def bench_neardup(sizes=(10000, 100000), planted=200, checks=200):
+    """
+    유사 중복 검사: 서명 계산 속도, 색인 구축(콜드/사이드카), 저장 1건당 검사 지연, 전체 묶음 시간,
+    심어 둔 거의 같은 대화의 재현율.
+    """
+    import storage
+    from near_duplicates import cluster_store, dialogue_text, save_with_check, signature, store_index
+    import near_duplicates
+
+    rng = random.Random(0)
+    vocab = _vocab(rng)
+    results = []
+    for size in sizes:
+        corpus = [{"dialogue": _diverse_dialogue(rng, vocab)} for _ in range(size)]
+        row = {"corpus_size": size}
+        with _scratch_dir():
+            store = storage.open_store("dialogues")
+            store.extend(corpus)
+            texts = [dialogue_text(r["dialogue"]) for r in corpus[:2000]]
+            ms = _once_ms(lambda: [signature(t) for t in texts])
+            row["signatures_per_sec"] = round(len(texts) / (ms / 1000), 1)
+
+            near_duplicates._store_indexes.clear()
+            row["index_cold_ms"] = _once_ms(lambda: store_index(store))
+            near_duplicates._store_indexes.clear()
+            row["index_from_sidecar_ms"] = _once_ms(lambda: store_index(store))
+
+            copies = [{"dialogue": _perturb(corpus[rng.randrange(size)]["dialogue"], rng, vocab)} for _ in range(planted)]
+            fresh = [{"dialogue": _diverse_dialogue(rng, vocab)} for _ in range(checks)]
+            row["save_check"] = _latency_ms(lambda: save_with_check(store, [fresh.pop()], "flag"), checks)
+            save_with_check(store, copies, "flag")
+            row["planted_recall"] = round(sum("near_duplicate" in c for c in copies) / planted, 3)
+
+            groups = []
+            row["cluster_ms"] = _once_ms(lambda: groups.extend(cluster_store(store)))
+            row["clusters"] = len(groups)
+        results.append(row)
+        print(f"size={size} 완료", file=sys.stderr)
+    return {"neardup": results}
+
+
+def bench_aggregates(sizes=(10000, 100000), writes=200, evaluators=5):
+    """
+    평가 집계: 콜드 구축, 평가 1건 쓰기 지연(집계 갱신 포함), 요약 읽기 vs 이전 방식
+    (load_all → DataFrame → value_counts), 평가자 간 일치도 계산 시간.
+    """
+    import pandas as pd
+    import storage
+    from aggregates import EvaluationAggregates, add_evaluation, evaluation_aggregates
+
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        row = {"corpus_size": size}
+        with _scratch_dir():
+            store = storage.open_store("dialogues")
+            store.extend(synthetic_record(i, rng) for i in range(size))
+            store.load_all()
+            row["build_ms"] = _once_ms(lambda: EvaluationAggregates(store).refresh())
+
+            ids = store.ids()
+            targets = [rng.choice(ids[:writes]) for _ in range(writes)]  # 같은 대화를 여러 평가자가 평가
+
+            def write():
+                add_evaluation(store, targets.pop(), {
+                    "ktas": rng.choice(["Y", "N", "판단 불가"]), "question": rng.randint(0, 10),
+                    "realism": rng.randint(0, 10), "evaluator": f"rater{rng.randrange(evaluators)}"})
+            row["write"] = _latency_ms(write, writes)
+
+            def legacy_summary():
+                df = pd.DataFrame([(r.get("evaluation") or {}).get("ktas", "") for r in store.load_all()],
+                                  columns=["ktas"])
+                df["ktas"].value_counts()
+            row["summary_legacy"] = _latency_ms(legacy_summary, 5)
+
+            def summary():
+                agg = evaluation_aggregates(store)
+                agg.ktas_summary(), agg.overall(), agg.breakdown("evaluator"), agg.breakdown("ktas_level")
+            row["summary"] = _latency_ms(summary, 20)
+            agg = evaluation_aggregates(store)
+            row["agreement_ms"] = _once_ms(agg.agreement)
+            row["multi_rated"] = len(agg.multi)
+        results.append(row)
+        print(f"size={size} 완료", file=sys.stderr)
+    return {"aggregates": results}
+
+
+def _evaluator_worker(cwd, backend, ids, threads, writes, proc, legacy):
+    """평가자 threads 명(스레드)이 hot 레코드에 평가를 writes 건씩 저장합니다. (프로세스 하나)"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.chdir(cwd)
+    import storage
+    from aggregates import add_evaluation, evaluation_aggregates
+
+    store = storage.open_store("dialogues", backend)
+    evaluation_aggregates(store)  # 집계 첫 구축은 서버 시작 때 한 번이므로 측정에서 제외
+
+    def run(t):
+        rng = random.Random(proc * 1000 + t)
+        name = f"rater{proc}-{t}"
+        latencies, last = [], {}
+        for k in range(writes):
+            rid = rng.choice(ids)
+            evaluation = {"ktas": rng.choice(["Y", "N", "판단 불가"]), "question": rng.randint(0, 10),
+                          "realism": rng.randint(0, 10), "evaluator": name, "seq": k}
+            t0 = time.perf_counter()
+            if legacy:
+                # 이전 방식: 레코드를 읽어 평가를 합친 뒤 통째로 update (잠금 없음)
+                store.update(rid, storage.merge_evaluation(store.get(rid) or {}, evaluation))
+            else:
+                add_evaluation(store, rid, evaluation)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            last[rid] = k
+        return name, latencies, last
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(run, range(threads)))
+
+
+def bench_evaluators(processes=4, threads=4, writes=100, corpus=2000, hot=50, backend="jsonl", legacy=False):
+    """
+    동시 평가 부하 시험: processes × threads 명의 평가자가 같은 hot 레코드들에 동시에 평가를 저장한 뒤,
+    평가자마다 레코드별 마지막 평가가 남아 있는지(유실 없음)와 저장 지연 분포를 확인합니다.
+    legacy=True 면 읽고-합치고-통째로 쓰는 이전 방식으로 같은 부하를 겁니다.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import storage
+
+    rng = random.Random(0)
+    with _scratch_dir() as tmp:
+        store = storage.open_store("dialogues", backend)
+        ids = store.extend(synthetic_record(i, rng) for i in range(corpus))[:hot]
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [pool.submit(_evaluator_worker, tmp, backend, ids, threads, writes, p, legacy)
+                       for p in range(processes)]
+            results = [r for f in futures for r in f.result()]
+        elapsed = time.perf_counter() - t0
+
+        records = {rec["id"]: rec for rec in storage.open_store("dialogues", backend).get_many(ids)}
+        expected = lost = 0
+        for name, _, last in results:
+            for rid, k in last.items():
+                expected += 1
+                saved = storage.evaluations_of(records.get(rid, {})).get(name)
+                lost += not saved or saved.get("seq") != k
+        latencies = sorted(ms for _, lat, _ in results for ms in lat)
+        quarter = max(writes // 4, 1)  # 평가자별 처음/마지막 1/4 구간의 지연으로 시간에 따른 변화 확인
+        first = [ms for _, lat, _ in results for ms in lat[:quarter]]
+        last_quarter = [ms for _, lat, _ in results for ms in lat[-quarter:]]
+
+        def pct(values, q):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 3) if values else None
+
+        return {
+            "backend": backend,
+            "mode": "legacy" if legacy else "record-level",
+            "evaluators": processes * threads,
+            "writes": len(latencies),
+            "writes_per_sec": round(len(latencies) / elapsed, 1),
+            "expected_final_evaluations": expected,
+            "lost": lost,
+            "latency_p50_ms": pct(latencies, 50),
+            "latency_p99_ms": pct(latencies, 99),
+            "latency_max_ms": round(latencies[-1], 3),
+            "p50_first_quarter_ms": pct(first, 50),
+            "p50_last_quarter_ms": pct(last_quarter, 50),
+        }
+
+
+def bench_jobs(n=40, processes=(1, 2, 4), threads=1, delay=0.5):
+    """작업 큐 처리량: 가짜 서버를 대상으로 워커 프로세스 수별 등록 → 완료 시간 (대화/분)."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    from fake_openai import start_fake_server
+    from jobs import JobQueue, run_workers
+
+    server, base_url = start_fake_server(delay=delay)
+    os.environ["OPENAI_API_BASE"] = base_url  # 워커 프로세스의 openai 가 import 될 때 읽음
+    results = []
+    try:
+        for count in processes:
+            with _scratch_dir():
+                queue = JobQueue()
+                job_id = queue.enqueue(_sample_personas(n), use_cache=False)
+                t0 = time.perf_counter()
+                run_workers(count, threads, stop_when_idle=True)
+                elapsed = time.perf_counter() - t0
+                job = queue.job(job_id)
+            results.append({
+                "processes": count,
+                "threads": threads,
+                "done": job["done"],
+                "failed": job["failed"],
+                "elapsed_sec": round(elapsed, 3),
+                "dialogues_per_min": round(job["done"] / elapsed * 60, 1),
+            })
+            print(f"processes={count} 완료", file=sys.stderr)
+    finally:
+        server.shutdown()
+        os.environ.pop("OPENAI_API_BASE", None)
+    base = results[0]["dialogues_per_min"] if results else 0
+    for row in results:
+        row["speedup"] = round(row["dialogues_per_min"] / base, 2) if base else None
+    return {"n": n, "server_delay_sec": delay, "jobs": results}
+
+
+def bench_batchfile(n=100000, chunk_size=1000):
+    """
+    오프라인 일괄 생성: 요청 파일 내보내기, 가짜 결과 파일 가져오기(검증/파싱/저장) 처리량과
+    메모리. 결과 파일을 한 줄씩 읽으므로 메모리는 파일 크기가 아니라 저장소 크기를 따라갑니다.
+    """
+    import resource
+    import tracemalloc
+    from batch_files import export_batch_requests, import_batch_results
+    from fake_openai import write_fake_batch_results
+
+    rng = random.Random(0)
+    vocab = _vocab(rng)
+    row = {"n": n}
+    with _scratch_dir():
+        personas = _sample_personas(n)
+        stats = {}
+        row["export_ms"] = _once_ms(lambda: stats.update(export_batch_requests(personas, "batch.jsonl")))
+        row["request_files"] = len(stats["files"])
+        t0 = time.perf_counter()
+        for i, path in enumerate(stats["files"]):
+            write_fake_batch_results(path, f"results.{i}.jsonl", fail_every=100, shuffle_seed=i,
+                                     content=lambda _: json.dumps(_diverse_dialogue(rng, vocab), ensure_ascii=False))
+        row["fake_results_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        results = [f"results.{i}.jsonl" for i in range(len(stats["files"]))]
+        row["results_mb"] = round(sum(os.path.getsize(p) for p in results) / 1e6, 2)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        report = import_batch_results(results, stats["personas"], chunk_size=chunk_size)
+        elapsed = time.perf_counter() - t0
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        row["import"] = {key: report[key] for key in ("lines", "saved", "failed", "near_duplicates")}
+        row["import"].update({"elapsed_sec": round(elapsed, 3), "lines_per_sec": round(report["lines"] / elapsed, 1),
+                              "max_rss_growth_mb": round(rss_growth / 1024, 1)})
+
+        # 다시 가져오기: 모두 이미 저장된 id 라 저장 없이 읽기/검증만 (스트리밍 경로 자체의 메모리)
+        tracemalloc.start()
+        row["reimport_ms"] = _once_ms(lambda: import_batch_results(results, stats["personas"], chunk_size=chunk_size))
+        row["reimport_peak_mem_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return {"batchfile": row, "note": "max_rss_growth_mb 에는 가져오면서 커지는 저장소 파싱 캐시와 유사 중복 색인이 포함됩니다."}
+
+
+def bench_validation(sizes=(10000, 100000), per_record_sample=1000):
+    """규칙 검사: 코퍼스 전체 한 번에(벡터화) vs 대화마다 따로, 저장까지 포함한 validate_store, 인라인 1건 지연."""
+    import storage
+    from validation import validate_dialogue, validate_records, validate_store
+
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        records = [synthetic_record(i, rng) for i in range(size)]
+        row = {"corpus_size": size}
+        ms = _once_ms(lambda: validate_records(records))
+        row["vectorized_ms"] = ms
+        row["vectorized_per_sec"] = round(size / (ms / 1000), 1)
+        sample = records[:per_record_sample]  # 대화별 검사는 느리므로 앞부분만 재서 처리량으로 비교
+        ms = _once_ms(lambda: [validate_dialogue(r["dialogue"]) for r in sample])
+        row["per_record_per_sec"] = round(len(sample) / (ms / 1000), 1)
+        row["speedup"] = round(row["vectorized_per_sec"] / row["per_record_per_sec"], 1)
+        with _scratch_dir():
+            store = storage.open_store("dialogues")
+            store.extend(records)
+            stats = {}
+            row["validate_store_ms"] = _once_ms(lambda: stats.update(validate_store(store)))
+            row["failed"] = stats["failed"]
+            row["revalidate_skip_ms"] = _once_ms(lambda: validate_store(store))
+            row["invalid_ids_ms"] = _once_ms(store.invalid_ids)
+        results.append(row)
+        print(f"size={size} 완료", file=sys.stderr)
+    inline = _latency_ms(lambda: validate_dialogue(records[0]["dialogue"]), 50)
+    return {"validation": results, "inline_one_dialogue": inline}
+
+
+def _resident_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def _memory_probe(mode, backend):
+    """새 프로세스에서 실행: 코퍼스 한 가지 표현을 만들어 두고 늘어난 상주 메모리(RSS)를 잽니다."""
+    import gc
+    import storage
+    from corpus import CompactCorpus, corpus_view
+
+    store = storage.open_store("dialogues", backend)
+    gc.collect()
+    before = _resident_mb()
+    t0 = time.perf_counter()
+    if mode == "dicts":
+        held = store.load_all()  # 지금의 load_all_dialogues() 결과
+    elif mode == "compact":
+        held = corpus_view(store)  # 화면들이 같이 쓰는 압축 코퍼스 (JSONL 은 파싱 캐시 포함)
+    else:
+        # 로그를 한 줄씩 읽어 바로 압축: 레코드 dict 를 한 번에 1000개만 들고 있음 (압축 표현 자체의 크기)
+        def chunks():
+            chunk = []
+            with open(store.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    op = json.loads(line)
+                    if op.get("op") != "add":
+                        continue
+                    chunk.append({**op["data"], "id": op["id"]})
+                    if len(chunk) == 1000:
+                        yield chunk
+                        chunk = []
+            if chunk:
+                yield chunk
+        held = CompactCorpus.from_chunks(chunks())
+    build_ms = round((time.perf_counter() - t0) * 1000, 1)
+    gc.collect()
+    row = {"records": len(held), "build_ms": build_ms, "rss_growth_mb": round(_resident_mb() - before, 1)}
+    if mode != "dicts":
+        row["buffers_mb"] = round(held.nbytes() / 1e6, 1)
+        row["record_1000_ms"] = _once_ms(lambda: held.records(range(1000)))
+        row["iter_chunks_ms"] = _once_ms(lambda: sum(len(c) for c in held.iter_chunks()))
+    if mode == "compact":
+        store.update_many({held.ids[0]: {"validation": {"ok": True, "violations": [], "version": 1}}})
+        row["refresh_after_update_ms"] = _once_ms(lambda: corpus_view(store))
+    print(json.dumps(row))
+
+
+def bench_memory(n=100000):
+    """
+    코퍼스 n 개를 들고 있는 데 드는 상주 메모리: 지금의 레코드 dict 목록(load_all) vs 압축 열 코퍼스.
+    표현마다 새 프로세스에서 재므로 서로의 캐시가 섞이지 않습니다.
+    """
+    import storage
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    rng = random.Random(0)
+    vocab = _vocab(rng)
+    results = {"n": n}
+    with _scratch_dir() as tmp:
+        jsonl = storage.open_store("dialogues", "jsonl")
+        for start in range(0, n, 10000):
+            chunk = []
+            for i in range(start, min(start + 10000, n)):
+                rec = synthetic_record(i, rng)
+                rec["dialogue"] = _diverse_dialogue(rng, vocab)
+                chunk.append(rec)
+            jsonl.extend(chunk)
+        results["log_mb"] = round(os.path.getsize(jsonl.path) / 1e6, 1)
+        storage.open_store("dialogues", "sqlite").count()  # 빈 SQLite 는 JSONL 로그를 그대로 이전해 옴
+        for backend, mode in (("jsonl", "dicts"), ("jsonl", "compact"), ("jsonl", "streamed"),
+                              ("sqlite", "dicts"), ("sqlite", "compact")):
+            code = (f"import os, sys; sys.path.insert(0, {here!r}); os.chdir({tmp!r}); "
+                    f"import benchmark; benchmark._memory_probe({mode!r}, {backend!r})")
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            results[f"{backend}_{mode}"] = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{backend} {mode} 완료", file=sys.stderr)
+    return {"memory": results,
+            "note": "jsonl_compact 는 저장소 파싱 캐시(레코드 dict)를 같이 들고 있어 streamed 보다 큽니다."}
+
+
+def bench_delta(sizes=(10000, 100000), updates=100, inserts=10, deletes=10, fmt="jsonl"):
+    """
+    체크포인트 이후 변경분 내보내기 vs 전체 내보내기 (백엔드/코퍼스 크기별).
+    전체를 내보내며 체크포인트를 찍은 뒤 평가 updates 건, 추가 inserts 건, 삭제 deletes 건을 하고
+    변경분만 내보냅니다. 변경분 시간은 코퍼스 크기와 거의 무관해야 합니다.
+    """
+    import storage
+    from delta_export import export_changes
+
+    rng = random.Random(0)
+    results = []
+    for size in sizes:
+        for backend in ("jsonl", "sqlite"):
+            row = {"corpus_size": size, "backend": backend}
+            with _scratch_dir():
+                store = storage.open_store("dialogues", backend)
+                for start in range(0, size, 10000):
+                    store.extend(synthetic_record(i, rng) for i in range(start, min(start + 10000, size)))
+                with open(f"full.{fmt}", "wb") as f:
+                    t0 = time.perf_counter()
+                    full = export_changes(store, fmt, f, checkpoint="base")
+                row["full_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                row["full_rows"] = full["rows"]
+
+                ids = store.ids()
+                for record_id in rng.sample(ids[:size // 2], updates):
+                    store.add_evaluation(record_id, {"evaluator": "bench", "match": "Y"})
+                store.extend(synthetic_record(size + i, rng) for i in range(inserts))
+                for record_id in rng.sample(ids[size // 2:], deletes):
+                    store.delete(record_id)
+
+                with open(f"delta.{fmt}", "wb") as f:
+                    t0 = time.perf_counter()
+                    delta = export_changes(store, fmt, f, since="base")
+                row["delta_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                row["delta_rows"] = delta["rows"]
+                row["delta_full_fallback"] = delta["full"]
+                row["speedup"] = round(row["full_ms"] / max(row["delta_ms"], 1e-3), 1)
+            results.append(row)
+            print(f"size={size} {backend} 완료", file=sys.stderr)
+    return {"delta": results}
+
+
+def _once_ms(fn):
+    t0 = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def bench_suite(sizes=(1000, 10000, 100000), repeat=20, csv_max=10000, generation_n=20):
+    """
+    저장/로드/평가 갱신/표 행 생성/CSV 내보내기/CSV 읽기 핫패스를 코퍼스 크기별로 측정하고,
+    가짜 OpenAI 서버로 생성 → 저장 end-to-end 시간을 잽니다. 결과는 JSON(ms 단위)입니다.
+    """
+    import storage
+    from export import build_rows, to_csv_bytes, GENERATED_COLUMNS
+    from ingest import read_csv_any_encoding
+    from utils import save_conversation_json, load_all_dialogues, update_evaluation
+
+    rng = random.Random(0)
+    vocab = _vocab(rng)
+    results = {}
+    for size in sizes:
+        corpus = [_diverse_record(i, rng, vocab) for i in range(size)]
+        row = {}
+        with _scratch_dir():
+            storage.open_store("dialogues").extend(corpus)
+            storage.clear_parse_cache()
+            row["load_all_dialogues_cold_ms"] = _once_ms(load_all_dialogues)
+            row["load_all_dialogues_warm_ms"] = _latency_ms(load_all_dialogues, repeat)["median_ms"]
+            # 앱에서는 시작할 때 백그라운드로 만드는 유사 중복 색인을 측정 전에 한 번 저장해 만들어 둠
+            save_conversation_json(_diverse_record(size, rng, vocab))
+            row["save_conversation_json_ms"] = _latency_ms(
+                lambda: save_conversation_json(_diverse_record(size, rng, vocab)), repeat)["median_ms"]
+            row["update_evaluation_ms"] = _latency_ms(
+                lambda: update_evaluation(rng.randrange(size), "Y", 6, 7, "bench"), repeat)["median_ms"]
+
+            data = load_all_dialogues()
+            rows = []
+            row["build_rows_ms"] = _once_ms(lambda: rows.extend(build_rows(data)))
+            csv_bytes = []
+            row["csv_export_ms"] = _once_ms(lambda: csv_bytes.append(to_csv_bytes(rows, GENERATED_COLUMNS)))
+            row["csv_export_mb"] = round(len(csv_bytes[0]) / 1e6, 2)
+            if size <= csv_max:
+                row["read_csv_any_encoding_ms"] = _once_ms(lambda: read_csv_any_encoding(io.BytesIO(csv_bytes[0])))
+        results[str(size)] = row
+        print(f"size={size} 완료", file=sys.stderr)
+
+    generation = bench_generation(n=generation_n, workers=8, delay=0.0)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+        "generation": {
+            "serial_dialogues_per_min": generation["serial"]["dialogues_per_min"],
+            "batch_dialogues_per_min": generation["batch"]["dialogues_per_min"],
+        },
+    }
+
+
+def compare_results(old, new, threshold=0.2):
+    """두 suite 결과의 *_ms 지표를 비교해 threshold(비율) 이상 느려진 항목을 표시합니다."""
+    rows, regressions = [], 0
+    for size, new_metrics in new.get("results", {}).items():
+        old_metrics = old.get("results", {}).get(size, {})
+        for metric, value in new_metrics.items():
+            if not metric.endswith("_ms") or metric not in old_metrics or not old_metrics[metric]:
+                continue
+            change = value / old_metrics[metric] - 1
+            regressed = change > threshold
+            regressions += regressed
+            rows.append({"size": size, "metric": metric, "old": old_metrics[metric], "new": value,
+                         "change": round(change, 3), "regressed": regressed})
+    return {"threshold": threshold, "regressions": regressions, "rows": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="성능 측정")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("generation", help="직렬 vs 일괄 생성 처리량 (가짜 서버)")
+    p.add_argument("--n", type=int, default=40)
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--delay", type=float, default=0.5)
+
+    p = sub.add_parser("storage", help="코퍼스 크기별 저장 지연")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    p.add_argument("--repeat", type=int, default=20)
+
+    p = sub.add_parser("streaming", help="첫 턴 표시 시간 (가짜 서버)")
+    p.add_argument("--n", type=int, default=5)
+    p.add_argument("--delay", type=float, default=2.0)
+
+    p = sub.add_parser("imports", help="headless vs 앱 import 시간")
+    p.add_argument("--repeat", type=int, default=5)
+
+    p = sub.add_parser("export", help="형식별 스트리밍 내보내기 처리량/최대 메모리")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    p.add_argument("--chunk-size", type=int, default=1000)
+
+    p = sub.add_parser("ingest", help="큰 CP949/UTF-8-sig CSV 업로드 읽기 시간")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--no-legacy", action="store_true", help="이전 함수 측정 생략")
+
+    p = sub.add_parser("parse", help="업로드 대화 컬럼 변환 처리량")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--workers", type=int, default=4)
+
+    p = sub.add_parser("merge", help="자체 대화 병합 업로드 시간 (코퍼스 크기별)")
+    p.add_argument("--corpus", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--upload", type=int, default=20000)
+
+    p = sub.add_parser("neardup", help="유사 중복 검사 속도와 재현율")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+
+    p = sub.add_parser("categories", help="페르소나 탭 콜드 스타트: 엑셀 파싱 vs 계층 사이드카")
+    p.add_argument("--repeat", type=int, default=5)
+
+    p = sub.add_parser("aggregates", help="평가 집계 쓰기/읽기 지연 vs 전체 재집계")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+
+    p = sub.add_parser("evaluators", help="여러 평가자 동시 저장 부하 시험 (유실 수, 지연)")
+    p.add_argument("--processes", type=int, default=4)
+    p.add_argument("--threads", type=int, default=4, help="프로세스당 평가자 수")
+    p.add_argument("--writes", type=int, default=100, help="평가자당 저장 수")
+    p.add_argument("--hot", type=int, default=50, help="평가가 몰리는 레코드 수")
+    p.add_argument("--backend", choices=["jsonl", "sqlite"], default="jsonl")
+    p.add_argument("--legacy", action="store_true", help="읽고-합치고-쓰는 이전 방식으로 측정")
+
+    p = sub.add_parser("jobs", help="작업 큐 워커 수별 처리량 (가짜 서버)")
+    p.add_argument("--n", type=int, default=40)
+    p.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--delay", type=float, default=0.5)
+
+    p = sub.add_parser("batchfile", help="오프라인 일괄 생성 요청 내보내기/결과 가져오기 처리량과 메모리")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--chunk-size", type=int, default=1000)
+
+    p = sub.add_parser("validation", help="규칙 자동 검사: 벡터화 vs 대화별, 저장 포함 전체 검사")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+
+    p = sub.add_parser("startup", help="앱 콜드 스타트: 메뉴별 first paint, import 프로파일 (예산 초과 시 종료 코드 1)")
+    p.add_argument("--menus", nargs="+", choices=list(APP_MENUS), default=list(APP_MENUS))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--budget-ms", type=float, default=FIRST_PAINT_BUDGET_MS)
+
+    p = sub.add_parser("memory", help="코퍼스 상주 메모리: 레코드 dict 목록 vs 압축 열 코퍼스")
+    p.add_argument("--n", type=int, default=100000)
+
+    p = sub.add_parser("delta", help="체크포인트 이후 변경분 내보내기 vs 전체 내보내기 (백엔드별)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--format", default="jsonl", choices=["csv", "jsonl", "parquet"])
+
+    p = sub.add_parser("suite", help="전체 핫패스 측정 (JSON 출력)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--csv-max", type=int, default=10000, help="이 크기 이하에서만 read_csv_any_encoding 측정")
+    p.add_argument("--out", help="결과 JSON 파일 경로")
+
+    p = sub.add_parser("compare", help="두 suite 결과 비교 (느려진 항목이 있으면 종료 코드 1)")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "generation":
+        result = bench_generation(args.n, args.workers, args.delay)
+    elif args.cmd == "storage":
+        result = bench_storage(args.sizes, args.repeat)
+    elif args.cmd == "streaming":
+        result = bench_streaming(args.n, args.delay)
+    elif args.cmd == "imports":
+        result = bench_imports(args.repeat)
+    elif args.cmd == "export":
+        result = bench_export(args.sizes, args.chunk_size)
+    elif args.cmd == "ingest":
+        result = bench_ingest(args.rows, legacy=not args.no_legacy)
+    elif args.cmd == "parse":
+        result = bench_parse(args.rows, args.workers)
+    elif args.cmd == "merge":
+        result = bench_merge(args.corpus, args.upload)
+    elif args.cmd == "neardup":
+        result = bench_neardup(args.sizes)
+    elif args.cmd == "categories":
+        result = bench_categories(args.repeat)
+    elif args.cmd == "aggregates":
+        result = bench_aggregates(args.sizes)
+    elif args.cmd == "evaluators":
+        result = bench_evaluators(args.processes, args.threads, args.writes, hot=args.hot,
+                                  backend=args.backend, legacy=args.legacy)
+    elif args.cmd == "jobs":
+        result = bench_jobs(args.n, args.processes, args.threads, args.delay)
+    elif args.cmd == "batchfile":
+        result = bench_batchfile(args.n, args.chunk_size)
+    elif args.cmd == "validation":
+        result = bench_validation(args.sizes)
+    elif args.cmd == "startup":
+        result = bench_startup(args.menus, args.repeat, args.budget_ms)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 1 if result["over_budget"] else 0
+    elif args.cmd == "memory":
+        result = bench_memory(args.n)
+    elif args.cmd == "delta":
+        result = bench_delta(args.sizes, fmt=args.format)
+    elif args.cmd == "suite":
+        result = bench_suite(args.sizes, args.repeat, args.csv_max)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+    elif args.cmd == "compare":
+        with open(args.old, encoding="utf-8") as f_old, open(args.new, encoding="utf-8") as f_new:
+            result = compare_results(json.load(f_old), json.load(f_new), args.threshold)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 1 if result["regressions"] else 0
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
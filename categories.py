@@ -0,0 +1,91 @@
+"""
+KTAS 카테고리 계층 로더 (Streamlit 비의존).
+
+엑셀(openpyxl) 파싱과 groupby 재구성은 서버를 다시 띄울 때마다 비용이 크므로,
+한 번 만든 계층을 엑셀 옆의 JSON 사이드카(<엑셀 이름>.hierarchy.json)에 저장해 두고
+다음부터는 그 파일만 읽습니다. 사이드카에는 원본 엑셀 내용의 해시를 함께 적어 두어
+엑셀이 바뀌면 자동으로 다시 만듭니다. pandas/openpyxl 은 다시 만들 때만 불러옵니다.
+"""
+import hashlib
+import json
+import os
+
+EXCEL_PATH = os.path.join("data", "GT_KTAS카테고리_분류.xlsx")
+AGES = ["15세 이상", "15세 미만"]
+SIDECAR_FORMAT = 1  # 계층 구성 방식이 바뀌면 올려서 기존 사이드카를 무효화
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".hierarchy.json"
+
+
+def source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def load_category_table(path):
+    import pandas as pd
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"엑셀 파일을 찾을 수 없습니다: {path}")
+
+    df = pd.read_excel(path, usecols=["나이", "대분류", "중분류"])
+    return df.astype(str).apply(lambda s: s.str.strip())
+
+
+def build_hierarchy(df):
+    """
+    { "15세 이상": {"물질오용": [...], "정신건강": [...]}, "15세 미만": {...} }
+    """
+    tree = {}
+    for age_val, dfa in df.groupby("나이"):
+        if age_val not in AGES:
+            continue
+        main_map = {}
+        for main_val, dfm in dfa.groupby("대분류"):
+            mids = sorted(dfm["중분류"].dropna().unique().tolist())
+            main_map[main_val] = mids
+        tree[age_val] = main_map
+    return tree
+
+
+def _read_sidecar(path, digest):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != SIDECAR_FORMAT or data.get("source_hash") != digest:
+        return None
+    return data.get("hierarchy")
+
+
+def _write_sidecar(path, digest, hierarchy):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": SIDECAR_FORMAT, "source_hash": digest, "hierarchy": hierarchy},
+                      f, ensure_ascii=False)
+        os.replace(tmp, path)  # 동시에 띄운 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록
+    except OSError:
+        # 읽기 전용 위치면 사이드카 없이 계속 (매번 엑셀을 읽을 뿐)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_hierarchy(path=EXCEL_PATH, rebuild=False):
+    """카테고리 계층. 사이드카가 원본 엑셀과 맞으면 그대로, 아니면 엑셀에서 다시 만들어 저장합니다."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"엑셀 파일을 찾을 수 없습니다: {path}")
+    digest = source_hash(path)
+    side = sidecar_path(path)
+    if not rebuild:
+        hierarchy = _read_sidecar(side, digest)
+        if hierarchy is not None:
+            return hierarchy
+    hierarchy = build_hierarchy(load_category_table(path))
+    _write_sidecar(side, digest, hierarchy)
+    return hierarchy
@@ -0,0 +1,453 @@
+"""
+Streamlit 없이 쓰는 명령행 도구 (일괄 생성, 내보내기, 요약).
+
+    python cli.py generate --age "15세 이상" --gender 남성 여성 --category 호흡기:호흡곤란 --ktas 1 2 3 --repeat 2
+    python cli.py generate --personas personas.json --workers 16
+    python cli.py generate --category 호흡기:호흡곤란 --repeat 5 --queue   # 작업 큐에 등록만
+    python cli.py worker --processes 4 --threads 2
+    python cli.py jobs
+    python cli.py batch-export --category 호흡기:호흡곤란 --repeat 5 --out batch/batch.jsonl
+    python cli.py batch-import batch/results.jsonl --personas batch/batch.personas.jsonl
+    python cli.py export --collection dialogues --out dialogues.csv
+    python cli.py export --collection dialogues --out dialogues.parquet --format parquet
+    python cli.py export --collection dialogues --out delta.jsonl --since 2026-10-17 --checkpoint 2026-10-18
+    python cli.py checkpoints --collection dialogues
+    python cli.py summary --collection dialogues --by evaluator ktas_level
+    python cli.py compact --collection own_dialogues
+    python cli.py import uploads.csv --collection own_dialogues --workers 8
+    python cli.py metrics
+    python cli.py near-dups --collection dialogues --threshold 0.8
+    python cli.py validate --collection dialogues
+    python cli.py near-dups --file data/dialogues.json.bak
+    python cli.py categories --rebuild
+    python cli.py schedule --target 3 --budget 200 --dry-run
+
+OPENAI_API_KEY 등 설정은 환경변수나 .env 에서 읽습니다 (config.py).
+무거운 모듈(openai, pandas)은 각 명령 안에서 필요할 때만 불러옵니다.
+"""
+import argparse
+import json
+import sys
+
+COLLECTIONS = ["dialogues", "own_dialogues"]
+EXCEL_PATH = "data/GT_KTAS카테고리_분류.xlsx"
+
+
+def _parse_category(value):
+    main, sep, middle = value.partition(":")
+    if not sep or not main or not middle:
+        raise argparse.ArgumentTypeError(f"'대분류:중분류' 형식이어야 합니다: {value}")
+    return main, middle
+
+
+def _enqueue(personas, kind, timeout, use_cache):
+    from jobs import JobQueue
+
+    queue = JobQueue()
+    job_id = queue.enqueue(personas, kind=kind, label=f"{len(personas)}개 (CLI)", timeout=timeout, use_cache=use_cache)
+    print(json.dumps({"job_id": job_id, "tasks": len(personas), "live_workers": len(queue.live_workers())},
+                     ensure_ascii=False, indent=2))
+    return 0
+
+
+def _personas_from_args(args):
+    from batch_generation import persona_grid
+
+    if args.personas:
+        with open(args.personas, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if not args.category:
+        raise SystemExit("--personas 또는 --category 중 하나는 필요합니다.")
+    return persona_grid(args.age, args.gender, args.category, args.ktas, repeat=args.repeat)
+
+
+def _add_persona_args(p):
+    p.add_argument("--personas", help="페르소나 목록 JSON 파일 ([{age, gender, main_category, middle_category, ktas_level}, ...])")
+    p.add_argument("--age", nargs="+", default=["15세 이상"])
+    p.add_argument("--gender", nargs="+", default=["남성", "여성"])
+    p.add_argument("--category", nargs="+", type=_parse_category, help="대분류:중분류 (여러 개 가능)")
+    p.add_argument("--ktas", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+    p.add_argument("--repeat", type=int, default=1)
+
+
+def cmd_generate(args):
+    from batch_generation import generate_batch
+
+    personas = _personas_from_args(args)
+
+    def on_result(done, total, persona, result, error):
+        if error is not None:
+            print(f"[{done}/{total}] 실패: {error}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"[{done}/{total}] 완료", file=sys.stderr)
+
+    if args.queue:
+        return _enqueue(personas, "batch", args.timeout, not args.no_cache)
+
+    report = generate_batch(personas, max_workers=args.workers, timeout=args.timeout,
+                            use_cache=not args.no_cache, on_result=on_result)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+def cmd_batch_export(args):
+    from batch_files import export_batch_requests
+
+    stats = export_batch_requests(_personas_from_args(args), args.out, max_per_file=args.max_per_file,
+                                  skip_existing=not args.include_existing)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_batch_import(args):
+    from batch_files import import_batch_results
+
+    def on_progress(lines, saved):
+        if not args.quiet:
+            print(f"{lines}줄 처리, {saved}개 저장", file=sys.stderr)
+
+    stats = import_batch_results(args.results, args.personas, chunk_size=args.chunk_size, on_progress=on_progress)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0 if stats["failed"] == 0 else 1
+
+
+def cmd_export(args):
+    import os
+    from export import EXPORT_FORMATS, export_store
+    from storage import open_store
+
+    fmt = args.format or os.path.splitext(args.out)[1].lstrip(".").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise SystemExit(f"--format 을 지정하세요 ({', '.join(EXPORT_FORMATS)})")
+    if args.since or args.checkpoint:
+        # 변경분 내보내기: 체크포인트 이후 추가/수정/삭제만 (id, 변경 종류, 수정 시각 열이 붙음)
+        from delta_export import export_changes, load_checkpoints
+
+        store = open_store(args.collection)
+        if args.since and args.since not in load_checkpoints(store):
+            raise SystemExit(f"체크포인트가 없습니다: {args.since}")
+        # 임시 파일에 다 쓴 뒤 바꿔 넣음 (중간에 실패해도 이전 내보내기 파일이 남음)
+        tmp = args.out + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                stats = export_changes(store, fmt, f, since=args.since, source=args.collection,
+                                       checkpoint=args.checkpoint, chunk_size=args.chunk_size)
+            os.replace(tmp, args.out)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        if stats["full"] and args.since:
+            print(f"체크포인트 {args.since} 이후 저장소가 통째로 바뀌어 전체를 내보냈습니다.", file=sys.stderr)
+        print(f"{stats['rows']}개 행을 {args.out} 에 저장했습니다.", file=sys.stderr)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+    # 저장소에서 묶음 단위로 읽어 바로 파일에 씀 (CSV 는 탭의 다운로드와 같은 utf-8-sig)
+    stats = export_store(open_store(args.collection), fmt, args.out, args.collection,
+                         chunk_size=args.chunk_size, trace_memory=args.trace_memory)
+    print(f"{stats['rows']}개 행을 {args.out} 에 저장했습니다.", file=sys.stderr)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_summary(args):
+    from aggregates import evaluation_aggregates
+    from storage import open_store
+
+    store = open_store(args.collection)
+    agg = evaluation_aggregates(store)
+    summary = {"collection": args.collection, "count": store.count(), "ktas": agg.ktas_summary(),
+               "evaluations": agg.overall()}
+    for kind in args.by:
+        summary[f"by_{kind}"] = agg.breakdown(kind)
+    summary["agreement"] = agg.agreement()
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+def cmd_checkpoints(args):
+    from delta_export import delete_checkpoint, load_checkpoints, save_checkpoint
+    from storage import open_store
+
+    store = open_store(args.collection)
+    if args.delete:
+        if not delete_checkpoint(store, args.delete):
+            raise SystemExit(f"체크포인트가 없습니다: {args.delete}")
+    if args.save:
+        save_checkpoint(store, args.save)  # 내보내지 않고 지금 위치만 기록
+    print(json.dumps(load_checkpoints(store), ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_compact(args):
+    from storage import open_store
+
+    n = open_store(args.collection).compact()
+    print(f"{args.collection}: {n}개 레코드로 정리했습니다.", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args):
+    import os
+
+    from dedup import merge_into
+    from ingest import find_dialogue_column, ingest_dialogues, read_csv_any_encoding
+    from storage import open_store
+
+    with open(args.file, "rb") as f:
+        df = read_csv_any_encoding(f)
+    dialogue_col = find_dialogue_column(df)
+    if dialogue_col is None:
+        raise SystemExit("대화 컬럼을 찾지 못했습니다. 예: 'dialogue', '생성한 대화', '대화'")
+    # 대화 JSON 디코딩은 여기서만 프로세스 풀로 나눔 (앱의 업로드 화면은 한 프로세스)
+    own_list, errors = ingest_dialogues(df, dialogue_col, workers=args.workers or os.cpu_count() or 1)
+    store = open_store(args.collection)
+    if args.replace:
+        result = {"replaced": len(store.replace_all(own_list))}
+    else:
+        result = merge_into(store, own_list)
+        del result["ids"]
+    result["errors"] = len(errors)
+    result["error_examples"] = [{"row": e["row"] + 1, "error": e["error"]} for e in errors[:20]]
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_metrics(args):
+    from telemetry import load_metrics, summarize
+
+    records = load_metrics()
+    if args.kind:
+        records = [r for r in records if r.get("kind") == args.kind]
+    print(json.dumps(summarize(records), ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_near_dups(args):
+    from near_duplicates import cluster, cluster_store
+    from storage import open_store
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+        records = json.loads(text) if text.lstrip().startswith("[") else [json.loads(l) for l in text.splitlines() if l.strip()]
+        groups = cluster(records, args.threshold)
+        total = len(records)
+    else:
+        store = open_store(args.collection)
+        groups = cluster_store(store, args.threshold)
+        total = store.count()
+    print(json.dumps({
+        "dialogues": total,
+        "clusters": len(groups),
+        "dialogues_in_clusters": sum(len(g) for g in groups),
+        "removable": sum(len(g) - 1 for g in groups),
+        "largest": groups[:args.top],
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_validate(args):
+    from storage import open_store
+    from validation import RULES, validate_store
+
+    def on_progress(stats):
+        if not args.quiet:
+            print(f"{stats['checked']}개 검사 (위반 {stats['failed']}개)", file=sys.stderr)
+
+    stats = validate_store(open_store(args.collection), revalidate=args.revalidate, on_progress=on_progress)
+    stats["violations"] = {RULES[rule]: n for rule, n in stats["violations"].items()}
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_categories(args):
+    import categories
+
+    hierarchy = categories.load_hierarchy(args.excel, rebuild=args.rebuild)
+    print(json.dumps({
+        "sidecar": categories.sidecar_path(args.excel),
+        "ages": len(hierarchy),
+        "main_categories": sum(len(m) for m in hierarchy.values()),
+        "middle_categories": sum(len(mids) for m in hierarchy.values() for mids in m.values()),
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_schedule(args):
+    import categories
+    from jobs import queued_personas
+    from scheduler import coverage_report, coverage_tracker, grid_cells, planned_counts, work_queue
+    from utils import store
+
+    hierarchy = categories.load_hierarchy(args.excel)
+    cells = grid_cells(hierarchy, args.gender, args.ktas, ages=args.age, main_categories=args.main)
+    tracker = coverage_tracker(store)
+    counts = planned_counts(tracker.counts, queued_personas())  # 큐에서 생성 중인 것도 채워진 것으로 봄
+    rows = coverage_report(cells, counts, args.target)
+    queue = work_queue(cells, counts, args.target, budget=args.budget)
+    print(json.dumps({
+        "cells": len(cells),
+        "filled": sum(1 for r in rows if not r["deficit"]),
+        "deficit": sum(r["deficit"] for r in rows),
+        "queued": len(queue),
+    }, ensure_ascii=False, indent=2), file=sys.stderr)
+    if args.dry_run:
+        print(json.dumps(queue, ensure_ascii=False, indent=2))
+        return 0
+    if args.queue:
+        return _enqueue(queue, "coverage", args.timeout, False)
+
+    from batch_generation import generate_batch
+
+    def on_result(done, total, persona, result, error):
+        if error is not None:
+            print(f"[{done}/{total}] 실패: {error}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"[{done}/{total}] 완료", file=sys.stderr)
+
+    # 이미 있는 셀에 새 대화를 더하는 것이므로 캐시는 쓰지 않음
+    report = generate_batch(queue, max_workers=args.workers, timeout=args.timeout, use_cache=False,
+                            on_result=on_result, on_saved=tracker.observe)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+def cmd_worker(args):
+    from jobs import run_workers
+
+    done = run_workers(args.processes, args.threads, stop_when_idle=args.until_idle)
+    print(f"처리한 태스크 {done}개", file=sys.stderr)
+    return 0
+
+
+def cmd_jobs(args):
+    from jobs import JobQueue
+
+    queue = JobQueue()
+    if args.cancel is not None:
+        print(f"작업 {args.cancel}: {queue.cancel(args.cancel)}개 태스크 취소", file=sys.stderr)
+    if args.retry is not None:
+        print(f"작업 {args.retry}: {queue.retry_failed(args.retry)}개 태스크 재시도", file=sys.stderr)
+    print(json.dumps({"live_workers": queue.live_workers(), "jobs": queue.jobs(args.limit)},
+                     ensure_ascii=False, indent=2))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="응급실 대화 생성 TOOL (headless)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("generate", help="페르소나 그리드/목록으로 대화 일괄 생성")
+    _add_persona_args(p)
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--timeout", type=float, default=120)
+    p.add_argument("--no-cache", action="store_true", help="응답 캐시를 쓰지 않고 새로 생성")
+    p.add_argument("--queue", action="store_true", help="바로 생성하지 않고 작업 큐에 등록 (cli.py worker 가 처리)")
+    p.add_argument("--quiet", action="store_true")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("batch-export", help="오프라인 일괄 생성용 요청 JSONL(Batch API 형식)과 페르소나 사이드카 쓰기")
+    _add_persona_args(p)
+    p.add_argument("--out", required=True, help="요청 파일 경로 (사이드카는 <이름>.personas.jsonl)")
+    p.add_argument("--max-per-file", type=int, default=50_000, help="넘으면 <이름>.001.jsonl ... 로 나눔")
+    p.add_argument("--include-existing", action="store_true", help="이미 가져왔거나 유사 중복으로 거부된 custom_id 도 다시 요청")
+    p.set_defaults(func=cmd_batch_export)
+
+    p = sub.add_parser("batch-import", help="Batch 결과 JSONL 을 검증/파싱해 저장")
+    p.add_argument("results", nargs="+", help="결과 파일 (여러 개 가능)")
+    p.add_argument("--personas", required=True, help="batch-export 가 쓴 페르소나 사이드카 (<이름>.personas.jsonl)")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.add_argument("--quiet", action="store_true")
+    p.set_defaults(func=cmd_batch_import)
+
+    p = sub.add_parser("export", help="저장된 대화를 CSV/JSONL/Parquet 로 내보내기")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.add_argument("--out", required=True)
+    p.add_argument("--format", choices=["csv", "jsonl", "parquet"], help="생략하면 --out 확장자로 판단")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.add_argument("--trace-memory", action="store_true", help="tracemalloc 으로 최대 메모리 측정 (느려짐)")
+    p.add_argument("--since", help="이 체크포인트 이후 변경분만 내보내기")
+    p.add_argument("--checkpoint", help="내보낸 위치를 이 이름의 체크포인트로 저장")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("checkpoints", help="변경분 내보내기 체크포인트 목록/저장/삭제")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.add_argument("--save", metavar="NAME", help="지금 위치를 이 이름으로 저장")
+    p.add_argument("--delete", metavar="NAME")
+    p.set_defaults(func=cmd_checkpoints)
+
+    p = sub.add_parser("summary", help="대화 수, 평가 집계, 평가자 간 일치도 요약")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.add_argument("--by", nargs="+", default=["evaluator"], choices=["evaluator", "ktas_level", "main_category", "cell"],
+                   help="구분별 집계")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("compact", help="저장소 로그 정리")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("import", help="자체 대화 파일(CSV/엑셀)을 저장소에 병합 (큰 파일은 여러 프로세스로 파싱)")
+    p.add_argument("file")
+    p.add_argument("--collection", choices=COLLECTIONS, default="own_dialogues")
+    p.add_argument("--workers", type=int, help="대화 JSON 디코딩 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--replace", action="store_true", help="병합하지 않고 컬렉션 전체를 교체")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("near-dups", help="유사 중복 대화 묶음 찾기 (MinHash/LSH)")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.add_argument("--file", help="저장소 대신 JSON 배열/JSONL 파일(예: 이전 dialogues.json)을 검사")
+    p.add_argument("--threshold", type=float, default=0.8)
+    p.add_argument("--top", type=int, default=10, help="출력할 큰 묶음 수")
+    p.set_defaults(func=cmd_near_dups)
+
+    p = sub.add_parser("validate", help="생성 규칙 자동 검사 (첫 발화, 턴 수, 화자 쌍, 한국어, 한 질문에 한 정보)")
+    p.add_argument("--collection", choices=COLLECTIONS, default="dialogues")
+    p.add_argument("--revalidate", action="store_true", help="이미 검사한 대화도 다시 검사")
+    p.add_argument("--quiet", action="store_true")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("metrics", help="생성 호출 지연/토큰/비용 요약 (data/metrics.jsonl)")
+    p.add_argument("--kind", choices=["generate", "stream"])
+    p.set_defaults(func=cmd_metrics)
+
+    p = sub.add_parser("categories", help="카테고리 계층 사이드카 확인/재생성")
+    p.add_argument("--excel", default=EXCEL_PATH)
+    p.add_argument("--rebuild", action="store_true", help="해시가 같아도 엑셀에서 다시 만들기")
+    p.set_defaults(func=cmd_categories)
+
+    p = sub.add_parser("schedule", help="커버리지가 부족한 카테고리 조합부터 대화 생성")
+    p.add_argument("--excel", default=EXCEL_PATH)
+    p.add_argument("--target", type=int, default=3, help="조합당 목표 대화 수")
+    p.add_argument("--budget", type=int, help="이번에 생성할 최대 수")
+    p.add_argument("--age", nargs="+", help="생략하면 전체")
+    p.add_argument("--main", nargs="+", help="대분류 (생략하면 전체)")
+    p.add_argument("--gender", nargs="+", default=["남성", "여성"])
+    p.add_argument("--ktas", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--timeout", type=float, default=120)
+    p.add_argument("--dry-run", action="store_true", help="생성하지 않고 작업 목록만 출력")
+    p.add_argument("--queue", action="store_true", help="바로 생성하지 않고 작업 큐에 등록")
+    p.add_argument("--quiet", action="store_true")
+    p.set_defaults(func=cmd_schedule)
+
+    p = sub.add_parser("worker", help="작업 큐 워커 실행 (생성 작업을 가져가 처리)")
+    p.add_argument("--processes", type=int, default=2)
+    p.add_argument("--threads", type=int, default=1, help="프로세스당 동시 처리 태스크 수")
+    p.add_argument("--until-idle", action="store_true", help="남은 태스크가 없으면 종료")
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser("jobs", help="작업 큐 상태 확인 / 취소 / 실패 재시도")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--cancel", type=int, metavar="JOB_ID")
+    p.add_argument("--retry", type=int, metavar="JOB_ID")
+    p.set_defaults(func=cmd_jobs)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
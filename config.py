@@ -0,0 +1,26 @@
+"""
+실행 설정. Streamlit 없이도(스크립트, cron, 워커) 동작하도록 환경변수와 .env 에서 읽습니다.
+
+우선순위: 환경변수 → .env → (Streamlit 앱 안에서 실행 중일 때만) st.secrets
+"""
+import os
+import sys
+
+from dotenv import find_dotenv, load_dotenv
+
+# 현재 작업 디렉터리 쪽 .env 를 먼저, 그다음 프로젝트 폴더의 .env (이미 있는 값은 덮어쓰지 않음)
+load_dotenv(find_dotenv(usecwd=True))
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+
+def get_openai_api_key():
+    key = os.environ.get("OPENAI_API_KEY")
+    if key:
+        return key
+    if "streamlit" in sys.modules:
+        import streamlit as st
+        try:
+            return st.secrets["OPENAI_API_KEY"]
+        except (KeyError, FileNotFoundError):
+            pass
+    raise RuntimeError("OPENAI_API_KEY 가 없습니다. 환경변수, .env 또는 .streamlit/secrets.toml 에 설정하세요.")
@@ -0,0 +1,247 @@
+"""
+대화 코퍼스의 압축 열(columnar) 표현 (Streamlit 비의존).
+
+레코드마다 {"turn", "speaker", "utterance"} dict 목록을 들고 있는 대신
+- 턴 번호: int16 배열, 화자: int8 코드 배열 + 화자 이름 표(같은 문자열 하나만 보관)
+- 발화: UTF-8 버퍼 하나 + 시작 위치(offset) 배열
+- 페르소나 필드: 범주(categorical) 코드 배열 + 범주 목록
+- 대화별 턴 범위: offset 배열
+으로 보관합니다. 평가/검사 결과처럼 작고 바뀌는 필드는 레코드별 작은 dict(extras)로 둡니다.
+
+목록/평가/내보내기 화면은 저장소별로 하나인 corpus_view(store)를 읽기 전용으로 같이 쓰고,
+필요한 레코드만 record()/get_many()/iter_chunks() 로 지금 쓰는 dict 형식으로 되돌립니다 (매번 새 dict).
+대화 본문은 저장 후 바뀌지 않으므로 저장소가 바뀌면 새 id 의 본문만 읽고,
+평가 같은 가벼운 필드는 store.light_records() 로 다시 맞춥니다 (지난번과 같은 객체인 레코드는 건너뜀).
+삭제가 있으면 새로 만듭니다.
+"""
+import os
+import threading
+from array import array
+
+PERSONA_FIELDS = ("age", "gender", "main_category", "middle_category", "ktas_level")
+TURN_KEYS = ("turn", "speaker", "utterance")
+INT16_MAX = 32767
+CHUNK_SIZE = 1000
+
+
+def _compactable(dialogue):
+    """턴 목록이고 모든 턴이 정확히 {turn(int), speaker(str), utterance(str)} 이면 열로 보관할 수 있음."""
+    if not isinstance(dialogue, list):
+        return False
+    for t in dialogue:
+        if (type(t) is not dict or len(t) != 3 or type(t.get("turn")) is not int
+                or type(t.get("speaker")) is not str or type(t.get("utterance")) is not str
+                or not -INT16_MAX <= t["turn"] <= INT16_MAX):
+            return False
+    return True
+
+
+class CompactCorpus:
+    def __init__(self):
+        self.ids = []
+        self.index = {}  # id → 행 번호
+        self.persona_codes = {field: array("h") for field in PERSONA_FIELDS}  # -1 = 없음
+        self.categories = {field: [] for field in PERSONA_FIELDS}
+        self._category_index = {field: {} for field in PERSONA_FIELDS}
+        self.dialogue_offsets = array("q", [0])  # 행 i 의 턴은 [offsets[i], offsets[i+1])
+        self.turns = array("h")
+        self.speaker_codes = array("b")
+        self.speakers = []
+        self._speaker_index = {}
+        self.text = bytearray()  # 모든 발화의 UTF-8 바이트
+        self.text_offsets = array("q", [0])
+        self.raw = {}  # 행 번호 → 열로 보관할 수 없는 대화(자체 업로드 원문 등) 그대로
+        self.extras = []  # 행 번호 → persona/dialogue/id 외 필드 dict (없으면 None)
+
+    @classmethod
+    def from_records(cls, records):
+        corpus = cls()
+        corpus.extend(records)
+        return corpus
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        corpus = cls()
+        for chunk in chunks:
+            corpus.extend(chunk)
+        return corpus
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, record_id):
+        return record_id in self.index
+
+    # ---------- 쓰기 ----------
+    def _code(self, field, value):
+        index = self._category_index[field]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return code
+
+    def _speaker(self, name):
+        code = self._speaker_index.get(name)
+        if code is None:
+            code = self._speaker_index[name] = len(self.speakers)
+            self.speakers.append(name)
+        return code
+
+    @staticmethod
+    def _persona_ok(persona):
+        return isinstance(persona, dict) and set(persona) <= set(PERSONA_FIELDS)
+
+    def _extras(self, rec):
+        extra = {k: v for k, v in rec.items() if k not in ("id", "persona", "dialogue")}
+        if "persona" in rec and not self._persona_ok(rec["persona"]):
+            extra["persona"] = rec["persona"]  # 다섯 필드 외의 키가 있는 페르소나는 그대로 보관
+        return extra or None
+
+    def extend(self, records):
+        for rec in records:
+            row = len(self.ids)
+            self.ids.append(rec["id"])
+            self.index[rec["id"]] = row
+
+            persona = rec.get("persona")
+            persona_ok = self._persona_ok(persona)
+            for field in PERSONA_FIELDS:
+                codes = self.persona_codes[field]
+                codes.append(self._code(field, persona[field]) if persona_ok and field in persona else -1)
+
+            dialogue = rec.get("dialogue")
+            if _compactable(dialogue):
+                for t in dialogue:
+                    self.turns.append(t["turn"])
+                    self.speaker_codes.append(self._speaker(t["speaker"]))
+                    self.text += t["utterance"].encode("utf-8")
+                    self.text_offsets.append(len(self.text))
+            elif "dialogue" in rec:
+                self.raw[row] = dialogue
+            self.dialogue_offsets.append(len(self.turns))
+            self.extras.append(self._extras(rec))
+
+    def set_extras(self, rec):
+        """평가/검사 결과 등 가벼운 필드만 바꿉니다 (본문과 페르소나는 그대로)."""
+        row = self.index.get(rec["id"])
+        if row is not None:
+            self.extras[row] = self._extras(rec)
+
+    # ---------- 읽기 ----------
+    def persona(self, row):
+        persona = {}
+        for field in PERSONA_FIELDS:
+            code = self.persona_codes[field][row]
+            if code >= 0:
+                persona[field] = self.categories[field][code]
+        return persona or None
+
+    def dialogue(self, row):
+        if row in self.raw:
+            return self.raw[row]
+        start, end = self.dialogue_offsets[row], self.dialogue_offsets[row + 1]
+        text, offsets, speakers = self.text, self.text_offsets, self.speakers
+        return [{"turn": self.turns[k], "speaker": speakers[self.speaker_codes[k]],
+                 "utterance": text[offsets[k]:offsets[k + 1]].decode("utf-8")} for k in range(start, end)]
+
+    def record(self, row):
+        """행 하나를 지금 쓰는 레코드 dict 형식으로 (매번 새 dict 라 고쳐도 코퍼스는 그대로)."""
+        rec = {}
+        persona = self.persona(row)
+        if persona is not None:
+            rec["persona"] = persona
+        if row in self.raw or self.dialogue_offsets[row + 1] > self.dialogue_offsets[row]:
+            rec["dialogue"] = self.dialogue(row)
+        else:
+            rec["dialogue"] = []
+        extra = self.extras[row]
+        if extra:
+            rec.update(extra)
+        rec["id"] = self.ids[row]
+        return rec
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def get(self, record_id):
+        row = self.index.get(record_id)
+        return None if row is None else self.record(row)
+
+    def get_many(self, record_ids):
+        return [self.record(self.index[rid]) for rid in record_ids if rid in self.index]
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """내보내기용: 레코드를 chunk_size 개씩 dict 로 되돌려 줍니다 (한 번에 한 묶음만)."""
+        for start in range(0, len(self.ids), chunk_size):
+            yield self.records(range(start, min(start + chunk_size, len(self.ids))))
+
+    def persona_frame(self):
+        """페르소나 필드를 pandas Categorical 열로 (코드 배열을 그대로 씀)."""
+        import numpy as np
+        import pandas as pd
+
+        columns = {}
+        for field in PERSONA_FIELDS:
+            codes = np.frombuffer(self.persona_codes[field], dtype=np.int16)
+            columns[field] = pd.Categorical.from_codes(codes, categories=self.categories[field]) \
+                if self.categories[field] else pd.Categorical([None] * len(codes))
+        return pd.DataFrame(columns, index=pd.Index(self.ids, name="id"))
+
+    def nbytes(self):
+        """열 버퍼 크기 (id/extras 같은 파이썬 객체는 제외)."""
+        buffers = [self.dialogue_offsets, self.turns, self.speaker_codes, self.text_offsets,
+                   *self.persona_codes.values()]
+        return sum(b.itemsize * len(b) for b in buffers) + len(self.text)
+
+
+class CorpusView:
+    """저장소 하나의 CompactCorpus 를 저장소 version() 이 바뀔 때만 맞춰 둡니다."""
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.version = None
+        self.corpus = CompactCorpus()
+        self._sources = []  # 행 번호 → 지난번 light_records() 의 레코드 (바뀌지 않았으면 같은 객체)
+
+    def _rebuild(self):
+        self.corpus = CompactCorpus.from_chunks(self.store.iter_chunks(CHUNK_SIZE))
+
+    def refresh(self):
+        with self.lock:
+            version = self.store.version()
+            if version == self.version:
+                return self.corpus
+            light = self.store.light_records()
+            corpus = self.corpus
+            live = [rec["id"] for rec in light]
+            if live[:len(corpus)] != corpus.ids:
+                # 삭제되었거나 전체 교체로 순서가 바뀜: 새로 만듦
+                self._rebuild()
+            else:
+                new_ids = live[len(corpus):]
+                for start in range(0, len(new_ids), CHUNK_SIZE):
+                    corpus.extend(self.store.get_many(new_ids[start:start + CHUNK_SIZE]))
+                sources = self._sources
+                for row, rec in enumerate(light):
+                    if row >= len(sources) or rec is not sources[row]:
+                        corpus.set_extras(rec)
+            # 파싱 캐시의 레코드를 그대로 주는 저장소(JSONL)만 기억 (SQLite 는 매번 새 dict 라 들고 있을 이유 없음)
+            self._sources = light if getattr(self.store, "shares_records", False) else []
+            self.version = version
+            return self.corpus
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def corpus_view(store):
+    """저장소별로 하나씩 유지되는 읽기 전용 CompactCorpus (최신 상태로 맞춘 뒤 반환)."""
+    key = (os.path.abspath(store.path), getattr(store, "collection", None))
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            view = _views[key] = CorpusView(store)
+    return view.refresh()
@@ -0,0 +1,158 @@
+"""
+자체 대화 업로드 병합: 정규화한 대화 내용의 해시로 중복을 찾습니다 (Streamlit 비의존).
+
+각 레코드에 content_hash(정규화 내용의 해시)를 저장해 두고, content_hash → id 색인(dict)으로
+업로드 행마다 상수 시간에 기존 대화를 찾습니다.
+색인은 저장소 version()이 바뀌면 store.changes_since() 로 바뀐 레코드만 반영하고,
+처음이거나 이어갈 수 없을 때(replace_all 등)만 전체를 읽어 만듭니다.
+"""
+import hashlib
+import json
+import threading
+
+
+CHUNK_SIZE = 1000
+_indexes = {}  # (저장소 경로, 컬렉션) → _ContentIndex
+_indexes_lock = threading.Lock()
+
+
+def _norm_text(value):
+    """연속 공백/줄바꿈을 공백 하나로 (정규식보다 str.split 이 훨씬 빠름)."""
+    return " ".join(str(value).split())
+
+
+def normalize_dialogue(dialogue):
+    """
+    공백/줄바꿈 차이와 JSON 서식 차이를 지운 비교용 문자열.
+    턴 목록은 (화자, 발화)만 남기고, 일반 텍스트는 공백만 정리합니다.
+    """
+    if isinstance(dialogue, dict) and isinstance(dialogue.get("dialogue"), list):
+        dialogue = dialogue["dialogue"]
+    if isinstance(dialogue, list) and all(isinstance(t, dict) for t in dialogue):
+        # 턴마다 정리하지 않고 화자/발화(\x00), 턴(\x01) 구분자로 이어 붙인 뒤 한 번에 정리
+        text = _norm_text("\x01".join(f"{t.get('speaker', '')}\x00{t.get('utterance', '')}" for t in dialogue))
+        for sep in ("\x00", "\x01"):
+            text = text.replace(" " + sep, sep).replace(sep + " ", sep)
+        return text
+    if isinstance(dialogue, (dict, list)):
+        return json.dumps(dialogue, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return _norm_text(dialogue)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_hash(dialogue):
+    return _digest(normalize_dialogue(dialogue))
+
+
+def _index_key(store):
+    return (getattr(store, "path", ""), getattr(store, "collection", ""))
+
+
+def _record_hash(rec):
+    return rec.get("content_hash") or content_hash(rec.get("dialogue", ""))
+
+
+class _ContentIndex:
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.version = None
+        self.stamp = None  # 마지막으로 맞춘 store.change_stamp() (None 이면 전체를 다시 만듦)
+        self.index = {}  # content_hash → id (같은 내용이 여럿이면 먼저 들어온 것)
+        self.by_id = {}  # id → content_hash
+
+    def _add_many(self, records):
+        for rec in records:
+            c_hash = _record_hash(rec)
+            self.by_id[rec["id"]] = c_hash
+            self.index.setdefault(c_hash, rec["id"])
+
+    def _refresh_locked(self):
+        version = self.store.version()
+        if version == self.version:
+            return
+        changes = None
+        if self.stamp is not None:
+            changes, stamp = self.store.changes_since(self.stamp)
+        if changes is None:
+            stamp = self.store.change_stamp()
+            self.index, self.by_id = {}, {}
+            self._add_many(self.store.load_all())
+        else:
+            last = {change["id"]: change["change"] for change in changes}
+            orphaned = set()  # 색인이 가리키던 레코드가 바뀌거나 지워진 해시
+            for rid in last:
+                c_hash = self.by_id.pop(rid, None)
+                if c_hash is not None and self.index.get(c_hash) == rid:
+                    del self.index[c_hash]
+                    orphaned.add(c_hash)
+            changed = [rid for rid, change in last.items() if change != "delete"]
+            for start in range(0, len(changed), CHUNK_SIZE):
+                self._add_many(self.store.get_many(changed[start:start + CHUNK_SIZE]))
+            orphaned.difference_update(self.index)
+            if orphaned:
+                # 같은 내용의 다른 레코드가 남아 있으면 그 id 로 다시 가리킴 (드묾)
+                for rid, c_hash in self.by_id.items():
+                    if c_hash in orphaned:
+                        self.index.setdefault(c_hash, rid)
+        self.version = version
+        self.stamp = stamp
+
+    def refresh(self):
+        with self.lock:
+            self._refresh_locked()
+        return self.index
+
+
+def content_index(store):
+    """{content_hash: id}. 해시가 없는 이전 레코드는 이때 계산합니다."""
+    key = _index_key(store)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is None:
+            entry = _indexes[key] = _ContentIndex(store)
+    return entry.refresh()
+
+
+def merge_into(store, records):
+    """
+    업로드 레코드를 저장소에 병합합니다. 결과: {"added", "duplicate", "changed", "ids"}
+    - added: 처음 보는 내용 → 추가
+    - duplicate: 정규화 내용과 원문이 모두 같음 → 건너뜀
+    - changed: 정규화 내용은 같지만 원문(공백, 서식 등)이 다름 → 대화만 새 원문으로 갱신, 평가는 유지
+    같은 파일 안에서 반복되는 대화도 중복으로 셉니다.
+    """
+    index = content_index(store)
+    seen = set()  # 이번 업로드에서 이미 처리한 content_hash
+    new_records, matched, duplicate = [], [], 0
+    for rec in records:
+        dialogue = rec.get("dialogue", "")
+        c_hash = content_hash(dialogue)
+        if c_hash in seen:
+            duplicate += 1
+            continue
+        seen.add(c_hash)
+        rid = index.get(c_hash)
+        if rid is None:
+            new_records.append(dict(rec, content_hash=c_hash))
+            continue
+        matched.append((rid, dialogue, c_hash))
+
+    # 같은 내용의 기존 대화는 묶음으로 읽어 원문을 비교하고, 바뀐 것만 한 번에 갱신
+    changed = {}
+    for start in range(0, len(matched), CHUNK_SIZE):
+        part = matched[start:start + CHUNK_SIZE]
+        current = {rec["id"]: rec.get("dialogue") for rec in store.get_many([rid for rid, _, _ in part])}
+        for rid, dialogue, c_hash in part:
+            if current.get(rid) == dialogue:
+                duplicate += 1
+            else:
+                changed[rid] = {"dialogue": dialogue, "content_hash": c_hash}
+
+    ids = store.extend(new_records) if new_records else []
+    if changed:
+        store.update_many(changed)
+    return {"added": len(ids), "duplicate": duplicate, "changed": len(changed), "ids": ids}
@@ -0,0 +1,128 @@
+"""
+변경분(delta) 내보내기: 이름 붙은 체크포인트 이후에 추가/수정/삭제된 레코드만 내보냅니다 (Streamlit 비의존).
+
+체크포인트는 저장소의 변경 위치(store.change_stamp())에 이름을 붙여 data/export_checkpoints.json 에 둡니다.
+store.changes_since(stamp) 가 바뀐 id 만 돌려주므로 (JSONL: 로그 끝부분만 읽음, SQLite: modified_gen 인덱스)
+내보내기 비용은 코퍼스 크기가 아니라 변경량에 비례합니다. 행마다 안정적인 id, 변경 종류(insert/update/delete),
+수정 시각이 붙습니다. 받는 쪽은 insert/update 를 id 기준 upsert 로, delete 를 삭제로 적용하면 됩니다.
+
+체크포인트 이후 replace_all 로 저장소가 통째로 바뀌어 이어갈 수 없으면 전체를 내보내고 full=True 로
+알려 줍니다 (받는 쪽은 전체 교체). 변경 위치는 레코드를 읽기 전에 잡으므로 내보내는 동안 들어온 변경은
+다음 변경분에 한 번 더 나올 수 있습니다 (upsert 라 무해).
+"""
+import json
+import os
+import time
+from collections import Counter
+
+from export import CHUNK_SIZE, export_stream
+from storage import DATA_DIR
+
+CHECKPOINTS_PATH = os.path.join(DATA_DIR, "export_checkpoints.json")
+
+
+def _store_key(store):
+    name = os.path.basename(store.path)
+    collection = getattr(store, "collection", None)
+    return f"{name}:{collection}" if collection else name
+
+
+def _read_checkpoints(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_checkpoints(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_checkpoints(store, path=CHECKPOINTS_PATH):
+    """{이름: {"stamp", "created_at", "rows", "full", ...}} (이 저장소의 것만)."""
+    return _read_checkpoints(path).get(_store_key(store), {})
+
+
+def save_checkpoint(store, name, stamp=None, path=CHECKPOINTS_PATH, **info):
+    """지금(또는 주어진 stamp) 위치를 name 으로 저장합니다. 같은 이름은 덮어씁니다."""
+    data = _read_checkpoints(path)
+    checkpoint = {"stamp": stamp if stamp is not None else store.change_stamp(), "created_at": time.time(), **info}
+    data.setdefault(_store_key(store), {})[name] = checkpoint
+    _write_checkpoints(path, data)
+    return checkpoint
+
+
+def delete_checkpoint(store, name, path=CHECKPOINTS_PATH):
+    data = _read_checkpoints(path)
+    removed = data.get(_store_key(store), {}).pop(name, None)
+    if removed is not None:
+        _write_checkpoints(path, data)
+    return removed is not None
+
+
+def pending_changes(store, since, path=CHECKPOINTS_PATH):
+    """체크포인트 이후 변경 목록 (이어갈 수 없으면 None). 내보내지 않고 개수만 볼 때 씁니다."""
+    checkpoint = load_checkpoints(store, path).get(since)
+    if checkpoint is None:
+        raise KeyError(f"체크포인트가 없습니다: {since}")
+    return store.changes_since(checkpoint["stamp"])[0]
+
+
+def _change_chunks(store, changes, chunk_size):
+    """변경 목록 → 레코드 묶음. 수정/추가는 지금 레코드에 change/modified 를 붙이고, 삭제는 id 만."""
+    for start in range(0, len(changes), chunk_size):
+        part = changes[start:start + chunk_size]
+        records = {rec["id"]: rec for rec in store.get_many([c["id"] for c in part if c["change"] != "delete"])}
+        chunk = []
+        for change in part:
+            if change["change"] == "delete":
+                chunk.append(dict(change))
+            elif change["id"] in records:  # 내보내는 사이 지워졌으면 다음 변경분의 delete 로 나옴
+                chunk.append(dict(records[change["id"]], change=change["change"], modified=change["modified"]))
+        yield chunk
+
+
+def _full_chunks(store, chunk_size):
+    for chunk in store.iter_chunks(chunk_size):
+        yield [dict(rec, change="insert", modified=None) for rec in chunk]
+
+
+def export_changes(store, fmt, f, since=None, source="dialogues", checkpoint=None, chunk_size=CHUNK_SIZE,
+                   path=CHECKPOINTS_PATH):
+    """
+    since(체크포인트 이름) 이후의 변경을 fmt 형식으로 바이너리 파일 f 에 씁니다.
+    since 가 None 이거나 이어갈 수 없으면 전체를 insert 로 씁니다 (full=True).
+    checkpoint 이름이 주어지면 내보낸 위치를 그 이름으로 저장합니다 (다음 변경분의 기준).
+    반환: {"full", "rows", "insert", "update", "delete", "since", "checkpoint"}
+    """
+    changes = None
+    if since is not None:
+        saved = load_checkpoints(store, path).get(since)
+        if saved is None:
+            raise KeyError(f"체크포인트가 없습니다: {since}")
+        changes, stamp = store.changes_since(saved["stamp"])
+    if changes is None:
+        stamp = store.change_stamp()
+        chunks = _full_chunks(store, chunk_size)
+    else:
+        chunks = _change_chunks(store, changes, chunk_size)
+
+    counts = Counter()
+
+    def counted():
+        for chunk in chunks:
+            counts.update(entry["change"] for entry in chunk)
+            yield chunk
+
+    rows = export_stream(counted(), fmt, f, source, delta=True)
+    stats = {"full": changes is None, "rows": rows, "insert": counts["insert"], "update": counts["update"],
+             "delete": counts["delete"], "since": since, "checkpoint": checkpoint}
+    if checkpoint:
+        save_checkpoint(store, checkpoint, stamp, path, format=fmt,
+                        **{k: stats[k] for k in ("since", "full", "rows", "insert", "update", "delete")})
+    return stats
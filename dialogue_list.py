@@ -1,56 +1,46 @@
+import tempfile
 import streamlit as st
 import pandas as pd
-from utils import load_all_dialogues
-import json
+from utils import dialogue_corpus, store
+from export import build_rows, export_stream, EXPORT_FORMATS, EXPORT_MIME, GENERATED_COLUMNS
+from shared_widgets import EXPORT_LABELS, delta_export_section, evaluation_summary
+
+PAGE_ROWS = 1000  # 표에 한 번에 보여 줄 대화 수 (전체 표를 매번 만들지 않음)
+
+def _deferred_export(fmt):
+    """다운로드 버튼을 누를 때만 실행: 저장소를 묶음 단위로 임시 파일에 바로 씁니다."""
+    def build():
+        f = tempfile.TemporaryFile()
+        export_stream(dialogue_corpus().iter_chunks(), fmt, f)
+        f.seek(0)
+        return f
+    return build
 
 def dialogue_list_tab():
     st.header("[전체 대화 확인 및 저장]")
 
-    data = load_all_dialogues()
-    rows = []
-
-    for entry in data:
-        conv_str = json.dumps(entry.get("dialogue", {}), ensure_ascii=False)
-
-        evals = entry.get("evaluation", {})
-        ktas_val = evals.get("ktas", "")         
-        question = evals.get("question", "")
-        realism = evals.get("realism", "")
-        evaluator = evals.get("evaluator", "")    
-
-        persona = entry.get("persona", {})
-
-        rows.append({
-            "대화 출처": "생성",
-            "생성한 대화": conv_str,
-            "평가자": evaluator,
-            "KTAS 레벨의 적절성": ktas_val,
-            "대화의 적절성": question,
-            "대화의 현실성": realism,
-            "나이": persona.get("age", ""),
-            "성별": persona.get("gender", ""),
-            "대분류": persona.get("main_category", ""),
-            "중분류": persona.get("middle_category", ""),
-            "KTAS 레벨": persona.get("ktas_level", "")
-        })
-
-    df = pd.DataFrame(rows)
-    st.dataframe(df, use_container_width=True)
+    corpus = dialogue_corpus()
+    pages = max(1, -(-len(corpus) // PAGE_ROWS))
+    page = st.number_input(f"페이지 (1~{pages}, 페이지당 {PAGE_ROWS}개)", 1, pages, 1, key="list_page") if pages > 1 else 1
+    start = (page - 1) * PAGE_ROWS
+    rows = build_rows(corpus.records(range(start, min(start + PAGE_ROWS, len(corpus)))))
 
-    if not df.empty and "KTAS 레벨의 적절성" in df.columns:
-        st.markdown("#### KTAS 적절성 요약")
-        summary = df["KTAS 레벨의 적절성"].value_counts(dropna=False)
-        st.write({
-            "Y": int(summary.get("Y", 0)),
-            "N": int(summary.get("N", 0)),
-            "판단 불가": int(summary.get("판단 불가", 0)),
-            "미평가": int(summary.get("", 0))  
-        })
-
-    csv = df.to_csv(index=False).encode("utf-8-sig")
-    st.download_button(
-        "CSV 파일로 내보내기",
-        csv,
-        file_name="응급실_대화_데이터.csv",
-        mime="text/csv"
-    )
\ No newline at end of file
+    df = pd.DataFrame(rows, columns=GENERATED_COLUMNS)
+    st.dataframe(df, use_container_width=True)
+    st.caption(f"전체 대화 {len(corpus)}개")
+
+    if len(corpus):
+        evaluation_summary(store)
+
+    # 매 rerun 마다 전체 CSV 를 만들지 않고, 누른 형식만 스트리밍으로 생성
+    for col, fmt in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS):
+        with col:
+            st.download_button(
+                f"{EXPORT_LABELS[fmt]} 파일로 내보내기",
+                _deferred_export(fmt),
+                file_name=f"응급실_대화_데이터.{fmt}",
+                mime=EXPORT_MIME[fmt],
+                key=f"export_{fmt}"
+            )
+
+    delta_export_section(store)
@@ -1,29 +1,87 @@
 import streamlit as st
 import json
-from utils import load_all_dialogues, update_evaluation
+from scoring import calculate_score
+from storage import evaluations_of
+from utils import list_dialogue_ids, list_invalid_ids, list_unevaluated_ids, load_dialogues, update_evaluation_by_id, validate_dialogues
+from validation import is_valid, violation_labels
+
+INVALID_ORDER = ["뒤로 미루기", "건너뛰기", "그대로"]
 
 def evaluate_dialogue_tab():
     """
     첨부된 이미지 UI에 맞게 대화 평가 탭을 재구성합니다.
+    전체 대화를 한꺼번에 그리지 않고, 현재 창(페이지 또는 미평가 작업 큐)의 대화만 불러와 그립니다.
     """
     st.header("[생성된 대화 평가]")
 
-    # 대화 데이터 로드
-    data = load_all_dialogues()
-    if not data:
+    # 대화 id 목록만 로드 (본문은 현재 창에 해당하는 것만)
+    all_ids = list_dialogue_ids()
+    if not all_ids:
         st.info("평가할 대화가 없습니다.")
         return
+    position = {rid: i for i, rid in enumerate(all_ids)}
+    pending_ids = list_unevaluated_ids()
+    invalid_ids = set(list_invalid_ids())
+
+    st.caption(f"전체 {len(all_ids)}개 / 미평가 {len(pending_ids)}개 / 자동 검사 규칙 위반 {len(invalid_ids)}개")
+    with st.expander("자동 규칙 검사", expanded=False):
+        st.caption("첫 발화, 턴 수(6~10), 턴마다 간호사/환자 한 쌍, 한국어 발화, 한 질문에 한 가지 의료 정보 규칙을 확인합니다. "
+                   "새로 생성한 대화는 저장할 때 자동으로 검사됩니다.")
+        if st.button("검사하지 않은 대화 검사", key="eval_validate"):
+            with st.spinner("규칙 검사 중..."):
+                stats = validate_dialogues()
+            st.success(f"{stats['checked']}개 검사, 위반 {stats['failed']}개")
+            st.rerun()
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        mode = st.radio("보기 방식", ["미평가 대화부터 (작업 큐)", "페이지별 보기"], horizontal=True, key="eval_mode")
+    with c2:
+        page_size = st.number_input("한 번에 표시할 대화 수", min_value=1, max_value=20, value=5, step=1, key="eval_page_size")
+
+    if mode == "페이지별 보기":
+        n_pages = (len(all_ids) - 1) // page_size + 1
+        with c3:
+            page = st.number_input(f"페이지 (1~{n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key="eval_page_no")
+        window_ids = all_ids[(page - 1) * page_size: page * page_size]
+    else:
+        # 규칙 위반 대화는 작업 큐 뒤로 보내거나 빼서, 평가자가 구조가 깨진 대화부터 보지 않게 함
+        invalid_order = st.radio("규칙 위반 대화", INVALID_ORDER, horizontal=True, key="eval_invalid")
+        if invalid_order != "그대로" and invalid_ids:
+            valid_first = [rid for rid in pending_ids if rid not in invalid_ids]
+            if invalid_order == "뒤로 미루기":
+                valid_first += [rid for rid in pending_ids if rid in invalid_ids]
+            pending_ids = valid_first
+        window_ids = pending_ids[:page_size]
+        if not window_ids:
+            if invalid_order == "건너뛰기" and invalid_ids:
+                st.success("규칙을 통과한 대화의 평가가 끝났습니다. 남은 대화는 모두 규칙 위반 대화입니다.")
+            else:
+                st.success("모든 대화의 평가가 끝났습니다. '페이지별 보기'에서 기존 평가를 수정할 수 있습니다.")
+            return
 
-    # 목차 생성
-    toc_lines = [f"- [대화 {i+1}](#대화-{i+1})" for i in range(len(data))]
+    window = load_dialogues(window_ids)
+
+    # 목차 생성 (현재 창만)
+    toc_lines = [f"- [대화 {position[e['id']]+1}](#대화-{position[e['id']]+1})" for e in window]
     st.markdown("### 목차")
     st.markdown("\n".join(toc_lines))
     st.divider()
 
-    # 각 대화에 대한 평가 섹션 생성
-    for idx, entry in enumerate(data):
+    # 현재 창의 대화에 대한 평가 섹션 생성
+    for entry in window:
+        idx = position[entry["id"]]
         st.markdown(f'<a name="대화-{idx+1}"></a>', unsafe_allow_html=True)
         st.subheader(f"대화 {idx+1}")
+        near_dup = entry.get("near_duplicate")
+        if near_dup:
+            ref = position.get(near_dup["of"])
+            ref_label = f"대화 {ref+1}" if ref is not None else "삭제된 대화"
+            st.warning(f"{ref_label}와(과) 거의 같은 대화입니다 (유사도 {near_dup['similarity']:.2f}).")
+        if not is_valid(entry):
+            st.error(f"자동 검사 규칙 위반: {', '.join(violation_labels(entry))}")
+        evaluators = [name for name in evaluations_of(entry) if name]
+        if evaluators:
+            st.caption(f"평가한 평가자: {', '.join(evaluators)} (같은 이름으로 저장하면 그 평가자의 평가를 덮어씁니다)")
 
         # 2개 컬럼 생성: 왼쪽에 대화 내용, 오른쪽에 평가 항목
         col1, col2 = st.columns([1, 1])
@@ -130,19 +188,11 @@ def evaluate_dialogue_tab():
                     if not evaluator.strip():
                         st.error("평가자 이름/ID를 입력해주세요.")
                     else:
-                        # 점수 계산 함수
-                        def calculate_score(ratings):
-                            base_score = 5
-                            score_change = {"그렇다": 1, "보통이다": 0, "그렇지 않다": -1}
-                            total_score_change = sum(score_change[r] for r in ratings)
-                            final_score = base_score + total_score_change
-                            return max(0, min(10, final_score))
-
                         question_appropriateness_score = calculate_score(appropriate_ratings)
                         dialogue_realism_score = calculate_score(realism_ratings)
                         
-                        update_evaluation(
-                            idx, 
+                        update_evaluation_by_id(
+                            entry["id"], 
                             ktas_appropriateness, 
                             question_appropriateness_score, 
                             dialogue_realism_score, 
@@ -0,0 +1,250 @@
+"""
+대화 목록을 표/CSV/JSONL/Parquet 로 만드는 내보내기 로직 (Streamlit 비의존).
+
+큰 코퍼스는 export_stream()으로 저장소에서 묶음(chunk) 단위로 읽어 바로 파일에 쓰므로,
+전체 표나 전체 CSV 문자열을 메모리에 만들지 않습니다. Parquet 은 pyarrow 가 필요합니다.
+delta=True 면 각 레코드에 붙은 변경 종류("change")와 수정 시각("modified")도 씁니다 (delta_export.py).
+"""
+import csv
+import functools
+import io
+import json
+import time
+import tracemalloc
+
+EXPORT_FORMATS = ["csv", "jsonl", "parquet"]
+EXPORT_MIME = {"csv": "text/csv", "jsonl": "application/jsonl", "parquet": "application/vnd.apache.parquet"}
+CHUNK_SIZE = 1000
+
+GENERATED_COLUMNS = [
+    "대화 출처", "생성한 대화", "평가자", "KTAS 레벨의 적절성", "대화의 적절성", "대화의 현실성",
+    "나이", "성별", "대분류", "중분류", "KTAS 레벨",
+]
+OWN_COLUMNS = ["대화 출처", "대화", "평가자", "KTAS 레벨의 적절성", "대화의 적절성", "대화의 현실성"]
+DELTA_COLUMNS = ["id", "변경", "수정 시각"]  # 변경분 내보내기에만 앞에 붙는 열
+
+
+def generated_row(entry):
+    conv_str = json.dumps(entry.get("dialogue", {}), ensure_ascii=False)
+
+    evals = entry.get("evaluation", {}) or {}
+    persona = entry.get("persona", {}) or {}
+
+    return {
+        "대화 출처": "생성",
+        "생성한 대화": conv_str,
+        "평가자": evals.get("evaluator", ""),
+        "KTAS 레벨의 적절성": evals.get("ktas", ""),
+        "대화의 적절성": evals.get("question", ""),
+        "대화의 현실성": evals.get("realism", ""),
+        "나이": persona.get("age", ""),
+        "성별": persona.get("gender", ""),
+        "대분류": persona.get("main_category", ""),
+        "중분류": persona.get("middle_category", ""),
+        "KTAS 레벨": persona.get("ktas_level", "")
+    }
+
+
+def own_row(entry):
+    dlg = entry.get("dialogue", {})
+    conv_str = json.dumps(dlg, ensure_ascii=False) if isinstance(dlg, (dict, list)) else str(dlg)
+
+    evals = entry.get("evaluation", {}) or {}
+    return {
+        "대화 출처": "자체",
+        "대화": conv_str,
+        "평가자": evals.get("evaluator", ""),
+        "KTAS 레벨의 적절성": evals.get("ktas", ""),
+        "대화의 적절성": evals.get("question", ""),
+        "대화의 현실성": evals.get("realism", ""),
+    }
+
+
+def _modified_text(ts):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else ""
+
+
+def delta_row(entry, make_row):
+    """변경 한 건의 행. 삭제는 id 와 변경 종류만 채웁니다."""
+    row = {} if entry["change"] == "delete" else make_row(entry)
+    row.update({"id": entry["id"], "변경": entry["change"], "수정 시각": _modified_text(entry.get("modified"))})
+    return row
+
+
+def build_rows(records, source="dialogues"):
+    make_row = own_row if source == "own_dialogues" else generated_row
+    return [make_row(entry) for entry in records]
+
+
+def columns_for(source):
+    return OWN_COLUMNS if source == "own_dialogues" else GENERATED_COLUMNS
+
+
+def write_csv(rows, f, columns):
+    writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def to_csv_bytes(rows, columns):
+    """엑셀에서 한글이 깨지지 않도록 utf-8-sig 로 인코딩한 CSV 바이트."""
+    buf = io.StringIO()
+    write_csv(rows, buf, columns)
+    return buf.getvalue().encode("utf-8-sig")
+
+
+# ---------- 스트리밍 내보내기 ----------
+def write_csv_chunks(chunks, f, source="dialogues", delta=False):
+    """레코드 묶음을 받아 CSV 행으로 바로 씁니다. f 는 텍스트 파일 (엑셀용이면 utf-8-sig)."""
+    make_row = own_row if source == "own_dialogues" else generated_row
+    columns = columns_for(source)
+    if delta:
+        make_row, columns = functools.partial(delta_row, make_row=make_row), DELTA_COLUMNS + columns
+    writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(make_row(entry) for entry in chunk)
+        rows += len(chunk)
+    return rows
+
+
+def write_jsonl_chunks(chunks, f):
+    """저장된 레코드 구조(id, persona, dialogue, evaluation)를 한 줄에 하나씩 씁니다."""
+    rows = 0
+    for chunk in chunks:
+        f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in chunk))
+        rows += len(chunk)
+    return rows
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_str(value):
+    return None if value is None or value == "" else str(value)
+
+
+def _turns(dialogue):
+    """턴 목록이면 list<struct> 로 쓸 값을, 아니면 None 을 반환합니다."""
+    if not isinstance(dialogue, list) or not all(isinstance(t, dict) for t in dialogue):
+        return None
+    return [{"turn": _as_int(t.get("turn")), "speaker": _as_str(t.get("speaker")),
+             "utterance": _as_str(t.get("utterance"))} for t in dialogue]
+
+
+def parquet_schema(delta=False):
+    import pyarrow as pa
+
+    turn = pa.struct([("turn", pa.int64()), ("speaker", pa.string()), ("utterance", pa.string())])
+    delta_fields = [("change", pa.string()), ("modified", pa.float64())] if delta else []
+    return pa.schema(delta_fields + [
+        ("id", pa.string()),
+        ("source", pa.string()),
+        ("age", pa.string()),
+        ("gender", pa.string()),
+        ("main_category", pa.string()),
+        ("middle_category", pa.string()),
+        ("ktas_level", pa.int64()),
+        ("dialogue", pa.list_(turn)),
+        ("dialogue_text", pa.string()),  # 턴 목록이 아닌 자체 대화 원문
+        ("evaluator", pa.string()),
+        ("eval_ktas", pa.string()),
+        ("eval_question", pa.int64()),
+        ("eval_realism", pa.int64()),
+    ])
+
+
+def _parquet_columns(chunk, source, delta=False):
+    columns = {name: [] for name in parquet_schema(delta).names}
+    for entry in chunk:
+        if delta:
+            columns["change"].append(entry["change"])
+            columns["modified"].append(entry.get("modified"))
+        persona = entry.get("persona", {}) or {}
+        evals = entry.get("evaluation", {}) or {}
+        dlg = entry.get("dialogue", [])
+        turns = _turns(dlg)
+        columns["id"].append(entry.get("id"))
+        columns["source"].append("자체" if source == "own_dialogues" else "생성")
+        columns["age"].append(_as_str(persona.get("age")))
+        columns["gender"].append(_as_str(persona.get("gender")))
+        columns["main_category"].append(_as_str(persona.get("main_category")))
+        columns["middle_category"].append(_as_str(persona.get("middle_category")))
+        columns["ktas_level"].append(_as_int(persona.get("ktas_level")))
+        columns["dialogue"].append(turns)
+        columns["dialogue_text"].append(None if turns is not None else (
+            json.dumps(dlg, ensure_ascii=False) if isinstance(dlg, (dict, list)) else _as_str(dlg)))
+        columns["evaluator"].append(_as_str(evals.get("evaluator")))
+        columns["eval_ktas"].append(_as_str(evals.get("ktas")))
+        columns["eval_question"].append(_as_int(evals.get("question")))
+        columns["eval_realism"].append(_as_int(evals.get("realism")))
+    return columns
+
+
+def write_parquet_chunks(chunks, f, source="dialogues", delta=False):
+    """묶음마다 row group 하나를 씁니다. 대화 턴은 list<struct<turn, speaker, utterance>> 열입니다."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet 내보내기에는 pyarrow 가 필요합니다: pip install pyarrow") from e
+
+    schema = parquet_schema(delta)
+    rows = 0
+    with pq.ParquetWriter(f, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pydict(_parquet_columns(chunk, source, delta), schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export_stream(chunks, fmt, f, source="dialogues", delta=False):
+    """
+    레코드 묶음 iterable 을 fmt 형식으로 바이너리 파일 f 에 씁니다. 쓴 행 수를 반환합니다.
+    CSV 는 엑셀 호환을 위해 utf-8-sig 로 인코딩합니다. JSONL 은 레코드를 그대로 쓰므로 delta 여부와 무관합니다.
+    """
+    if fmt == "parquet":
+        return write_parquet_chunks(chunks, f, source, delta)
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    text = io.TextIOWrapper(f, encoding=encoding, newline="", write_through=True)
+    try:
+        if fmt == "csv":
+            return write_csv_chunks(chunks, text, source, delta)
+        if fmt == "jsonl":
+            return write_jsonl_chunks(chunks, text)
+        raise ValueError(f"알 수 없는 내보내기 형식: {fmt}")
+    finally:
+        text.flush()
+        text.detach()  # f 를 닫지 않고 분리
+
+
+def export_store(store, fmt, path, source="dialogues", chunk_size=CHUNK_SIZE, trace_memory=False):
+    """
+    저장소를 path 로 내보내고 측정값을 반환합니다:
+    format, rows, bytes, elapsed_sec, rows_per_sec, peak_mem_mb(trace_memory=True 일 때, 파이썬 힙 기준)
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with open(path, "wb") as f:
+            rows = export_stream(store.iter_chunks(chunk_size), fmt, f, source)
+            size = f.tell()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        "format": fmt,
+        "rows": rows,
+        "bytes": size,
+        "elapsed_sec": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_mem_mb": round(peak / 1e6, 2) if peak is not None else None,
+    }
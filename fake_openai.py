@@ -0,0 +1,150 @@
+"""
+로컬 테스트/벤치마크용 가짜 OpenAI Chat Completions 서버.
+
+    server, base_url = start_fake_server(delay=0.5)
+    openai.api_base = base_url
+    ...
+    server.shutdown()
+
+Batch 결과 파일도 API 없이 만들 수 있습니다 (batch_files 가져오기 시험용).
+
+    write_fake_batch_results("batch.jsonl", "batch_results.jsonl", fail_every=50)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_DIALOGUE = [
+    {"turn": 1, "speaker": "I", "utterance": "12번 환자분 들어오세요."},
+    {"turn": 1, "speaker": "CHATGPT", "utterance": "저는 55세 남성입니다."},
+    {"turn": 2, "speaker": "I", "utterance": "어디가 불편하신가요?"},
+    {"turn": 2, "speaker": "CHATGPT", "utterance": "숨쉬기가 힘듭니다."},
+    {"turn": 3, "speaker": "I", "utterance": "언제부터 그러셨나요?"},
+    {"turn": 3, "speaker": "CHATGPT", "utterance": "오늘 아침부터입니다."},
+    {"turn": 4, "speaker": "I", "utterance": "과거 병력이 있나요?"},
+    {"turn": 4, "speaker": "CHATGPT", "utterance": "과거력: COPD."},
+    {"turn": 5, "speaker": "I", "utterance": "가슴 통증도 있으신가요?"},
+    {"turn": 5, "speaker": "CHATGPT", "utterance": "아니요, 통증은 없습니다."},
+    {"turn": 6, "speaker": "I", "utterance": "산소포화도를 측정하겠습니다."},
+    {"turn": 6, "speaker": "CHATGPT", "utterance": "네, 알겠습니다."},
+]
+
+
+def _completion_body(content, model):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 900, "completion_tokens": 400, "total_tokens": 1300},
+    }
+
+
+def _chunk_body(piece, model):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+    }
+
+
+def _make_handler(delay, content, chunk_size=16):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if req.get("stream"):
+                return self._stream(req)
+            time.sleep(delay)
+            body = json.dumps(_completion_body(content, req.get("model", "fake")), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, req):
+            # 전체 지연(delay)을 조각 수만큼 나눠 토큰이 흘러나오는 것처럼 보냄
+            pieces = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for piece in pieces:
+                time.sleep(delay / len(pieces))
+                data = json.dumps(_chunk_body(piece, req.get("model", "fake")), ensure_ascii=False)
+                self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _batch_result_line(custom_id, content, model, status=200):
+    if status != 200:
+        response = {"status_code": status, "request_id": f"req-{custom_id}", "body": {"error": {"message": "fake error"}}}
+    else:
+        response = {"status_code": 200, "request_id": f"req-{custom_id}", "body": _completion_body(content, model)}
+    return {"id": f"batch_req_{custom_id}", "custom_id": custom_id, "response": response, "error": None}
+
+
+def write_fake_batch_results(requests_path, out_path, content=None, fail_every=0, shuffle_seed=None):
+    """
+    요청 JSONL 의 줄마다 Batch 출력 형식의 결과 줄을 씁니다 (요청 줄 하나씩 읽어 바로 씀).
+    content 는 문자열 또는 줄 번호(1부터)를 받아 문자열을 돌려주는 함수입니다.
+    fail_every=N 이면 N 번째마다 HTTP 500 결과를 넣고, shuffle_seed 를 주면 실제 Batch 처럼 순서를 섞습니다.
+    """
+    if content is None:
+        content = json.dumps(FAKE_DIALOGUE, ensure_ascii=False)
+    written = 0
+    with open(requests_path, "r", encoding="utf-8") as src:
+        lines = (json.loads(line) for line in src if line.strip())
+        if shuffle_seed is not None:
+            import random
+
+            lines = list(lines)
+            random.Random(shuffle_seed).shuffle(lines)
+        with open(out_path, "w", encoding="utf-8") as out:
+            for i, req in enumerate(lines, 1):
+                status = 500 if fail_every and i % fail_every == 0 else 200
+                text = content(i) if callable(content) else content
+                row = _batch_result_line(req["custom_id"], text, req["body"].get("model", "fake"), status)
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                written += 1
+    return written
+
+
+def start_fake_server(delay=0.0, content=None, host="127.0.0.1", port=0):
+    """백그라운드 스레드에서 서버를 띄우고 (server, api_base)를 반환합니다."""
+    if content is None:
+        content = json.dumps(FAKE_DIALOGUE, ensure_ascii=False)
+    server = ThreadingHTTPServer((host, port), _make_handler(delay, content))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="가짜 OpenAI 서버 실행")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+    server, base_url = start_fake_server(delay=args.delay, port=args.port)
+    print(f"OPENAI_API_BASE={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
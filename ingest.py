@@ -0,0 +1,213 @@
+"""
+자체 대화 업로드 파일(CSV/엑셀) 읽기와 대화 컬럼 파싱 (Streamlit 비의존).
+"""
+import codecs
+import csv
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DIALOGUE_COLUMN_CANDIDATES = ["dialogue", "생성한 대화", "대화", "챗GPT와 대화한 내용", "contents"]
+
+SAMPLE_BYTES = 64 * 1024  # 인코딩/구분자 추정에 쓰는 앞부분 크기
+SCAN_BLOCK_BYTES = 1024 * 1024
+CHUNK_ROWS = 50_000
+SNIFF_DELIMITERS = ",\t;|"
+XLSX_SIGNATURE = b"PK\x03\x04"  # zip 컨테이너 (xlsx)
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # OLE2 (xls)
+PARALLEL_MIN_ROWS = 20_000  # 이보다 적으면 프로세스 풀 시작 비용이 더 큼
+TURN_KEYS = {"speaker", "utterance"}
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def _is_excel(head):
+    return head.startswith(XLSX_SIGNATURE) or head.startswith(XLS_SIGNATURE)
+
+
+def detect_encoding(sample):
+    """
+    바이트 샘플 하나로 인코딩 후보를 고릅니다. BOM → utf-8-sig, 유효한 UTF-8 → utf-8,
+    그다음 cp949(euc-kr 상위 집합), 마지막으로 어떤 바이트든 읽히는 latin1.
+    첫 후보가 파일 뒤쪽에서 실패할 수 있으므로 순서대로 된 목록을 반환합니다.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return ["utf-8-sig", "cp949", "latin1"]
+    candidates = []
+    for enc in ("utf-8", "cp949"):
+        try:
+            # 샘플 끝에서 잘린 멀티바이트 문자는 오류로 보지 않음
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            candidates.append(enc)
+        except UnicodeDecodeError:
+            continue
+    for enc in ("utf-8", "cp949", "latin1"):
+        if enc not in candidates:
+            candidates.append(enc)
+    return candidates
+
+
+def _encoding_sample(f, head):
+    """
+    인코딩 판단에 쓸 샘플. 앞부분이 모두 ASCII 이면 처음 나오는 비 ASCII 바이트부터
+    SAMPLE_BYTES 만큼을 돌려줍니다 (한글이 파일 뒤쪽에만 있는 경우 잘못 추정해 다시 파싱하지 않도록).
+    """
+    if not head.isascii():
+        return head
+    f.seek(len(head))
+    while True:
+        block = f.read(SCAN_BLOCK_BYTES)
+        if not block:
+            return head
+        match = _NON_ASCII.search(block)
+        if match:
+            # 바로 앞 바이트가 ASCII 이므로 여기는 utf-8/cp949 모두에서 문자 경계
+            sample = block[match.start():]
+            if len(sample) < SAMPLE_BYTES:
+                sample += f.read(SAMPLE_BYTES - len(sample))
+            return sample[:SAMPLE_BYTES]
+
+
+def detect_delimiter(sample, encoding):
+    """헤더 줄에서 구분자를 추정합니다 (이전 engine="python", sep=None 과 같은 기준). 실패하면 쉼표."""
+    header = sample.split(b"\n", 1)[0].decode(encoding, errors="ignore")
+    try:
+        return csv.Sniffer().sniff(header, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def read_csv_any_encoding(uploaded_file):
+    """
+    업로드 파일(CSV/엑셀)을 DataFrame 으로 읽습니다.
+    엑셀은 파일 시그니처로 구분하고, CSV 는 앞부분 샘플로 인코딩/구분자를 한 번 정한 뒤
+    C 엔진으로 한 번만 (묶음 단위로) 파싱합니다. 인코딩 추정이 파일 뒤쪽에서 틀린 경우에만
+    다음 후보로 다시 읽습니다.
+    """
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(SAMPLE_BYTES)
+    if _is_excel(sample):
+        uploaded_file.seek(0)
+        return pd.read_excel(uploaded_file)
+
+    encodings = detect_encoding(_encoding_sample(uploaded_file, sample))
+    last_err = None
+    for enc in encodings:
+        try:
+            uploaded_file.seek(0)
+            reader = pd.read_csv(uploaded_file, encoding=enc, sep=detect_delimiter(sample, enc),
+                                 engine="c", chunksize=CHUNK_ROWS)
+            with reader:
+                chunks = list(reader)
+            if len(chunks) == 1:
+                return chunks[0]
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        except UnicodeDecodeError as e:
+            last_err = e
+            continue
+        except Exception as e:
+            raise RuntimeError(f"파일을 읽지 못했습니다. 인코딩={enc}, 오류={e}")
+    raise RuntimeError(f"파일을 읽지 못했습니다. 시도 인코딩={encodings}, 마지막 오류={last_err}")
+
+
+def find_dialogue_column(df):
+    for cand in DIALOGUE_COLUMN_CANDIDATES:
+        if cand in df.columns:
+            return cand
+    return None
+
+
+def validate_turns(dialogue):
+    """파싱된 대화가 [{turn, speaker, utterance}, ...] 형태인지 확인하고, 문제가 있으면 설명을 반환합니다."""
+    if isinstance(dialogue, dict):
+        dialogue = dialogue.get("dialogue")
+        if dialogue is None:
+            return "턴 목록이 아닌 JSON 객체"
+    if not isinstance(dialogue, list):
+        return "턴 목록이 아님"
+    if not dialogue:
+        return "턴이 없음"
+    # 대부분의 행이 통과하는 빠른 경로: 항목마다 C 수준 검사만
+    if all(type(t) is dict and t.keys() >= TURN_KEYS and type(t["utterance"]) is str for t in dialogue):
+        return None
+    for i, turn in enumerate(dialogue):
+        if not isinstance(turn, dict):
+            return f"{i + 1}번째 항목이 객체가 아님"
+        missing = [k for k in ("speaker", "utterance") if k not in turn]
+        if missing:
+            return f"{i + 1}번째 턴에 {', '.join(missing)} 없음"
+        if not isinstance(turn["utterance"], str):
+            return f"{i + 1}번째 턴의 utterance 가 문자열이 아님"
+    return None
+
+
+def _decode_chunk(texts):
+    """JSON 문자열 묶음을 디코딩하고 턴 구조를 검사합니다. [(parsed 또는 None, 오류 또는 None), ...]"""
+    results = []
+    for text in texts:
+        try:
+            parsed = json.loads(text)
+        except ValueError as e:
+            results.append((None, f"JSON 파싱 실패: {e}"))
+            continue
+        results.append((parsed, validate_turns(parsed)))
+    return results
+
+
+def _decode_all(texts, workers=1):
+    """
+    workers > 1 이고 행 수가 많으면 프로세스 풀로 나눠 디코딩합니다 (json.loads 는 GIL 을 놓지 않음).
+    프로세스 풀은 명령행(cli.py import)에서만 씁니다. Streamlit 서버 프로세스 안에서 fork 하면 앱 전체를
+    복제하게 되므로 업로드 화면은 기본값(한 프로세스)으로 처리합니다.
+    """
+    if workers <= 1 or len(texts) < PARALLEL_MIN_ROWS:
+        return _decode_chunk(texts)
+    size = -(-len(texts) // (workers * 4))  # 작업자당 4묶음: 긴 행이 몰린 묶음 때문에 놀지 않도록
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_decode_chunk, chunks):
+            results.extend(part)
+    return results
+
+
+def parse_dialogue_column(column, workers=1):
+    """
+    대화 컬럼 전체를 한 번에 처리합니다. "{"/"[" 로 시작하는 문자열만 JSON 으로 디코딩하고,
+    나머지(일반 텍스트)는 원문을 그대로 씁니다. (dialogues, errors) 를 반환하며
+    errors 는 [{"row": 0부터 센 행 번호, "error": 설명}] 입니다. 오류가 있어도 업로드는 계속됩니다.
+    """
+    values = column.tolist()
+    dialogues, errors, json_rows, texts = [], [], [], []
+    for i, v in enumerate(values):
+        if type(v) is str:
+            s = v.strip()
+            if s.startswith(("{", "[")):
+                json_rows.append(i)
+                texts.append(s)
+            elif not s:
+                errors.append({"row": i, "error": "빈 대화"})
+        elif pd.isna(v):
+            v = ""
+            errors.append({"row": i, "error": "빈 대화"})
+        dialogues.append(v)
+
+    for i, (parsed, error) in zip(json_rows, _decode_all(texts, workers)):
+        if parsed is not None:
+            dialogues[i] = parsed
+        if error is not None:
+            errors.append({"row": i, "error": error})
+    errors.sort(key=lambda e: e["row"])
+    return dialogues, errors
+
+
+def ingest_dialogues(df, dialogue_col, workers=1):
+    """업로드 DataFrame 을 자체 대화 레코드 목록으로 바꾸고 (own_list, errors) 를 반환합니다."""
+    dialogues, errors = parse_dialogue_column(df[dialogue_col], workers)
+    own_list = [{"dialogue": d, "source": "업로드", "evaluation": {}} for d in dialogues]
+    return own_list, errors
+
+
+def rows_to_own_dialogues(df, dialogue_col):
+    return ingest_dialogues(df, dialogue_col)[0]
@@ -0,0 +1,335 @@
+"""
+생성 작업 큐 (SQLite, Streamlit 비의존).
+
+UI 는 페르소나 목록을 작업(job)으로 등록하고 진행 상황만 읽습니다. 실제 생성은 별도 워커 프로세스
+(python cli.py worker --processes N)가 페르소나 한 건씩(task) 가져가 실행하고 결과를 대화 저장소에 씁니다.
+
+- 작업/태스크는 data/jobs.sqlite3 에 남으므로 앱이나 워커를 다시 띄워도 이어서 처리됩니다.
+- 태스크는 BEGIN IMMEDIATE 트랜잭션으로 한 워커에만 배정되고, 배정 시 임대 시간(lease)을 둡니다.
+  워커는 주기적으로 heartbeat 를 남기며 실행 중인 태스크의 임대를 연장하므로 느린 태스크도 빼앗기지 않고,
+  워커가 죽어 임대 시간이 지나면 다른 워커가 다시 가져갑니다 (시도 횟수를 다 쓴 태스크는 최종 실패).
+- 완료/실패 기록은 태스크를 지금 배정받은 워커(같은 시도)만 할 수 있습니다.
+- 실패한 태스크는 max_attempts 까지 지수 백오프 후 다시 대기열에 들어갑니다.
+"""
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from storage import DATA_DIR
+
+JOBS_PATH = os.path.join(DATA_DIR, "jobs.sqlite3")
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_SEC = 5  # 재시도 대기: 5, 10, 20 ... 초
+LEASE_MARGIN_SEC = 60  # heartbeat 마다 실행 중인 태스크의 임대를 적어도 이만큼 남김
+HEARTBEAT_SEC = 5
+POLL_SEC = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind         TEXT,
+    label        TEXT,
+    options      TEXT,            -- {"timeout", "use_cache"} (JSON)
+    max_attempts INTEGER NOT NULL,
+    cancelled    INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id       INTEGER NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+    persona      TEXT NOT NULL,
+    sample       INTEGER NOT NULL DEFAULT 0,
+    status       TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed | cancelled
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until  REAL,
+    worker       TEXT,
+    dialogue_id  TEXT,
+    near_duplicate INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    updated_at   REAL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker     TEXT PRIMARY KEY,
+    pid        INTEGER,
+    host       TEXT,
+    started_at REAL,
+    heartbeat  REAL,
+    done       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_job ON tasks(job_id, status);
+"""
+
+
+def job_status(job):
+    """태스크 개수로 본 작업 상태."""
+    if job["queued"] or job["running"]:
+        return "running" if job["running"] or job["done"] or job["failed"] else "queued"
+    if job["cancelled_tasks"] or job["cancelled"]:
+        return "cancelled"
+    return "failed" if job["failed"] else "done"
+
+
+class JobQueue:
+    def __init__(self, path=JOBS_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _write(self):
+        """다른 프로세스의 쓰기와 직렬화되는 트랜잭션 (읽고 고치는 구간이 원자적)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    # ---------- 등록/관리 (UI, CLI) ----------
+    def enqueue(self, personas, kind="batch", label="", timeout=120, use_cache=True,
+                max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """페르소나 목록을 작업 하나로 등록하고 job_id 를 반환합니다."""
+        from batch_generation import _with_sample_numbers
+
+        now = time.time()
+        options = json.dumps({"timeout": timeout, "use_cache": use_cache})
+        with self._write() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, label, options, max_attempts, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, label, options, max_attempts, now)).lastrowid
+            conn.executemany(
+                "INSERT INTO tasks (job_id, persona, sample, available_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, json.dumps(persona, ensure_ascii=False), sample, now, now)
+                 for persona, sample in _with_sample_numbers(personas)])
+        return job_id
+
+    def cancel(self, job_id):
+        """아직 시작하지 않은 태스크를 취소합니다 (실행 중인 태스크는 끝까지 진행)."""
+        with self._write() as conn:
+            conn.execute("UPDATE jobs SET cancelled = 1 WHERE job_id = ?", (job_id,))
+            return conn.execute(
+                "UPDATE tasks SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)).rowcount
+
+    def retry_failed(self, job_id):
+        """최종 실패한 태스크를 시도 횟수를 초기화해 다시 대기열에 넣습니다."""
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("UPDATE jobs SET cancelled = 0 WHERE job_id = ?", (job_id,))
+            return conn.execute(
+                "UPDATE tasks SET status = 'queued', attempts = 0, available_at = ?, error = NULL, updated_at = ? "
+                "WHERE job_id = ? AND status = 'failed'", (now, now, job_id)).rowcount
+
+    def jobs(self, limit=50, job_id=None):
+        """최근 작업 목록과 상태별 태스크 수."""
+        where, params = ("WHERE j.job_id = ?", (job_id,)) if job_id is not None else ("", ())
+        rows = self._conn().execute(
+            "SELECT j.job_id, j.kind, j.label, j.cancelled, j.created_at, COUNT(t.task_id) AS total, "
+            "COALESCE(SUM(t.status = 'queued'), 0) AS queued, COALESCE(SUM(t.status = 'running'), 0) AS running, "
+            "COALESCE(SUM(t.status = 'done'), 0) AS done, COALESCE(SUM(t.status = 'failed'), 0) AS failed, "
+            "COALESCE(SUM(t.status = 'cancelled'), 0) AS cancelled_tasks, "
+            "COALESCE(SUM(t.near_duplicate), 0) AS near_duplicates, MAX(t.updated_at) AS updated_at "
+            f"FROM jobs j LEFT JOIN tasks t ON t.job_id = j.job_id {where} "
+            "GROUP BY j.job_id ORDER BY j.job_id DESC LIMIT ?", params + (limit,)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["status"] = job_status(job)
+            jobs.append(job)
+        return jobs
+
+    def job(self, job_id):
+        jobs = self.jobs(job_id=job_id)
+        return jobs[0] if jobs else None
+
+    def task_errors(self, job_id, limit=20):
+        rows = self._conn().execute(
+            "SELECT task_id, persona, attempts, status, error FROM tasks "
+            "WHERE job_id = ? AND error IS NOT NULL ORDER BY updated_at DESC LIMIT ?", (job_id, limit))
+        return [dict(r, persona=json.loads(r["persona"])) for r in rows]
+
+    def pending_personas(self):
+        """아직 끝나지 않은(대기/실행 중) 태스크의 페르소나 (커버리지 계산에서 중복 등록 방지용)."""
+        rows = self._conn().execute("SELECT persona FROM tasks WHERE status IN ('queued', 'running')")
+        return [json.loads(r[0]) for r in rows]
+
+    def live_workers(self, within=HEARTBEAT_SEC * 3):
+        rows = self._conn().execute(
+            "SELECT worker, pid, host, started_at, heartbeat, done FROM workers WHERE heartbeat >= ?",
+            (time.time() - within,))
+        return [dict(r) for r in rows]
+
+    def has_pending(self):
+        return self._conn().execute(
+            "SELECT 1 FROM tasks WHERE status IN ('queued', 'running') LIMIT 1").fetchone() is not None
+
+    # ---------- 워커 ----------
+    def claim(self, worker):
+        """실행할 태스크 하나를 이 워커에 배정합니다. 없으면 None."""
+        now = time.time()
+        with self._write() as conn:
+            select = ("SELECT t.task_id, t.job_id, t.persona, t.sample, t.attempts, j.options, j.max_attempts "
+                      "FROM tasks t JOIN jobs j ON j.job_id = t.job_id ")
+            # 임대 시간이 지난(워커가 죽은) 태스크: 시도 횟수를 다 썼으면 최종 실패, 남았으면 먼저 다시 가져감
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = '임대 시간 초과 (워커 중단)', lease_until = NULL, "
+                "updated_at = ? WHERE status = 'running' AND lease_until < ? "
+                "AND attempts >= (SELECT max_attempts FROM jobs WHERE jobs.job_id = tasks.job_id)", (now, now))
+            row = conn.execute(select + "WHERE t.status = 'running' AND t.lease_until < ? LIMIT 1", (now,)).fetchone()
+            if row is None:
+                row = conn.execute(select + "WHERE t.status = 'queued' AND t.available_at <= ? "
+                                   "ORDER BY t.task_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            options = json.loads(row["options"] or "{}")
+            lease = (options.get("timeout") or 120) * 3 + LEASE_MARGIN_SEC  # 호출 재시도까지 포함한 여유
+            conn.execute(
+                "UPDATE tasks SET status = 'running', attempts = attempts + 1, lease_until = ?, worker = ?, "
+                "updated_at = ? WHERE task_id = ?", (now + lease, worker, now, row["task_id"]))
+        return {
+            "task_id": row["task_id"],
+            "job_id": row["job_id"],
+            "worker": worker,
+            "persona": json.loads(row["persona"]),
+            "sample": row["sample"],
+            "attempt": row["attempts"] + 1,
+            "max_attempts": row["max_attempts"],
+            **options,
+        }
+
+    # 이 워커가 이 시도로 배정받아 아직 실행 중인 경우에만 고침 (임대가 넘어간 뒤 늦게 끝난 워커는 무시됨)
+    _OWNED = "WHERE task_id = ? AND worker = ? AND attempts = ? AND status = 'running'"
+
+    def complete(self, task, dialogue_id, near_duplicate=False):
+        """완료 기록. 태스크를 아직 배정받고 있었으면 True."""
+        with self._write() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = 'done', dialogue_id = ?, near_duplicate = ?, error = NULL, "
+                "lease_until = NULL, updated_at = ? " + self._OWNED,
+                (dialogue_id, int(near_duplicate), time.time(),
+                 task["task_id"], task["worker"], task["attempt"])).rowcount > 0
+
+    def fail(self, task, error):
+        """시도 횟수가 남았으면 백오프 후 다시 대기열로, 아니면 최종 실패. 태스크를 아직 배정받고 있었으면 True."""
+        now = time.time()
+        final = task["attempt"] >= task["max_attempts"]
+        with self._write() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = ?, available_at = ?, error = ?, lease_until = NULL, updated_at = ? "
+                + self._OWNED,
+                ("failed" if final else "queued", now + RETRY_BASE_SEC * 2 ** (task["attempt"] - 1),
+                 error, now, task["task_id"], task["worker"], task["attempt"])).rowcount > 0
+
+    def heartbeat(self, worker, done=0):
+        """워커 생존 기록 + 이 워커가 실행 중인 태스크의 임대 연장 (느린 생성이 다른 워커에 넘어가지 않게)."""
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO workers (worker, pid, host, started_at, heartbeat, done) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET heartbeat = excluded.heartbeat, done = excluded.done",
+                (worker, os.getpid(), socket.gethostname(), now, now, done))
+            conn.execute(
+                "UPDATE tasks SET lease_until = MAX(lease_until, ?) WHERE worker = ? AND status = 'running'",
+                (now + LEASE_MARGIN_SEC, worker))
+
+
+def queued_personas(path=JOBS_PATH):
+    """대기/실행 중인 태스크의 페르소나. 큐를 한 번도 쓰지 않았으면 빈 목록 (DB 를 만들지 않음)."""
+    return JobQueue(path).pending_personas() if os.path.exists(path) else []
+
+
+def run_task(queue, task):
+    """태스크 하나 실행: 생성 → 저장. 저장된 대화 id 를 기록합니다."""
+    from utils import generate_conversation, save_conversations_json
+
+    try:
+        result = generate_conversation(task["persona"], request_timeout=task.get("timeout"),
+                                       use_cache=task.get("use_cache", True), sample=task["sample"])
+        ids = save_conversations_json([result])
+    except Exception as e:
+        queue.fail(task, repr(e))
+        return False
+    # NEAR_DUP_MODE=reject 로 저장되지 않은 경우도 태스크는 완료로 처리 (다시 생성해도 같은 결과)
+    return queue.complete(task, ids[0] if ids else None, "near_duplicate" in result)
+
+
+def run_worker(path=JOBS_PATH, threads=1, stop_when_idle=False, poll=POLL_SEC):
+    """
+    워커 프로세스 하나의 본체. threads 개의 스레드가 태스크를 가져가 실행합니다.
+    stop_when_idle 이면 대기/실행 중인 태스크가 없을 때 끝납니다 (벤치마크, 일회성 실행용).
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    queue = JobQueue(path)
+    done = [0]
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def loop():
+        while not stop.is_set():
+            task = queue.claim(worker)
+            if task is None:
+                if stop_when_idle and not queue.has_pending():
+                    stop.set()
+                    return
+                stop.wait(poll)
+                continue
+            if run_task(queue, task):
+                with lock:
+                    done[0] += 1
+
+    pool = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    try:
+        while any(t.is_alive() for t in pool):
+            queue.heartbeat(worker, done[0])
+            for t in pool:
+                t.join(timeout=HEARTBEAT_SEC / len(pool))
+    except KeyboardInterrupt:
+        stop.set()
+    queue.heartbeat(worker, done[0])
+    return done[0]
+
+
+def run_workers(processes=2, threads=1, path=JOBS_PATH, stop_when_idle=False):
+    """워커 프로세스 processes 개를 띄우고 모두 끝날 때까지 기다립니다. 처리한 태스크 수를 반환합니다."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    if processes <= 1:
+        return run_worker(path, threads, stop_when_idle)
+    with ProcessPoolExecutor(processes) as pool:
+        futures = [pool.submit(run_worker, path, threads, stop_when_idle) for _ in range(processes)]
+        return sum(f.result() for f in futures)
+
+
+def start_background_workers(processes=2, threads=1, log_path=os.path.join(DATA_DIR, "worker.log")):
+    """UI 에서 워커를 띄울 때: Streamlit 과 분리된 프로세스로 cli.py worker 를 실행합니다."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(here, "cli.py"), "worker",
+             "--processes", str(processes), "--threads", str(threads)],
+            cwd=os.getcwd(), stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True,  # 앱(세션)이 끝나도 워커는 계속 실행
+        )
+    return proc.pid
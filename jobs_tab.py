@@ -0,0 +1,136 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from jobs import JobQueue, start_background_workers
+
+STATUS_LABELS = {"queued": "대기", "running": "진행 중", "done": "완료", "failed": "실패 포함", "cancelled": "취소"}
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def worker_controls(queue, key):
+    """살아 있는 워커 수를 보여주고, 없으면 워커 시작 버튼을 표시합니다."""
+    live = queue.live_workers()
+    if live:
+        st.caption(f"실행 중인 워커 {len(live)}개 (지금까지 처리 {sum(w['done'] for w in live)}건)")
+        return
+    st.warning("실행 중인 워커가 없습니다. 등록한 작업은 워커가 시작되면 처리됩니다 (python cli.py worker).")
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        processes = st.number_input("워커 프로세스 수", min_value=1, max_value=16, value=2, step=1, key=f"{key}_processes")
+    with c2:
+        if st.button("워커 시작", key=f"{key}_start"):
+            pid = start_background_workers(int(processes))
+            st.success(f"워커를 시작했습니다 (pid {pid}, 로그: data/worker.log)")
+
+
+def _progress_text(job):
+    text = (f"작업 #{job['job_id']} {STATUS_LABELS[job['status']]}: 완료 {job['done']}/{job['total']}"
+            f", 실패 {job['failed']}")
+    if job["near_duplicates"]:
+        text += f", 유사 중복 {job['near_duplicates']}"
+    return text
+
+
+def _render_job(queue, job):
+    finished = job["done"] + job["failed"] + job["cancelled_tasks"]
+    st.progress(finished / job["total"] if job["total"] else 1.0, text=_progress_text(job))
+    if job["status"] in ACTIVE_STATUSES:
+        worker_controls(queue, f"job_{job['job_id']}")
+
+
+@st.fragment(run_every=2)
+def _live_job_progress(job_id):
+    queue = JobQueue()
+    job = queue.job(job_id)
+    if job is None:
+        return
+    _render_job(queue, job)
+    if job["status"] not in ACTIVE_STATUSES:
+        st.rerun()  # 끝났으면 앱을 한 번 다시 그려 자동 갱신 fragment 를 내림
+
+
+def job_progress(job_id):
+    """등록한 작업 하나의 진행 상황. 대기/진행 중일 때만 2초마다 이 부분을 다시 그리고, 끝난 작업은 한 번만 그림."""
+    if job_id is None:
+        return
+    queue = JobQueue()
+    job = queue.job(job_id)
+    if job is None:
+        return
+    if job["status"] in ACTIVE_STATUSES:
+        _live_job_progress(job_id)
+    else:
+        _render_job(queue, job)
+
+
+def _render_table(jobs):
+    if not jobs:
+        st.info("등록된 작업이 없습니다. '환자 페르소나 및 대화 생성' 탭에서 일괄/커버리지 생성을 등록하세요.")
+        return
+    df = pd.DataFrame([{
+        "작업": j["job_id"],
+        "종류": j["kind"],
+        "설명": j["label"],
+        "상태": STATUS_LABELS[j["status"]],
+        "진행률": (j["done"] + j["failed"] + j["cancelled_tasks"]) / j["total"] if j["total"] else 1.0,
+        "완료": j["done"],
+        "실패": j["failed"],
+        "대기": j["queued"],
+        "실행 중": j["running"],
+        "유사 중복": j["near_duplicates"],
+        "등록 시각": datetime.datetime.fromtimestamp(j["created_at"]).strftime("%m-%d %H:%M:%S"),
+    } for j in jobs])
+    st.dataframe(
+        df,
+        hide_index=True,
+        use_container_width=True,
+        column_config={"진행률": st.column_config.ProgressColumn("진행률", min_value=0.0, max_value=1.0)},
+    )
+
+
+def _any_active(jobs):
+    return any(j["status"] in ACTIVE_STATUSES for j in jobs)
+
+
+@st.fragment(run_every=2)
+def _live_job_table():
+    jobs = JobQueue().jobs()
+    _render_table(jobs)
+    if not _any_active(jobs):
+        st.rerun()  # 모두 끝났으면 앱을 한 번 다시 그려 자동 갱신 fragment 를 내림
+
+
+def job_table(queue, jobs=None):
+    """작업 목록. 대기/진행 중인 작업이 있을 때만 2초마다 이 부분을 다시 그리고, 아니면 한 번만 그림."""
+    jobs = queue.jobs() if jobs is None else jobs
+    if _any_active(jobs):
+        _live_job_table()
+    else:
+        _render_table(jobs)
+
+
+def jobs_tab():
+    st.header("[생성 작업 큐]")
+    st.caption("생성은 워커 프로세스가 처리하므로 페이지를 떠나거나 앱을 다시 시작해도 계속됩니다.")
+
+    queue = JobQueue()
+    worker_controls(queue, "ops")
+    jobs = queue.jobs()
+    job_table(queue, jobs)
+    if not jobs:
+        return
+    st.divider()
+    job_id = st.selectbox("작업 선택", [j["job_id"] for j in jobs], format_func=lambda i: f"#{i}", key="ops_job")
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("대기 중인 태스크 취소", use_container_width=True, key="ops_cancel"):
+            st.success(f"{queue.cancel(job_id)}개 태스크를 취소했습니다.")
+    with c2:
+        if st.button("실패한 태스크 재시도", use_container_width=True, key="ops_retry"):
+            st.success(f"{queue.retry_failed(job_id)}개 태스크를 다시 등록했습니다.")
+    errors = queue.task_errors(job_id)
+    if errors:
+        st.markdown("**최근 오류**")
+        st.dataframe(pd.DataFrame(errors), hide_index=True, use_container_width=True)
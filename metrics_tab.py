@@ -0,0 +1,69 @@
+import pandas as pd
+import streamlit as st
+
+from telemetry import load_metrics, summarize
+
+
+def _fmt_sec(value):
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def metrics_tab():
+    st.header("생성 모니터링")
+    st.caption("대화 생성 호출마다 기록된 지연, 토큰 사용량, 파싱 실패, 재시도, 캐시 적중 (data/metrics.jsonl)")
+
+    records = load_metrics()
+    if not records:
+        st.info("아직 기록된 생성 호출이 없습니다.")
+        return
+
+    kinds = sorted({r.get("kind", "") for r in records})
+    kind_sel = st.multiselect("호출 종류", kinds, default=kinds, key="metrics_kind")
+    records = [r for r in records if r.get("kind", "") in kind_sel]
+    summary = summarize(records)
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("전체 호출", summary["calls"])
+    c2.metric("API 호출", summary["api_calls"])
+    c3.metric("캐시 적중", summary["cache_hits"])
+    c4.metric("재시도", summary["retries"])
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("지연 p50", _fmt_sec(summary["latency_p50_sec"]))
+    c2.metric("지연 p90", _fmt_sec(summary["latency_p90_sec"]))
+    c3.metric("지연 p99", _fmt_sec(summary["latency_p99_sec"]))
+    c4.metric("파싱 실패율", f"{summary['parse_failure_rate'] * 100:.1f}%")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("입력 토큰", f"{summary['prompt_tokens']:,}")
+    c2.metric("출력 토큰", f"{summary['completion_tokens']:,}")
+    c3.metric("총 비용", f"${summary['cost_usd']:.4f}")
+    per_accepted = summary["cost_per_accepted_usd"]
+    c4.metric("통과 대화당 비용", f"${per_accepted:.4f}" if per_accepted is not None else "-")
+
+    df = pd.DataFrame(records)
+    if df.empty:
+        return
+    df["time"] = pd.to_datetime(df["ts"], unit="s")
+    df = df.set_index("time").sort_index()
+    if "parse_ok" not in df:
+        df["parse_ok"] = None
+
+    freq = st.selectbox("집계 단위", ["1min", "5min", "1h"], index=0, key="metrics_freq")
+    per_bucket = pd.DataFrame({
+        "호출 수": df["kind"].resample(freq).count(),
+        "통과 대화 수": (df["parse_ok"] == True).resample(freq).sum(),  # noqa: E712
+    })
+    st.subheader("시간대별 처리량")
+    st.line_chart(per_bucket)
+
+    api = df[df["cache_hit"] != True]  # noqa: E712
+    if not api.empty and "latency_sec" in api:
+        st.subheader("시간대별 지연 (API 호출)")
+        latency = api["latency_sec"].resample(freq)
+        st.line_chart(pd.DataFrame({"p50": latency.quantile(0.5), "p90": latency.quantile(0.9)}))
+
+    errors = df[df["error"].notna()] if "error" in df else df.iloc[0:0]
+    if not errors.empty:
+        st.subheader("최근 오류")
+        st.dataframe(errors[["kind", "error"]].tail(20), use_container_width=True)
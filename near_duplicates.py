@@ -0,0 +1,353 @@
+"""
+생성 대화의 유사 중복(near-duplicate) 탐지: 문자 n-gram MinHash + LSH.
+
+같은 페르소나로 temperature 0.7 생성을 반복하면 거의 같은 대화가 자주 나옵니다.
+발화를 이어 붙인 텍스트를 문자 3-gram 집합으로 보고(한국어는 띄어쓰기보다 문자 단위가 안정적),
+MinHash 서명으로 Jaccard 유사도를 추정합니다. 서명을 밴드로 나눠 버킷에 넣으므로
+새 대화 1건은 같은 버킷에 걸린 후보만 비교합니다 (전체 쌍 비교 없음).
+
+서명은 저장소 옆 사이드카 파일(data/<컬렉션>.minhash)에 고정 길이 레코드로 덧붙여 두고,
+다음 실행에서는 새로 생긴 대화의 서명만 계산합니다. 프로세스마다 처음 한 번 만드는 색인은
+앱 시작 시 백그라운드 스레드(app.py → utils.warm_near_duplicate_index)에서 미리 만들고, 이후에는 store.changes_since() 로
+바뀐 대화만 반영합니다. 거의 같은 대화가 많이 쌓여도 검사 비용이 늘지 않도록 버킷마다 id 를 MAX_BUCKET 개까지만 둡니다.
+"""
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from storage import new_id
+
+NGRAM = 3
+NUM_PERM = 128
+BANDS = 16  # BANDS x ROWS = NUM_PERM. 후보가 되는 유사도 문턱 ≈ (1/BANDS) ** (1/ROWS) ≈ 0.71
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.8
+MODES = ("flag", "reject", "off")
+MAX_BUCKET = 16  # 버킷 하나에 두는 id 수 상한 (넘치면 이미 같은 묶음이 충분히 있으므로 더 넣지 않음)
+
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # 홀수 곱셈자
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+SIDECAR_DTYPE = np.dtype([("id", "S32"), ("sig", "<u4", (NUM_PERM,))])
+
+
+def dialogue_text(dialogue):
+    """발화만 이어 붙이고 공백을 정리한 텍스트 (화자 표기와 턴 번호는 비교에서 제외)."""
+    if isinstance(dialogue, list):
+        parts = [str(t.get("utterance", "")) if isinstance(t, dict) else str(t) for t in dialogue]
+    else:
+        parts = [str(dialogue)]
+    return " ".join(" ".join(parts).split())
+
+
+def signature(text):
+    """문자 n-gram 집합의 MinHash 서명 (uint32 x NUM_PERM)."""
+    shingles = {text[i:i + NGRAM] for i in range(max(len(text) - NGRAM + 1, 0))}
+    if not shingles:
+        return _EMPTY.copy()
+    hv = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # 곱셈-시프트 해시 (uint64 곱셈은 2^64 로 감겨 도는 것이 의도된 동작)
+    hashed = (_A[:, None] * hv[None, :] + _B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def band_keys(sigs):
+    """서명 행렬 (N, NUM_PERM) → 밴드별 버킷 키 (N, BANDS) uint64. 한 밴드의 ROWS 개 값을 섞어 정수 하나로."""
+    bands = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    return (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+def similarity(sig_a, sig_b):
+    """두 서명에서 추정한 Jaccard 유사도."""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def _bucket_add(bucket, key, rid):
+    # 대부분의 버킷은 id 하나뿐이라 리스트 대신 id 를 그대로 둠
+    current = bucket.get(key)
+    if current is None:
+        bucket[key] = rid
+    elif isinstance(current, list):
+        if len(current) < MAX_BUCKET:
+            current.append(rid)
+    else:
+        bucket[key] = [current, rid]
+
+
+class NearDuplicateIndex:
+    """밴드별 버킷 {버킷 키: id 또는 [id, ...]} 과 서명 행렬(id → 행 번호)."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.rows = {}
+        self.matrix = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self.buckets = [dict() for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, record_id):
+        return record_id in self.rows
+
+    def signature_of(self, record_id):
+        return self.matrix[self.rows[record_id]]
+
+    def add(self, record_id, sig):
+        self.add_many([record_id], sig[None, :])
+
+    def add_many(self, record_ids, sigs):
+        """여러 서명을 한 번에 넣습니다. 버킷 키 계산과 충돌 없는 키 삽입을 묶음 단위로 처리합니다."""
+        keep = [i for i, rid in enumerate(record_ids) if rid not in self.rows]
+        if not keep:
+            return
+        ids = np.array([record_ids[i] for i in keep], dtype=object)
+        sigs = sigs[keep]
+        start = len(self.rows)
+        if start + len(ids) > len(self.matrix):
+            grown = np.empty((max(2 * len(self.matrix), start + len(ids)), NUM_PERM), dtype=np.uint32)
+            grown[:start] = self.matrix[:start]
+            self.matrix = grown
+        self.matrix[start:start + len(ids)] = sigs
+        self.rows.update(zip(ids.tolist(), range(start, start + len(ids))))
+
+        for bucket, column in zip(self.buckets, band_keys(sigs).T):
+            _, inverse, counts = np.unique(column, return_inverse=True, return_counts=True)
+            repeated = counts[inverse] > 1
+            single = dict(zip(column[~repeated].tolist(), ids[~repeated].tolist()))
+            for key in bucket.keys() & single.keys():
+                _bucket_add(bucket, key, single.pop(key))
+            bucket.update(single)
+            for key, rid in zip(column[repeated].tolist(), ids[repeated].tolist()):
+                _bucket_add(bucket, key, rid)
+
+    def remove(self, record_id):
+        row = self.rows.pop(record_id, None)
+        if row is None:
+            return
+        for bucket, key in zip(self.buckets, band_keys(self.matrix[row][None, :])[0].tolist()):
+            current = bucket.get(key)
+            if current == record_id:
+                del bucket[key]
+            elif isinstance(current, list) and record_id in current:
+                current.remove(record_id)
+                if len(current) == 1:
+                    bucket[key] = current[0]
+
+    def candidates(self, sig):
+        found = set()
+        for bucket, key in zip(self.buckets, band_keys(sig[None, :])[0].tolist()):
+            current = bucket.get(key)
+            if current is None:
+                continue
+            if isinstance(current, list):
+                found.update(current)
+            else:
+                found.add(current)
+        return found
+
+    def query(self, sig, exclude=None):
+        """문턱 이상인 [(id, 유사도), ...] 를 유사도 내림차순으로."""
+        candidates = [rid for rid in self.candidates(sig) if rid != exclude]
+        if not candidates:
+            return []
+        rows = self.matrix[[self.rows[rid] for rid in candidates]]
+        sims = np.count_nonzero(rows == sig, axis=1) / NUM_PERM
+        matches = [(rid, float(sim)) for rid, sim in zip(candidates, sims) if sim >= self.threshold]
+        matches.sort(key=lambda m: -m[1])
+        return matches
+
+
+# ---------- 저장소 연동 ----------
+def sidecar_path(store):
+    base = getattr(store, "collection", None) or os.path.splitext(os.path.basename(store.path))[0]
+    return os.path.join(os.path.dirname(store.path) or ".", f"{base}.minhash")
+
+
+def _read_sidecar(path):
+    """(id 목록, 서명 행렬 (N, NUM_PERM))."""
+    if not os.path.exists(path):
+        return [], np.empty((0, NUM_PERM), dtype=np.uint32)
+    usable = os.path.getsize(path) // SIDECAR_DTYPE.itemsize  # 쓰는 중인 마지막 레코드는 무시
+    arr = np.fromfile(path, dtype=SIDECAR_DTYPE, count=usable)
+    return arr["id"].astype("U32").tolist(), arr["sig"]
+
+
+def _append_sidecar(path, ids, sigs):
+    if not ids:
+        return
+    arr = np.zeros(len(ids), dtype=SIDECAR_DTYPE)
+    arr["id"] = ids
+    arr["sig"] = sigs
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as f:
+        arr.tofile(f)
+
+
+class _StoreIndex:
+    def __init__(self, threshold):
+        self.index = NearDuplicateIndex(threshold)
+        self.version = None
+        self.stamp = None  # 마지막으로 맞춘 store.change_stamp() (None 이면 전체를 맞춤)
+        self.lock = threading.Lock()
+
+
+_store_indexes = {}
+_store_indexes_lock = threading.Lock()
+
+
+def _signatures(store, record_ids):
+    """대화를 읽어 서명을 계산합니다: (id 목록, 서명 행렬)."""
+    computed_ids, computed = [], []
+    for rec in store.get_many(record_ids):
+        computed_ids.append(rec["id"])
+        computed.append(signature(dialogue_text(rec.get("dialogue", ""))))
+    return computed_ids, np.array(computed, dtype=np.uint32).reshape(-1, NUM_PERM)
+
+
+def _sync(store, entry):
+    """
+    저장소와 색인을 맞춥니다. 마지막으로 맞춘 뒤의 변경만 반영하고(삭제된 id 는 빼고, 새 id 는 서명 계산),
+    처음이거나 이어갈 수 없으면(replace_all 등) 전체를 맞춥니다.
+    """
+    version = store.version()
+    if entry.version == version:
+        return
+    changes = None
+    if entry.stamp is not None:
+        changes, stamp = store.changes_since(entry.stamp)
+    if changes is None:
+        stamp = store.change_stamp()
+        _sync_all(store, entry.index)
+    else:
+        index = entry.index
+        last = {change["id"]: change["change"] for change in changes}
+        for rid, change in last.items():
+            if change == "delete":
+                index.remove(rid)
+        # 다른 프로세스가 쓴 대화 (그 프로세스가 사이드카에 덧붙였으므로 여기서는 색인에만 넣음)
+        index.add_many(*_signatures(store, [rid for rid, change in last.items()
+                                            if change != "delete" and rid not in index]))
+    entry.version = version
+    entry.stamp = stamp
+
+
+def _sync_all(store, index):
+    """전체 맞추기: 사라진 id 는 빼고, 서명이 없는 대화는 계산해 사이드카에 덧붙임."""
+    ids = store.ids()
+    live = set(ids)
+    for rid in [rid for rid in index.rows if rid not in live]:
+        index.remove(rid)
+    missing = [rid for rid in ids if rid not in index]
+    if missing:
+        path = sidecar_path(store)
+        stored_ids, stored_sigs = _read_sidecar(path)
+        position = {rid: i for i, rid in enumerate(stored_ids)}
+        found = [rid for rid in missing if rid in position]
+        index.add_many(found, stored_sigs[[position[rid] for rid in found]])
+
+        computed_ids, computed = _signatures(store, [rid for rid in missing if rid not in position])
+        index.add_many(computed_ids, computed)
+
+        if len(stored_ids) > 2 * len(live) + 1000:
+            # 삭제된 대화의 서명이 쌓였으면 살아있는 것만 남겨 다시 씀
+            tmp = path + ".tmp"
+            _append_sidecar(tmp, ids, index.matrix[[index.rows[rid] for rid in ids]])
+            os.replace(tmp, path)
+        else:
+            _append_sidecar(path, computed_ids, computed)
+
+
+def _entry(store, threshold):
+    key = (os.path.abspath(store.path), getattr(store, "collection", None))
+    with _store_indexes_lock:
+        return _store_indexes.setdefault(key, _StoreIndex(threshold))
+
+
+def store_index(store, threshold=DEFAULT_THRESHOLD):
+    """저장소별로 한 번 만든 색인을 돌려줍니다 (이후에는 바뀐 부분만 반영)."""
+    entry = _entry(store, threshold)
+    with entry.lock:
+        entry.index.threshold = threshold
+        _sync(store, entry)
+    return entry.index
+
+
+def save_with_check(store, records, mode="flag", threshold=DEFAULT_THRESHOLD):
+    """
+    저장하기 전에 기존 대화(와 같은 묶음 안의 앞선 대화)와 비교합니다.
+    - flag: 저장하되 record["near_duplicate"] = {"of": id, "similarity": 값} 을 남김
+    - reject: 표시만 남기고 저장하지 않음
+    - off: 검사 없이 저장
+    저장된 레코드의 id 목록을 반환합니다 (저장된 레코드에는 "id" 가 채워짐).
+    """
+    if mode == "off":
+        for rec in records:
+            rec.setdefault("id", new_id())
+        return store.extend(records)
+    if mode not in MODES:
+        raise ValueError(f"알 수 없는 유사 중복 처리 방식: {mode}")
+
+    entry = _entry(store, threshold)
+    with entry.lock:
+        entry.index.threshold = threshold
+        _sync(store, entry)
+        index = entry.index
+        kept, sigs = [], []
+        for rec in records:
+            sig = signature(dialogue_text(rec.get("dialogue", "")))
+            matches = index.query(sig)
+            if matches:
+                rec["near_duplicate"] = {"of": matches[0][0], "similarity": round(matches[0][1], 3)}
+                if mode == "reject":
+                    continue
+            rec.setdefault("id", new_id())
+            index.add(rec["id"], sig)
+            kept.append(rec)
+            sigs.append(sig)
+        ids = store.extend(kept) if kept else []
+        _append_sidecar(sidecar_path(store), [rec["id"] for rec in kept], np.array(sigs).reshape(-1, NUM_PERM))
+        # 변경 위치는 쓰기 전 것 그대로 둠: 다음 _sync 가 방금 쓴 레코드(이미 색인에 있어 건너뜀)와
+        # 그 사이 다른 프로세스가 쓴 레코드를 함께 반영
+        return ids
+
+
+def _groups(index, ids):
+    """LSH 후보 쌍 중 문턱을 넘는 것만 union-find 로 묶고, 2개 이상인 묶음을 큰 것부터."""
+    parent = {rid: rid for rid in ids}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for rid in ids:
+        for other, _ in index.query(index.signature_of(rid), exclude=rid):
+            if other in parent:
+                parent[find(other)] = find(rid)
+
+    groups = {}
+    for rid in ids:
+        groups.setdefault(find(rid), []).append(rid)
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+def cluster(records, threshold=DEFAULT_THRESHOLD):
+    """레코드 목록(예: 예전 dialogues.json)을 유사 중복 묶음 [[id, ...], ...] 으로 나눕니다."""
+    ids = [rec.get("id") or str(i) for i, rec in enumerate(records)]
+    sigs = np.array([signature(dialogue_text(rec.get("dialogue", ""))) for rec in records],
+                    dtype=np.uint32).reshape(-1, NUM_PERM)
+    index = NearDuplicateIndex(threshold)
+    index.add_many(ids, sigs)
+    return _groups(index, ids)
+
+
+def cluster_store(store, threshold=DEFAULT_THRESHOLD):
+    """저장소 전체를 묶음으로 나눕니다. 사이드카에 저장된 서명을 재사용합니다."""
+    index = store_index(store, threshold)
+    return _groups(index, store.ids())
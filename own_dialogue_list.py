@@ -1,50 +1,38 @@
 import streamlit as st
 import pandas as pd
 import json
-import os
+from scoring import calculate_score
+from export import own_row
+from ingest import read_csv_any_encoding, find_dialogue_column, ingest_dialogues
+from storage import evaluations_of, open_store
+from dedup import merge_into
+from aggregates import add_evaluation
+from shared_widgets import delta_export_section, evaluation_summary
 
-OWN_DATA_PATH = "data/own_dialogues.json"
+own_store = open_store("own_dialogues")  # 기본: data/own_dialogues.jsonl (이전 data/own_dialogues.json 은 자동 이전)
 
 def load_own_dialogues():
-    if not os.path.exists(OWN_DATA_PATH):
-        return []
-    with open(OWN_DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return own_store.load_all()
 
 def save_own_dialogues(data):
-    os.makedirs(os.path.dirname(OWN_DATA_PATH), exist_ok=True)
-    with open(OWN_DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def update_own_evaluation(idx, ktas, question, realism, evaluator):
-    data = st.session_state.get("own_dialogues", [])
-    if 0 <= idx < len(data):
-        data[idx]["evaluation"] = {
-            "ktas": ktas,
-            "question": question,
-            "realism": realism,
-            "evaluator": evaluator
-        }
-        st.session_state["own_dialogues"] = data
-        save_own_dialogues(data)
-
-def read_csv_any_encoding(uploaded_file):
-    encodings = ["utf-8", "utf-8-sig", "cp949", "euc-kr", "latin1"]
-    last_err = None
-    for enc in encodings:
-        try:
-            uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file, encoding=enc, sep=None, engine="python")
-            return df
-        except Exception as e:
-            last_err = e
-            continue
-    # CSV 실패 시 엑셀 시도
-    try:
-        uploaded_file.seek(0)
-        return pd.read_excel(uploaded_file)
-    except Exception as e2:
-        raise RuntimeError(f"파일을 읽지 못했습니다. 시도 인코딩={encodings}, 마지막 오류={last_err}, 엑셀 오류={e2}")
+    """자체 대화 전체를 교체 저장하고, 저장소 id가 붙은 레코드 목록을 반환합니다."""
+    ids = own_store.replace_all(data)
+    return [dict(entry, id=rid) for entry, rid in zip(data, ids)]
+
+def merge_own_dialogues(data):
+    """새 대화만 추가하고 기존 대화의 평가는 유지합니다. added/duplicate/changed 개수를 반환합니다."""
+    return merge_into(own_store, data)
+
+def update_own_evaluation(record_id, ktas, question, realism, evaluator):
+    # 목록 위치가 아닌 레코드 id 로 저장 (그 사이 다른 세션이 지우거나 압축해도 다른 대화에 저장되지 않음)
+    add_evaluation(own_store, record_id, {
+        "ktas": ktas,
+        "question": question,
+        "realism": realism,
+        "evaluator": evaluator
+    })
+    # 다른 평가자가 그 사이 저장한 평가도 보이도록 저장소에서 다시 읽음
+    st.session_state["own_dialogues"] = load_own_dialogues()
 
 # --------- Main Tab: 업로드 & 평가 ---------
 def upload_and_evaluate_tab():
@@ -64,55 +52,51 @@ def upload_and_evaluate_tab():
 
     st.markdown("CSV를 업로드하면 각 행의 대화를 확인하고 평가할 수 있습니다.")
     uploaded = st.file_uploader("CSV 파일 업로드", type=["csv", "xlsx"], accept_multiple_files=False)
+    upload_mode = st.radio(
+        "업로드 방식",
+        ["병합 (새 대화만 추가, 기존 평가 유지)", "교체 (기존 대화와 평가 삭제)"],
+        horizontal=True, key="own_upload_mode"
+    )
 
-    if "own_dialogues" not in st.session_state:
-        st.session_state["own_dialogues"] = load_own_dialogues()
+    # 저장소 캐시가 바뀐 경우에만 다시 읽으므로 매 rerun 마다 불러와도 비용이 작고, 다른 세션의 변경도 반영됨
+    st.session_state["own_dialogues"] = load_own_dialogues()
 
-    if uploaded is not None:
+    # 업로더에 파일이 남아 있는 동안 rerun 마다 같은 파일을 다시 처리하지 않도록 처리한 파일을 기억
+    upload_key = uploaded.file_id if uploaded is not None else None
+    if uploaded is not None and st.session_state.get("own_upload_done") != upload_key:
         try:
             df = read_csv_any_encoding(uploaded)
         except Exception as e:
             st.error(f"파일을 읽는 중 오류: {e}")
             return
 
-        dialogue_col = None
-        for cand in ["dialogue", "생성한 대화", "대화", "챗GPT와 대화한 내용", "contents"]:
-            if cand in df.columns:
-                dialogue_col = cand
-                break
+        dialogue_col = find_dialogue_column(df)
 
         if dialogue_col is None:
             st.error("업로드한 파일에서 대화 컬럼을 찾지 못했습니다. 예: 'dialogue', '생성한 대화', '대화'")
             return
 
-        own_list = []
-        for _, row in df.iterrows():
-            raw = row.get(dialogue_col, "")
-            parsed = None
-            if isinstance(raw, str):
-                s = raw.strip()
-                if s.startswith("{") or s.startswith("["):
-                    try:
-                        parsed = json.loads(s)
-                    except Exception:
-                        parsed = None
-            item = {
-                "dialogue": parsed if parsed is not None else raw,
-                "source": "업로드",
-                "evaluation": {}
-            }
-            own_list.append(item)
-
-        st.session_state["own_dialogues"] = own_list
-        save_own_dialogues(own_list)
-        st.success(f"업로드 완료: {len(own_list)}개 대화가 로드되었습니다.")
+        own_list, errors = ingest_dialogues(df, dialogue_col)
+
+        if upload_mode.startswith("병합"):
+            result = merge_own_dialogues(own_list)
+            st.session_state["own_dialogues"] = load_own_dialogues()
+            st.success(f"업로드 완료: 새 대화 {result['added']}개 추가, 중복 {result['duplicate']}개 건너뜀, "
+                       f"서식만 바뀐 대화 {result['changed']}개 갱신 (평가 유지)")
+        else:
+            st.session_state["own_dialogues"] = save_own_dialogues(own_list)
+            st.success(f"업로드 완료: {len(own_list)}개 대화가 로드되었습니다.")
+        st.session_state["own_upload_done"] = upload_key
+        if errors:
+            # 문제가 있는 행도 원문 그대로 불러오고, 어떤 행인지만 알려줌
+            st.warning(f"{len(errors)}개 행의 대화 형식에 문제가 있습니다.")
+            with st.expander("문제가 있는 행 보기", expanded=False):
+                st.dataframe(pd.DataFrame([{"행": e["row"] + 1, "오류": e["error"]} for e in errors]))
 
     data = st.session_state.get("own_dialogues", [])
 
     if not data:
         st.info("업로드한 데이터가 없습니다. CSV를 업로드해 주세요.")
-        if os.path.exists(OWN_DATA_PATH) and st.button("이전에 저장한 자체 대화 불러오기"):
-            st.session_state["own_dialogues"] = load_own_dialogues()
         return
 
     toc_lines = [f"- [대화 {i+1}](#own-대화-{i+1})" for i in range(len(data))]
@@ -133,9 +117,13 @@ def upload_and_evaluate_tab():
     # 행별 표시 + 평가 폼
     for idx in range(start, end):
         entry = data[idx]
+        rid = entry["id"]  # 위젯 키: 그 사이 목록이 바뀌어도 제출한 폼이 같은 레코드를 가리키도록
 
         st.markdown(f'<a name="own-대화-{idx+1}"></a>', unsafe_allow_html=True)
         st.subheader(f"대화 {idx+1}")
+        evaluators = [name for name in evaluations_of(entry) if name]
+        if evaluators:
+            st.caption(f"평가한 평가자: {', '.join(evaluators)} (같은 이름으로 저장하면 그 평가자의 평가를 덮어씁니다)")
 
         # 2개 컬럼 생성: 왼쪽에 대화 내용, 오른쪽에 평가 항목
         col1, col2 = st.columns([1, 1])
@@ -152,14 +140,14 @@ def upload_and_evaluate_tab():
         with col2:
             st.markdown("### 평가항목")
             
-            with st.form(f"own_eval_form_{idx}"):
+            with st.form(f"own_eval_form_{rid}"):
                 # KTAS 레벨의 적절성 (기존 유지)
                 st.markdown("**KTAS 레벨의 적절성**")
                 ktas_appropriateness = st.selectbox(
                     "",
                     options=["Y", "N", "판단 불가"],
                     index=["Y", "N", "판단 불가"].index(entry.get("evaluation", {}).get("ktas_appropriateness", "판단 불가")),
-                    key=f"own_ktas_{idx}", label_visibility="hidden"
+                    key=f"own_ktas_{rid}", label_visibility="hidden"
                 )
 
                 # 대화의 적절성 평가
@@ -180,7 +168,7 @@ def upload_and_evaluate_tab():
 
                 appropriate_ratings = []
                 for i, (q, help_text) in enumerate(appropriateness_questions):
-                    question_key = f"appropriate_q_{idx}_{i}"
+                    question_key = f"appropriate_q_{rid}_{i}"
                     current_rating = entry.get("evaluation", {}).get(question_key, "보통이다")
                     
                     cols = st.columns([0.6, 0.4])
@@ -215,7 +203,7 @@ def upload_and_evaluate_tab():
 
                 realism_ratings = []
                 for i, q in enumerate(realism_questions):
-                    question_key = f"realism_q_{idx}_{i}"
+                    question_key = f"realism_q_{rid}_{i}"
                     current_rating = entry.get("evaluation", {}).get(question_key, "보통이다")
                     
                     cols = st.columns([0.6, 0.4])
@@ -236,7 +224,7 @@ def upload_and_evaluate_tab():
                 evaluator = st.text_input(
                     "평가자 이름 또는 ID", 
                     value=entry.get("evaluation", {}).get("evaluator", ""),
-                    key=f"own_evaluator_{idx}", 
+                    key=f"own_evaluator_{rid}", 
                     placeholder="예: hong_gildong"
                 )
 
@@ -246,19 +234,11 @@ def upload_and_evaluate_tab():
                     if not evaluator.strip():
                         st.error("평가자 이름/ID를 입력해주세요.")
                     else:
-                        # 점수 계산 함수
-                        def calculate_score(ratings):
-                            base_score = 5
-                            score_change = {"그렇다": 1, "보통이다": 0, "그렇지 않다": -1}
-                            total_score_change = sum(score_change[r] for r in ratings)
-                            final_score = base_score + total_score_change
-                            return max(0, min(10, final_score))
-
                         question_appropriateness_score = calculate_score(appropriate_ratings)
                         dialogue_realism_score = calculate_score(realism_ratings)
                         
                         update_own_evaluation(
-                            idx, 
+                            rid, 
                             ktas_appropriateness, 
                             question_appropriateness_score, 
                             dialogue_realism_score, 
@@ -272,33 +252,21 @@ def upload_and_evaluate_tab():
 def own_dialogue_list_tab():
     st.header("[자체 대화 전체 확인 및 저장]")
 
-    if "own_dialogues" not in st.session_state:
-        st.session_state["own_dialogues"] = load_own_dialogues()
+    # 변경이 있을 때만 다시 파싱되는 저장소 캐시에서 불러옴
+    st.session_state["own_dialogues"] = load_own_dialogues()
 
     data = st.session_state.get("own_dialogues", [])
 
     if not data:
         st.info("표시할 자체 대화가 없습니다. 먼저 '대화 업로드 및 평가' 탭에서 CSV를 업로드하세요.")
-        if os.path.exists(OWN_DATA_PATH) and st.button("저장된 자체 대화 불러오기", use_container_width=True):
-            st.session_state["own_dialogues"] = load_own_dialogues()
-            st.success("저장된 자체 대화를 불러왔습니다.")
         return
 
     # 표용 rows 구성
     rows = []
     for i, entry in enumerate(data):
-        dlg = entry.get("dialogue", {})
-        conv_str = json.dumps(dlg, ensure_ascii=False) if isinstance(dlg, (dict, list)) else str(dlg)
-
-        evals = entry.get("evaluation", {}) or {}
         rows.append({
             "__idx": i,  # 내부 인덱스 (삭제용)
-            "대화 출처": "자체",
-            "대화": conv_str,
-            "평가자": evals.get("evaluator", ""),
-            "KTAS 레벨의 적절성": evals.get("ktas", ""),
-            "대화의 적절성": evals.get("question", ""),
-            "대화의 현실성": evals.get("realism", ""),
+            **own_row(entry),
             "삭제": False
         })
 
@@ -315,6 +283,9 @@ def own_dialogue_list_tab():
         disabled=["__idx"]
     )
 
+    # 자체 대화에는 페르소나가 없으므로 평가자별 구분만 표시
+    evaluation_summary(own_store, kinds=("evaluator",), key="own_summary")
+
     col_del, col_csv = st.columns([1, 1])
 
     # 선택 행 삭제
@@ -325,9 +296,9 @@ def own_dialogue_list_tab():
                 st.warning("삭제할 행을 선택하세요.")
             else:
                 to_delete = set(del_rows["__idx"].tolist())
-                new_data = [entry for j, entry in enumerate(data) if j not in to_delete]
-                st.session_state["own_dialogues"] = new_data
-                save_own_dialogues(new_data)
+                for j in to_delete:
+                    own_store.delete(data[j]["id"])
+                st.session_state["own_dialogues"] = [entry for j, entry in enumerate(data) if j not in to_delete]
                 st.success(f"{len(to_delete)}개 행을 삭제했습니다.")
                 st.rerun()
 
@@ -341,4 +312,6 @@ def own_dialogue_list_tab():
             file_name="자체_대화_데이터.csv",
             mime="text/csv",
             use_container_width=True
-        )
\ No newline at end of file
+        )
+
+    delta_export_section(own_store, source="own_dialogues", file_stem="자체_대화_데이터", key="own_delta")
\ No newline at end of file
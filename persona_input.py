@@ -1,42 +1,26 @@
-import os
 import pandas as pd
 import streamlit as st
-from utils import generate_conversation, save_conversation_json, delete_last_conversation
+import categories
+from utils import generate_conversation, save_conversation_json, delete_conversation, response_cache, store
+from streaming import stream_conversation
+from batch_generation import persona_grid, DEFAULT_TIMEOUT
+from scheduler import GENDERS, KTAS_LEVELS, coverage_report, coverage_tracker, grid_cells, planned_counts, work_queue
+from jobs import DEFAULT_MAX_ATTEMPTS, JobQueue, queued_personas
+from jobs_tab import job_progress
+from validation import is_valid, violation_labels
 
-EXCEL_PATH = "./data/GT_KTAS카테고리_분류.xlsx"
+EXCEL_PATH = categories.EXCEL_PATH
 
 @st.cache_data(show_spinner=False)
-def load_category_table(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"엑셀 파일을 찾을 수 없습니다: {path}")
-
-    df = pd.read_excel(path, usecols=["나이", "대분류", "중분류"])
-    df = df.astype(str).apply(lambda s: s.str.strip())
-
-    return df
-
-@st.cache_data(show_spinner=False)
-def build_hierarchy(df: pd.DataFrame):
-    """
-    { "15세 이상": {"물질오용": [...], "정신건강": [...]}, "15세 미만": {...} }
-    """
-    tree = {}
-    for age_val, dfa in df.groupby("나이"):
-        if age_val not in ["15세 이상", "15세 미만"]:
-            continue
-        main_map = {}
-        for main_val, dfm in dfa.groupby("대분류"):
-            mids = sorted(dfm["중분류"].dropna().unique().tolist())
-            main_map[main_val] = mids
-        tree[age_val] = main_map
-    return tree
+def load_hierarchy(path: str):
+    # 프로세스 안에서는 st.cache_data, 재시작 후에는 categories 의 JSON 사이드카로 엑셀 파싱을 건너뜀
+    return categories.load_hierarchy(path)
 
 def persona_input_tab():
     st.header("[환자 페르소나 설정 및 대화 생성]")
 
     try:
-        cat_df = load_category_table(EXCEL_PATH)
-        hierarchy = build_hierarchy(cat_df)
+        hierarchy = load_hierarchy(EXCEL_PATH)
     except Exception as e:
         st.error(f"카테고리 엑셀 로드 중 오류: {e}")
         return
@@ -57,6 +41,8 @@ def persona_input_tab():
         middle_category = st.selectbox("중분류 (주증상)", middle_options, key="mid_sel")
 
     ktas_level = st.radio("KTAS 레벨", [1, 2, 3, 4, 5], horizontal=True, key="ktas_sel")
+    fresh = st.checkbox("캐시 사용 안 함 (항상 새로 생성)", key="fresh_sel")
+    streaming = st.checkbox("스트리밍 (턴이 완성되는 대로 표시)", value=True, key="stream_sel")
 
     col1, col2 = st.columns([1, 1])
     with col1:
@@ -68,15 +54,130 @@ def persona_input_tab():
                 "middle_category": middle_category,
                 "ktas_level": ktas_level
             }
-            conversation_json = generate_conversation(persona)
+            if streaming:
+                turn_area = st.container()
+
+                def show_turn(t):
+                    turn_area.markdown(f"**[{t.get('turn')}] {t.get('speaker')}**: {t.get('utterance')}")
+
+                conversation_json, metrics = stream_conversation(persona, on_turn=show_turn, use_cache=not fresh)
+                st.caption(
+                    f"첫 턴까지 {metrics['time_to_first_turn_sec']}초 / 전체 {metrics['total_sec']}초"
+                    + (f" / 깨진 턴 {metrics['skipped']}개 건너뜀" if metrics["skipped"] else "")
+                )
+            else:
+                conversation_json = generate_conversation(persona, use_cache=not fresh)
             st.session_state.last_generated = conversation_json
             st.json(conversation_json)
-            save_conversation_json(conversation_json)
-            st.success("대화가 생성되어 저장되었습니다.")
+            saved_id = save_conversation_json(conversation_json)
+            st.session_state.last_saved_id = saved_id
+            near_dup = conversation_json.get("near_duplicate")
+            if saved_id is None:
+                st.warning(f"이미 있는 대화와 거의 같아 저장하지 않았습니다 (유사도 {near_dup['similarity']:.2f}).")
+            else:
+                st.success("대화가 생성되어 저장되었습니다.")
+                if near_dup:
+                    st.warning(f"이미 있는 대화와 거의 같은 대화입니다 (유사도 {near_dup['similarity']:.2f}).")
     with col2:
-        if st.button("대화 삭제", use_container_width=True):
-            delete_last_conversation()
+        # 거부 모드에서 저장되지 않은 대화는 지울 것이 없으므로 버튼을 끔 (다른 사람의 최근 기록을 지우지 않도록)
+        saved_id = st.session_state.get("last_saved_id")
+        if st.button("대화 삭제", use_container_width=True, disabled=saved_id is None):
+            delete_conversation(saved_id)
+            st.session_state.last_saved_id = None
             st.success("만들어진 대화가 삭제되었습니다.")
             if "last_generated" in st.session_state:
                 del st.session_state["last_generated"]
 
+    invalid_generation_section()
+
+    stats = response_cache.stats()
+    st.caption(f"응답 캐시: 적중 {stats['hits']} / 미적중 {stats['misses']} (저장 {stats['entries']}/{stats['max_entries']})")
+
+    st.divider()
+    batch_generation_section(hierarchy, age, main_category, middle_options, fresh)
+    coverage_generation_section(hierarchy)
+
+def invalid_generation_section():
+    """방금 생성한 대화가 자동 규칙 검사에 걸리면 위반 내용을 보여주고 바로 다시 생성할 수 있게 합니다."""
+    last = st.session_state.get("last_generated")
+    if not last or is_valid(last):
+        return
+    st.warning(f"방금 생성한 대화가 자동 검사 규칙을 위반했습니다: {', '.join(violation_labels(last))}")
+    if st.button("이 대화를 지우고 다시 생성", key="regen_invalid"):
+        saved_id = st.session_state.get("last_saved_id")
+        if saved_id:
+            store.delete(saved_id)
+        regenerated = generate_conversation(last["persona"], use_cache=False)
+        st.session_state.last_generated = regenerated
+        st.session_state.last_saved_id = save_conversation_json(regenerated)
+        st.json(regenerated)
+        if is_valid(regenerated):
+            st.success("다시 생성한 대화가 규칙 검사를 통과해 저장되었습니다.")
+        else:
+            st.warning(f"다시 생성한 대화도 규칙을 위반했습니다: {', '.join(violation_labels(regenerated))}")
+
+def batch_generation_section(hierarchy, age, main_category, middle_options, fresh=False):
+    with st.expander("일괄 생성 (여러 페르소나 동시 생성)", expanded=False):
+        genders = st.multiselect("성별", ["남성", "여성"], default=["남성", "여성"], key="batch_genders")
+        ages = st.multiselect("나이", ["15세 미만", "15세 이상"], default=[age], key="batch_ages")
+        ktas_levels = st.multiselect("KTAS 레벨", [1, 2, 3, 4, 5], default=[1, 2, 3, 4, 5], key="batch_ktas")
+        mids = st.multiselect("중분류", middle_options, default=middle_options, key="batch_mids")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            repeat = st.number_input("조합당 생성 수", min_value=1, max_value=50, value=1, step=1, key="batch_repeat")
+        with c2:
+            attempts = st.number_input("실패 시 최대 시도 횟수", min_value=1, max_value=10, value=DEFAULT_MAX_ATTEMPTS, step=1, key="batch_attempts")
+        with c3:
+            timeout = st.number_input("요청당 타임아웃(초)", min_value=10, max_value=600, value=DEFAULT_TIMEOUT, step=10, key="batch_timeout")
+
+        # 나이마다 대분류/중분류 목록이 다르므로, 해당 나이에 존재하는 조합만 사용
+        personas = []
+        for a in ages:
+            cats = [(main_category, m) for m in mids if m in hierarchy.get(a, {}).get(main_category, [])]
+            personas.extend(persona_grid([a], genders, cats, ktas_levels, repeat=int(repeat)))
+        st.caption(f"생성 예정: {len(personas)}개 대화")
+
+        # 생성은 워커 프로세스가 처리: 버튼은 등록만 하고, 진행 상황은 주기적으로 읽어 표시
+        if st.button("일괄 생성 작업 등록", disabled=not personas, key="batch_start"):
+            st.session_state["batch_job_id"] = JobQueue().enqueue(
+                personas, kind="batch", label=f"{main_category} {len(personas)}개",
+                timeout=int(timeout), use_cache=not fresh, max_attempts=int(attempts))
+        job_progress(st.session_state.get("batch_job_id"))
+
+def coverage_generation_section(hierarchy):
+    with st.expander("커버리지 기반 자동 생성 (부족한 조합부터)", expanded=False):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            target = st.number_input("조합당 목표 대화 수", min_value=1, max_value=500, value=3, step=1, key="cov_target")
+        with c2:
+            budget = st.number_input("이번에 생성할 최대 수", min_value=1, max_value=5000, value=100, step=10, key="cov_budget")
+        with c3:
+            attempts = st.number_input("실패 시 최대 시도 횟수", min_value=1, max_value=10, value=DEFAULT_MAX_ATTEMPTS, step=1, key="cov_attempts")
+        ages = st.multiselect("나이", list(hierarchy), default=list(hierarchy), key="cov_ages")
+        main_options = sorted({m for a in ages for m in hierarchy.get(a, {})})
+        mains = st.multiselect("대분류 (비우면 전체)", main_options, key="cov_mains")
+        genders = st.multiselect("성별", GENDERS, default=GENDERS, key="cov_genders")
+        ktas_levels = st.multiselect("KTAS 레벨", KTAS_LEVELS, default=KTAS_LEVELS, key="cov_ktas")
+
+        cells = grid_cells(hierarchy, genders, ktas_levels, ages=ages, main_categories=mains or None)
+        tracker = coverage_tracker(store)
+        # 작업 큐에서 아직 생성 중인 것도 채워진 것으로 봄 (같은 조합을 두 번 등록하지 않도록)
+        counts = planned_counts(tracker.counts, queued_personas())
+        rows = coverage_report(cells, counts, int(target))
+        deficit = sum(r["deficit"] for r in rows)
+        st.caption(f"조합 {len(cells)}개 중 목표 달성 {sum(1 for r in rows if not r['deficit'])}개, 부족한 대화 {deficit}개")
+        if rows:
+            st.markdown("**가장 덜 채워진 조합**")
+            st.dataframe(pd.DataFrame(
+                [dict(zip(["나이", "성별", "대분류", "중분류", "KTAS"], r["cell"]), 현재=r["count"], 목표=r["target"])
+                 for r in rows[:20]]
+            ), use_container_width=True)
+
+        queue = work_queue(cells, counts, int(target), budget=int(budget))
+        if st.button(f"부족한 조합부터 {len(queue)}개 생성 작업 등록", disabled=not queue, key="cov_start"):
+            # 이미 있는 대화와 다른 대화가 필요하므로 캐시를 쓰지 않음
+            st.session_state["cov_job_id"] = JobQueue().enqueue(
+                queue, kind="coverage", label=f"커버리지 {len(queue)}개",
+                timeout=DEFAULT_TIMEOUT, use_cache=False, max_attempts=int(attempts))
+            st.rerun()  # 등록한 만큼 커버리지 표를 다시 계산
+        job_progress(st.session_state.get("cov_job_id"))
@@ -0,0 +1,167 @@
+"""
+커버리지 기반 생성 스케줄러 (Streamlit 비의존).
+
+나이 × 성별 × 대분류 × 중분류 × KTAS 조합(셀)마다 저장된 대화 수를 세고, 셀별 목표치까지
+부족한 셀을 채우는 페르소나 작업 목록을 만듭니다. 채워진 비율이 가장 낮은 셀부터 한 건씩
+번갈아 배정하므로, 예산이 모자라도 특정 셀에 몰리지 않습니다.
+
+셀별 개수는 저장소를 매번 다시 훑지 않고, 처음 한 번 센 뒤 새로 생긴/지워진 id 만 반영합니다.
+"""
+import heapq
+import itertools
+import os
+import threading
+from collections import Counter
+
+GENDERS = ["남성", "여성"]
+KTAS_LEVELS = [1, 2, 3, 4, 5]
+
+
+def cell_of(persona):
+    """페르소나 → 셀 키 (age, gender, main_category, middle_category, ktas_level)."""
+    persona = persona or {}
+    try:
+        ktas = int(persona.get("ktas_level"))
+    except (TypeError, ValueError):
+        ktas = persona.get("ktas_level")
+    return (persona.get("age"), persona.get("gender"), persona.get("main_category"),
+            persona.get("middle_category"), ktas)
+
+
+def persona_of(cell):
+    age, gender, main, middle, ktas = cell
+    return {"age": age, "gender": gender, "main_category": main, "middle_category": middle, "ktas_level": ktas}
+
+
+def grid_cells(hierarchy, genders=GENDERS, ktas_levels=KTAS_LEVELS, ages=None, main_categories=None):
+    """
+    카테고리 계층({나이: {대분류: [중분류, ...]}})에서 셀 목록을 만듭니다.
+    ages / main_categories 를 주면 그 범위만 씁니다.
+    """
+    cells = []
+    for age, main_map in hierarchy.items():
+        if ages is not None and age not in ages:
+            continue
+        for main, middles in main_map.items():
+            if main_categories is not None and main not in main_categories:
+                continue
+            for middle, gender, ktas in itertools.product(middles, genders, ktas_levels):
+                cells.append((age, gender, main, middle, ktas))
+    return cells
+
+
+class CoverageTracker:
+    """셀별 대화 수. refresh()는 저장소에서 바뀐 id 만 읽어 반영합니다."""
+
+    def __init__(self, store):
+        self.store = store
+        self.counts = Counter()
+        self.cell_by_id = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _add(self, record_id, persona):
+        if record_id in self.cell_by_id:
+            return
+        cell = cell_of(persona)
+        self.cell_by_id[record_id] = cell
+        self.counts[cell] += 1
+
+    def refresh(self):
+        with self.lock:
+            version = self.store.version()
+            if version == self.version:
+                return self.counts
+            ids = self.store.ids()
+            live = set(ids)
+            for rid in [rid for rid in self.cell_by_id if rid not in live]:
+                cell = self.cell_by_id.pop(rid)
+                self.counts[cell] -= 1
+                if self.counts[cell] <= 0:
+                    del self.counts[cell]
+            new_ids = [rid for rid in ids if rid not in self.cell_by_id]
+            for rec in self.store.get_many(new_ids):
+                self._add(rec["id"], rec.get("persona"))
+            self.version = version
+            return self.counts
+
+    def observe(self, records):
+        """방금 저장한 레코드(id 포함)를 바로 반영합니다. 이후 refresh()에서 다시 읽지 않습니다."""
+        with self.lock:
+            for rec in records:
+                if rec.get("id"):
+                    self._add(rec["id"], rec.get("persona"))
+
+    def count(self, cell):
+        return self.counts.get(cell, 0)
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def coverage_tracker(store):
+    """저장소별로 하나씩 유지되는 CoverageTracker."""
+    key = (os.path.abspath(store.path), getattr(store, "collection", None))
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = CoverageTracker(store)
+    tracker.refresh()
+    return tracker
+
+
+def planned_counts(counts, pending_personas):
+    """저장된 수 + 작업 큐에서 아직 생성 중인 수 (같은 셀을 두 번 등록하지 않도록)."""
+    planned = Counter(counts)
+    planned.update(cell_of(p) for p in pending_personas)
+    return planned
+
+
+def target_for(cell, target, overrides=None):
+    """
+    셀 목표치. overrides 는 부분 키로 덮어씁니다 (뒤에 오는 항목이 우선):
+    [({"ktas_level": 1}, 20), ({"main_category": "호흡기", "age": "15세 미만"}, 10)]
+    """
+    value = target
+    if overrides:
+        persona = persona_of(cell)
+        for match, override in overrides:
+            if all(persona.get(k) == v for k, v in match.items()):
+                value = override
+    return value
+
+
+def coverage_report(cells, counts, target, overrides=None):
+    """셀별 {cell, count, target, deficit} 목록 (채워진 비율이 낮은 순)."""
+    rows = []
+    for cell in cells:
+        goal = target_for(cell, target, overrides)
+        count = counts.get(cell, 0)
+        rows.append({"cell": cell, "count": count, "target": goal, "deficit": max(goal - count, 0)})
+    rows.sort(key=lambda r: (r["count"] / r["target"] if r["target"] else 1.0, r["count"]))
+    return rows
+
+
+def work_queue(cells, counts, target, budget=None, overrides=None):
+    """
+    부족한 셀을 채울 페르소나 목록을 우선순위 순서로 반환합니다.
+    매번 (현재 수 + 배정 수) / 목표 가 가장 낮은 셀에 한 건을 배정하므로
+    앞에서부터 budget 개만 잘라 써도 가장 덜 채워진 셀이 먼저 채워집니다.
+    """
+    heap = []
+    for order, cell in enumerate(cells):
+        goal = target_for(cell, target, overrides)
+        have = counts.get(cell, 0)
+        if goal > have:
+            heap.append((have / goal, order, have, goal, cell))
+    heapq.heapify(heap)
+
+    queue = []
+    while heap and (budget is None or len(queue) < budget):
+        _, order, have, goal, cell = heapq.heappop(heap)
+        queue.append(persona_of(cell))
+        have += 1
+        if have < goal:
+            heapq.heappush(heap, (have / goal, order, have, goal, cell))
+    return queue
@@ -0,0 +1,25 @@
+"""
+평가 점수 계산과 요약 (Streamlit 비의존).
+"""
+
+SCORE_CHANGE = {"그렇다": 1, "보통이다": 0, "그렇지 않다": -1}
+KTAS_CHOICES = ["Y", "N", "판단 불가"]
+
+
+def calculate_score(ratings, base_score=5):
+    """5개 문항 응답을 0~10 점수로 환산합니다 (기본 5점에서 문항당 ±1)."""
+    total_score_change = sum(SCORE_CHANGE[r] for r in ratings)
+    final_score = base_score + total_score_change
+    return max(0, min(10, final_score))
+
+
+def ktas_summary(records):
+    """KTAS 레벨 적절성 평가 분포: {"Y", "N", "판단 불가", "미평가"} 개수."""
+    summary = {"Y": 0, "N": 0, "판단 불가": 0, "미평가": 0}
+    for entry in records:
+        ktas = (entry.get("evaluation") or {}).get("ktas", "")
+        if ktas in summary:
+            summary[ktas] += 1
+        elif ktas == "":
+            summary["미평가"] += 1
+    return summary
@@ -0,0 +1,98 @@
+"""
+여러 탭이 같이 쓰는 화면 조각.
+
+탭 모듈은 메뉴를 고를 때만 import 되므로(app.py), 한 탭이 다른 탭 모듈을 import 하지 않도록 공용 조각은 여기에 둡니다.
+생성 대화 저장소를 import 시점에 여는 utils 는 import 하지 않습니다 (저장소는 인자로 받음).
+"""
+import tempfile
+import time
+import streamlit as st
+import pandas as pd
+from aggregates import SCORE_BINS, evaluation_aggregates
+from delta_export import export_changes, load_checkpoints, pending_changes
+from export import EXPORT_FORMATS, EXPORT_MIME
+
+EXPORT_LABELS = {"csv": "CSV", "jsonl": "JSONL", "parquet": "Parquet"}
+BREAKDOWN_LABELS = {"evaluator": "평가자별", "ktas_level": "KTAS 레벨별", "main_category": "대분류별", "cell": "페르소나 조합별"}
+
+
+def evaluation_summary(target_store, kinds=tuple(BREAKDOWN_LABELS), key="summary"):
+    """평가 집계를 읽어 요약합니다 (쓸 때마다 갱신되는 집계라 코퍼스를 다시 훑지 않음)."""
+    agg = evaluation_aggregates(target_store)
+    overall = agg.overall()
+
+    st.markdown("#### KTAS 적절성 요약")
+    st.write(agg.ktas_summary())
+    if not overall["n"]:
+        return
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("평가 수", overall["n"])
+    c2.metric("질문 적절성 평균", overall["question_mean"])
+    c3.metric("대화 현실성 평균", overall["realism_mean"])
+    st.bar_chart(pd.DataFrame(
+        {"질문 적절성": agg.histogram("question"), "대화 현실성": agg.histogram("realism")},
+        index=range(SCORE_BINS)
+    ))
+
+    kind = st.radio("구분", kinds, format_func=BREAKDOWN_LABELS.get, horizontal=True, key=f"{key}_kind")
+    st.dataframe(pd.DataFrame(agg.breakdown(kind)), use_container_width=True)
+
+    agreement = agg.agreement()
+    if agreement["dialogues"]:
+        st.markdown("#### 평가자 간 일치도")
+        st.caption(f"두 명 이상이 평가한 대화 {agreement['dialogues']}개 (평가 {agreement['ratings']}건)")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("KTAS Fleiss kappa", agreement["ktas_fleiss_kappa"])
+        c2.metric("질문 적절성 alpha", agreement["question_alpha"])
+        c3.metric("대화 현실성 alpha", agreement["realism_alpha"])
+
+
+def _deferred_delta_export(target_store, fmt, since, checkpoint, source):
+    """누를 때만 실행: 체크포인트 이후 변경분만 임시 파일에 쓰고, 새 체크포인트를 저장합니다."""
+    def build():
+        f = tempfile.TemporaryFile()
+        export_changes(target_store, fmt, f, since=since, source=source, checkpoint=checkpoint)
+        f.seek(0)
+        return f
+    return build
+
+
+def delta_export_section(target_store, source="dialogues", file_stem="응급실_대화_데이터", key="delta"):
+    """체크포인트 이후 추가/수정/삭제된 대화만 내보냅니다 (비용은 변경량에 비례)."""
+    with st.expander("변경분 내보내기 (체크포인트 이후 추가/수정/삭제만)", expanded=False):
+        checkpoints = load_checkpoints(target_store)
+        names = sorted(checkpoints, key=lambda n: checkpoints[n]["created_at"], reverse=True)
+        since = st.selectbox(
+            "기준 체크포인트", [None] + names, key=f"{key}_since",
+            format_func=lambda n: "(처음부터 전체)" if n is None else
+            f"{n} ({time.strftime('%Y-%m-%d %H:%M', time.localtime(checkpoints[n]['created_at']))})"
+        )
+        if since is not None:
+            changes = pending_changes(target_store, since)
+            if changes is None:
+                st.warning("체크포인트 이후 저장소가 통째로 교체되어 전체를 내보냅니다 (받는 쪽에서 전체 교체).")
+            else:
+                counts = {kind: sum(1 for c in changes if c["change"] == kind) for kind in ("insert", "update", "delete")}
+                st.caption(f"체크포인트 이후 변경 {len(changes)}건: 추가 {counts['insert']} / 수정 {counts['update']} / 삭제 {counts['delete']}")
+
+        c1, c2 = st.columns(2)
+        fmt = c1.selectbox("형식", EXPORT_FORMATS, format_func=EXPORT_LABELS.get, key=f"{key}_fmt")
+        checkpoint = c2.text_input("내보낸 뒤 저장할 체크포인트 이름 (비우면 저장 안 함)",
+                                   value=time.strftime("%Y-%m-%d"), key=f"{key}_name").strip()
+        st.download_button(
+            f"변경분 {EXPORT_LABELS[fmt]} 파일로 내보내기",
+            _deferred_delta_export(target_store, fmt, since, checkpoint or None, source),
+            file_name=f"{file_stem}_변경분.{fmt}",
+            mime=EXPORT_MIME[fmt],
+            key=f"{key}_download"
+        )
+        st.caption("insert/update 는 id 기준으로 덮어쓰고(upsert), delete 는 지우면 됩니다.")
+        if checkpoints:
+            st.dataframe(pd.DataFrame([
+                {"체크포인트": name,
+                 "저장 시각": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(checkpoints[name]["created_at"])),
+                 "기준": checkpoints[name].get("since") or "(전체)", "행 수": checkpoints[name].get("rows"),
+                 "전체 내보내기": checkpoints[name].get("full")}
+                for name in names
+            ]), hide_index=True, use_container_width=True)
@@ -0,0 +1,556 @@
+"""
+SQLite(WAL) 기반 대화/평가 저장소 (선택 사항).
+
+환경변수 DIALOGUE_STORE=sqlite 로 켜며, JsonlStore 와 같은 인터페이스를 제공합니다.
+페르소나/대화 턴/평가를 별도 테이블로 나누고 KTAS 레벨, 카테고리, 평가자에 인덱스를 두어
+레코드 1건 수정과 조건별 목록 조회가 파일 전체 파싱 없이 인덱스 조회로 끝납니다.
+평가는 (대화, 평가자)마다 한 행이며, 레코드의 evaluation(최근 평가)은 대화 안 저장 순서(eval_order)가
+가장 큰 행(latest_evaluations 뷰), evaluations 는 그 대화의 모든 행으로 만듭니다.
+쓰기마다 meta 테이블의 컬렉션별 generation 값을 올리며, load_all()은 이 값이 같으면
+이미 만든 레코드 목록을 그대로 돌려줍니다. 바뀐 행에는 그 generation 을 modified_gen 으로 적고
+지운 행은 deletions 에 남기므로, changes_since(stamp) 는 인덱스 조회만으로 변경분을 찾습니다.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from storage import new_id
+
+# 평가자별 평가 (이전 DB 를 옮길 때 _migrate_evaluations 에서도 씀)
+EVALUATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    dialogue_seq INTEGER NOT NULL REFERENCES dialogues(seq) ON DELETE CASCADE,
+    evaluator    TEXT NOT NULL,   -- 평가자 이름 없음은 ''
+    ktas         TEXT,
+    question     INTEGER,
+    realism      INTEGER,
+    extra        TEXT,
+    eval_order   INTEGER NOT NULL, -- 대화 안에서의 저장 순서 (가장 큰 값이 최근 평가)
+    PRIMARY KEY (dialogue_seq, evaluator)
+)
+"""
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS personas (
+    persona_id      INTEGER PRIMARY KEY,
+    age             TEXT,
+    gender          TEXT,
+    main_category   TEXT,
+    middle_category TEXT,
+    ktas_level      INTEGER,
+    UNIQUE (age, gender, main_category, middle_category, ktas_level)
+);
+CREATE TABLE IF NOT EXISTS dialogues (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    id           TEXT NOT NULL UNIQUE,
+    collection   TEXT NOT NULL,
+    persona_id   INTEGER REFERENCES personas(persona_id),
+    raw_dialogue TEXT,            -- 턴 목록 형식이 아닌 대화(업로드 원문 등)
+    extra        TEXT,            -- persona/dialogue/evaluation(s) 외의 필드 (JSON)
+    created_at   REAL,
+    updated_at   REAL,
+    created_gen  INTEGER,         -- 추가/마지막 변경 때의 generation (변경분 내보내기용)
+    modified_gen INTEGER
+);
+CREATE TABLE IF NOT EXISTS turns (
+    dialogue_seq INTEGER NOT NULL REFERENCES dialogues(seq) ON DELETE CASCADE,
+    position     INTEGER NOT NULL,
+    turn         INTEGER,
+    speaker      TEXT,
+    utterance    TEXT,
+    PRIMARY KEY (dialogue_seq, position)
+) WITHOUT ROWID;
+""" + EVALUATIONS_TABLE + """;
+CREATE TABLE IF NOT EXISTS deletions (
+    collection  TEXT NOT NULL,
+    id          TEXT NOT NULL,
+    created_gen INTEGER,
+    deleted_gen INTEGER NOT NULL,
+    deleted_at  REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_dialogues_collection ON dialogues(collection, seq);
+CREATE INDEX IF NOT EXISTS idx_dialogues_persona ON dialogues(persona_id);
+CREATE INDEX IF NOT EXISTS idx_personas_ktas ON personas(ktas_level);
+CREATE INDEX IF NOT EXISTS idx_personas_category ON personas(main_category, middle_category);
+CREATE INDEX IF NOT EXISTS idx_deletions_collection ON deletions(collection, deleted_gen);
+"""
+# 이전 DB 에는 변경 추적 열이 없으므로 열을 추가한 뒤에 만듦
+CHANGE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_dialogues_modified ON dialogues(collection, modified_gen);
+"""
+# 이전 DB 의 evaluations(대화당 한 행)를 평가자별 행으로 옮긴 뒤에 만듦
+EVALUATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_evaluations_evaluator ON evaluations(evaluator);
+CREATE INDEX IF NOT EXISTS idx_evaluations_ktas ON evaluations(ktas);
+CREATE INDEX IF NOT EXISTS idx_evaluations_order ON evaluations(dialogue_seq, eval_order);
+CREATE VIEW IF NOT EXISTS latest_evaluations AS
+    SELECT * FROM evaluations e
+    WHERE e.eval_order = (SELECT MAX(x.eval_order) FROM evaluations x WHERE x.dialogue_seq = e.dialogue_seq);
+"""
+
+PERSONA_FIELDS = ["age", "gender", "main_category", "middle_category", "ktas_level"]
+EVAL_FIELDS = ["ktas", "question", "realism", "evaluator"]
+TURN_FIELDS = {"turn", "speaker", "utterance"}
+
+# list() 에서 허용하는 필터 → 조건 (evaluator: 그 평가자가 평가한 대화, ktas: 최근 평가의 KTAS 응답)
+FILTERS = {
+    "ktas_level": "p.ktas_level = ?",
+    "main_category": "p.main_category = ?",
+    "middle_category": "p.middle_category = ?",
+    "evaluator": "d.seq IN (SELECT dialogue_seq FROM evaluations WHERE evaluator = ?)",
+    "ktas": "d.seq IN (SELECT dialogue_seq FROM latest_evaluations WHERE ktas = ?)",
+}
+
+
+_loaded = {}  # (db 경로, collection) -> (generation, records)
+_loaded_lock = threading.Lock()
+
+
+def _add_change_columns(conn):
+    """변경 추적 열이 없는 이전 DB 에 추가합니다 (기존 행은 NULL = 어떤 체크포인트보다도 오래된 행)."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(dialogues)")}
+    for column in ("created_gen", "modified_gen"):
+        if column not in columns:
+            try:
+                conn.execute(f"ALTER TABLE dialogues ADD COLUMN {column} INTEGER")
+            except sqlite3.OperationalError:  # 다른 프로세스가 먼저 추가함
+                pass
+    conn.executescript(CHANGE_INDEXES)
+
+
+def _evaluation_row(seq, evaluation):
+    extra = {k: v for k, v in evaluation.items() if k not in EVAL_FIELDS}
+    return (seq, evaluation.get("evaluator") or "", evaluation.get("ktas"), evaluation.get("question"),
+            evaluation.get("realism"), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _migrate_evaluations(conn):
+    """
+    대화당 한 행(최근 평가)이던 이전 evaluations 를 평가자별 행으로 옮깁니다.
+    평가자별 기록은 dialogues.extra 의 "evaluations" 에 있던 것을 쓰고, 최근 평가가 가장 큰 eval_order 를 갖습니다.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(evaluations)")}
+    if "eval_order" not in columns:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(evaluations)")}
+            if "eval_order" not in columns:  # 다른 프로세스가 먼저 옮기지 않았으면
+                conn.execute("DROP INDEX IF EXISTS idx_evaluations_evaluator")
+                conn.execute("DROP INDEX IF EXISTS idx_evaluations_ktas")
+                conn.execute("ALTER TABLE evaluations RENAME TO evaluations_v1")
+                conn.execute(EVALUATIONS_TABLE)
+                rows = conn.execute(
+                    "SELECT d.seq, d.extra, e.ktas, e.question, e.realism, e.evaluator, e.extra "
+                    "FROM evaluations_v1 e JOIN dialogues d ON d.seq = e.dialogue_seq").fetchall()
+                for seq, extra, ktas, question, realism, evaluator, eval_extra in rows:
+                    latest = dict(zip(EVAL_FIELDS, (ktas, question, realism, evaluator)))
+                    if eval_extra:
+                        latest.update(json.loads(eval_extra))
+                    extra = json.loads(extra) if extra else {}
+                    history = extra.pop("evaluations", None) or {}
+                    ordered = [ev for name, ev in history.items() if name != (evaluator or "")] + [latest]
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO evaluations (dialogue_seq, evaluator, ktas, question, realism, "
+                        "extra, eval_order) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [_evaluation_row(seq, ev) + (order,) for order, ev in enumerate(ordered, 1)])
+                    conn.execute("UPDATE dialogues SET extra = ? WHERE seq = ?",
+                                 (json.dumps(extra, ensure_ascii=False) if extra else None, seq))
+                conn.execute("DROP TABLE evaluations_v1")
+    conn.executescript(EVALUATION_SCHEMA)
+
+
+def _is_turn_list(dialogue):
+    """모든 턴이 정확히 turn/speaker/utterance 만 가질 때만 turns 테이블에 담음 (키가 빠진 턴은 읽을 때 None 이 채워지므로 JSON 원문으로 둠)."""
+    return isinstance(dialogue, list) and all(
+        isinstance(t, dict) and t.keys() == TURN_FIELDS for t in dialogue)
+
+
+class SqliteStore:
+    def __init__(self, path, collection, legacy_paths=()):
+        self.path = path
+        self.collection = collection
+        self.legacy_paths = legacy_paths
+        self._local = threading.local()
+        self._ready = False
+
+    # ---------- 연결 ----------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            _add_change_columns(conn)
+            _migrate_evaluations(conn)
+            self._local.conn = conn
+        if not self._ready:
+            self._ready = True
+            self._migrate_legacy(conn)
+        return conn
+
+    def _migrate_legacy(self, conn):
+        """컬렉션이 처음 열릴 때 JSONL 로그 또는 JSON 배열 파일에서 한 번 가져옵니다."""
+        key = f"migrated:{self.collection}"
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return
+        from storage import JsonlStore
+
+        records = []
+        for path in self.legacy_paths:
+            if not os.path.exists(path):
+                continue
+            if path.endswith(".jsonl"):
+                records = JsonlStore(path).load_all()
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            break
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return  # 다른 프로세스가 먼저 가져옴
+            self._insert(conn, records, self._bump(conn))
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+
+    @contextlib.contextmanager
+    def _write(self):
+        """
+        쓰기 트랜잭션 (BEGIN IMMEDIATE 로 읽기부터 쓰기까지 다른 쓰기와 직렬화).
+        먼저 generation 을 올려 load_all 캐시를 무효화하고, 그 값을 (conn, gen) 으로 넘겨
+        이 트랜잭션에서 바뀐 행의 modified_gen 으로 씁니다.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn, self._bump(conn)
+
+    def _bump(self, conn):
+        key = f"generation:{self.collection}"
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,))
+        return int(conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0])
+
+    def version(self):
+        row = self._conn().execute(
+            "SELECT value FROM meta WHERE key = ?", (f"generation:{self.collection}",)).fetchone()
+        return int(row[0]) if row else 0
+
+    # ---------- 내부 쓰기 ----------
+    def _persona_id(self, conn, persona):
+        if not persona:
+            return None
+        values = [persona.get(k) for k in PERSONA_FIELDS]
+        conn.execute(
+            "INSERT OR IGNORE INTO personas (age, gender, main_category, middle_category, ktas_level) "
+            "VALUES (?, ?, ?, ?, ?)", values)
+        row = conn.execute(
+            "SELECT persona_id FROM personas WHERE age IS ? AND gender IS ? AND main_category IS ? "
+            "AND middle_category IS ? AND ktas_level IS ?", values).fetchone()
+        return row[0]
+
+    def _write_dialogue(self, conn, seq, dialogue):
+        conn.execute("DELETE FROM turns WHERE dialogue_seq = ?", (seq,))
+        if _is_turn_list(dialogue):
+            conn.executemany(
+                "INSERT INTO turns (dialogue_seq, position, turn, speaker, utterance) VALUES (?, ?, ?, ?, ?)",
+                [(seq, i, t.get("turn"), t.get("speaker"), t.get("utterance")) for i, t in enumerate(dialogue)])
+            conn.execute("UPDATE dialogues SET raw_dialogue = NULL WHERE seq = ?", (seq,))
+        else:
+            conn.execute("UPDATE dialogues SET raw_dialogue = ? WHERE seq = ?",
+                         (json.dumps(dialogue, ensure_ascii=False), seq))
+
+    def _write_evaluation(self, conn, seq, evaluation):
+        """평가자의 평가를 최근 평가로 씁니다 (같은 평가자의 이전 행은 덮어씀). 빈 평가면 평가를 모두 지움."""
+        if not evaluation:
+            conn.execute("DELETE FROM evaluations WHERE dialogue_seq = ?", (seq,))
+            return
+        conn.execute(
+            "INSERT INTO evaluations (dialogue_seq, evaluator, ktas, question, realism, extra, eval_order) "
+            "VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(eval_order), 0) + 1 FROM evaluations WHERE dialogue_seq = ?)) "
+            "ON CONFLICT (dialogue_seq, evaluator) DO UPDATE SET ktas = excluded.ktas, question = excluded.question, "
+            "realism = excluded.realism, extra = excluded.extra, eval_order = excluded.eval_order",
+            _evaluation_row(seq, evaluation) + (seq,))
+
+    def _write_evaluations(self, conn, seq, evaluations):
+        """{평가자: 평가} 로 통째로 바꿉니다 (마지막 항목이 최근 평가)."""
+        conn.execute("DELETE FROM evaluations WHERE dialogue_seq = ?", (seq,))
+        for evaluation in (evaluations or {}).values():
+            self._write_evaluation(conn, seq, evaluation)
+
+    def _insert(self, conn, records, gen):
+        ids = []
+        now = time.time()
+        for rec in records:
+            rid = rec.get("id") or new_id()
+            extra = {k: v for k, v in rec.items() if k not in ("id", "persona", "dialogue", "evaluation", "evaluations")}
+            cur = conn.execute(
+                "INSERT INTO dialogues (id, collection, persona_id, extra, created_at, updated_at, created_gen, "
+                "modified_gen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (rid, self.collection, self._persona_id(conn, rec.get("persona")),
+                 json.dumps(extra, ensure_ascii=False) if extra else None, now, now, gen, gen))
+            seq = cur.lastrowid
+            self._write_dialogue(conn, seq, rec.get("dialogue", {}))
+            if rec.get("evaluations"):
+                self._write_evaluations(conn, seq, rec["evaluations"])
+            if rec.get("evaluation"):
+                self._write_evaluation(conn, seq, rec["evaluation"])
+            ids.append(rid)
+        return ids
+
+    # ---------- 쓰기 ----------
+    def append(self, record):
+        return self.extend([record])[0]
+
+    def extend(self, records):
+        with self._write() as (conn, gen):
+            return self._insert(conn, records, gen)
+
+    def _update(self, conn, record_id, fields, gen):
+        row = conn.execute("SELECT seq, extra FROM dialogues WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return
+        seq, extra = row[0], json.loads(row[1]) if row[1] else {}
+        if "evaluations" in fields:  # 함께 주어진 evaluation 이 최근 평가가 되도록 먼저
+            self._write_evaluations(conn, seq, fields["evaluations"])
+        for key, value in fields.items():
+            if key == "evaluations":
+                continue
+            if key == "evaluation":
+                self._write_evaluation(conn, seq, value)
+            elif key == "dialogue":
+                self._write_dialogue(conn, seq, value)
+            elif key == "persona":
+                conn.execute("UPDATE dialogues SET persona_id = ? WHERE seq = ?",
+                             (self._persona_id(conn, value), seq))
+            else:
+                extra[key] = value
+        conn.execute("UPDATE dialogues SET extra = ?, updated_at = ?, modified_gen = ? WHERE seq = ?",
+                     (json.dumps(extra, ensure_ascii=False) if extra else None, time.time(), gen, seq))
+
+    def update(self, record_id, fields):
+        with self._write() as (conn, gen):
+            self._update(conn, record_id, fields, gen)
+
+    def update_many(self, updates):
+        """{id: fields} 를 한 트랜잭션으로 반영합니다."""
+        with self._write() as (conn, gen):
+            for record_id, fields in updates.items():
+                self._update(conn, record_id, fields, gen)
+
+    def add_evaluation(self, record_id, evaluation):
+        """평가자별 평가 추가. 읽기부터 쓰기까지 한 쓰기 트랜잭션이라 다른 쓰기와 직렬화됩니다."""
+        with self._write() as (conn, gen):
+            row = conn.execute("SELECT seq FROM dialogues WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return
+            self._write_evaluation(conn, row[0], evaluation)
+            conn.execute("UPDATE dialogues SET updated_at = ?, modified_gen = ? WHERE seq = ?",
+                         (time.time(), gen, row[0]))
+
+    def _delete(self, conn, gen, where, params):
+        """행을 지우고 변경분 내보내기용 삭제 기록을 남깁니다."""
+        conn.execute(
+            "INSERT INTO deletions (collection, id, created_gen, deleted_gen, deleted_at) "
+            "SELECT collection, id, created_gen, ?, ? FROM dialogues WHERE " + where, (gen, time.time()) + params)
+        conn.execute("DELETE FROM dialogues WHERE " + where, params)
+
+    def delete(self, record_id):
+        with self._write() as (conn, gen):
+            self._delete(conn, gen, "id = ?", (record_id,))
+
+    def delete_last(self):
+        with self._write() as (conn, gen):
+            row = conn.execute(
+                "SELECT id FROM dialogues WHERE collection = ? ORDER BY seq DESC LIMIT 1",
+                (self.collection,)).fetchone()
+            if row is None:
+                return None
+            self._delete(conn, gen, "id = ?", (row[0],))
+            return row[0]
+
+    def replace_all(self, records):
+        with self._write() as (conn, gen):
+            self._delete(conn, gen, "collection = ?", (self.collection,))
+            return self._insert(conn, records, gen)
+
+    # ---------- 읽기 ----------
+    def _select(self, where="", params=(), with_dialogue=True):
+        conn = self._conn()
+        sql = (
+            "SELECT d.seq, d.id, d.raw_dialogue, d.extra, "
+            "p.age, p.gender, p.main_category, p.middle_category, p.ktas_level "
+            "FROM dialogues d "
+            "LEFT JOIN personas p ON p.persona_id = d.persona_id "
+            "WHERE d.collection = ?" + where + " ORDER BY d.seq")
+        rows = conn.execute(sql, (self.collection,) + tuple(params)).fetchall()
+        if not rows:
+            return []
+
+        evaluations = {}
+        if where:
+            seqs = json.dumps([r[0] for r in rows])
+            eval_rows = conn.execute(
+                "SELECT dialogue_seq, ktas, question, realism, evaluator, extra FROM evaluations "
+                "WHERE dialogue_seq IN (SELECT value FROM json_each(?)) ORDER BY dialogue_seq, eval_order", (seqs,))
+        else:
+            eval_rows = conn.execute(
+                "SELECT e.dialogue_seq, e.ktas, e.question, e.realism, e.evaluator, e.extra FROM evaluations e "
+                "JOIN dialogues d ON d.seq = e.dialogue_seq WHERE d.collection = ? "
+                "ORDER BY e.dialogue_seq, e.eval_order", (self.collection,))
+        for r in eval_rows:
+            evaluation = dict(zip(EVAL_FIELDS, r[1:5]))
+            if r[5]:
+                evaluation.update(json.loads(r[5]))
+            evaluations.setdefault(r[0], {})[r[4]] = evaluation
+
+        turns = {}
+        if not with_dialogue:
+            turn_rows = ()
+        elif where:
+            q = ("SELECT dialogue_seq, turn, speaker, utterance FROM turns "
+                 "WHERE dialogue_seq IN (SELECT value FROM json_each(?)) ORDER BY dialogue_seq, position")
+            turn_rows = conn.execute(q, (seqs,))
+        else:
+            turn_rows = conn.execute(
+                "SELECT t.dialogue_seq, t.turn, t.speaker, t.utterance FROM turns t "
+                "JOIN dialogues d ON d.seq = t.dialogue_seq WHERE d.collection = ? "
+                "ORDER BY t.dialogue_seq, t.position", (self.collection,))
+        for seq, turn, speaker, utterance in turn_rows:
+            turns.setdefault(seq, []).append({"turn": turn, "speaker": speaker, "utterance": utterance})
+
+        records = []
+        for r in rows:
+            rec = json.loads(r[3]) if r[3] else {}
+            if any(v is not None for v in r[4:9]):
+                rec["persona"] = dict(zip(PERSONA_FIELDS, r[4:9]))
+            if with_dialogue:
+                rec["dialogue"] = json.loads(r[2]) if r[2] is not None else turns.get(r[0], [])
+            if r[0] in evaluations:
+                by_evaluator = evaluations[r[0]]
+                rec["evaluation"] = list(by_evaluator.values())[-1]  # eval_order 순으로 읽었으므로 마지막이 최근
+                rec["evaluations"] = by_evaluator
+            rec["id"] = r[1]
+            records.append(rec)
+        return records
+
+    def load_all(self):
+        key = (os.path.abspath(self.path), self.collection)
+        generation = self.version()
+        with _loaded_lock:
+            cached = _loaded.get(key)
+        if cached and cached[0] == generation:
+            return list(cached[1])
+        records = self._select()
+        with _loaded_lock:
+            _loaded[key] = (generation, records)
+        return list(records)
+
+    def get(self, record_id):
+        records = self._select(" AND d.id = ?", (record_id,))
+        return records[0] if records else None
+
+    def get_many(self, record_ids):
+        if not record_ids:
+            return []
+        records = self._select(" AND d.id IN (SELECT value FROM json_each(?))", (json.dumps(list(record_ids)),))
+        by_id = {rec["id"]: rec for rec in records}
+        return [by_id[rid] for rid in record_ids if rid in by_id]
+
+    def ids(self):
+        rows = self._conn().execute(
+            "SELECT id FROM dialogues WHERE collection = ? ORDER BY seq", (self.collection,))
+        return [r[0] for r in rows]
+
+    def unevaluated_ids(self):
+        rows = self._conn().execute(
+            "SELECT d.id FROM dialogues d WHERE d.collection = ? "
+            "AND NOT EXISTS (SELECT 1 FROM evaluations e WHERE e.dialogue_seq = d.seq) ORDER BY d.seq",
+            (self.collection,))
+        return [r[0] for r in rows]
+
+    def light_records(self):
+        """본문(dialogue)을 뺀 레코드 목록 (턴 테이블은 읽지 않음). 매번 새 dict."""
+        return self._select(with_dialogue=False)
+
+    def invalid_ids(self):
+        """자동 규칙 검사(validation)에서 위반으로 표시된 대화 id."""
+        rows = self._conn().execute(
+            "SELECT id FROM dialogues WHERE collection = ? AND json_extract(extra, '$.validation.ok') = 0 "
+            "ORDER BY seq", (self.collection,))
+        return [r[0] for r in rows]
+
+    def list(self, **filters):
+        """
+        ktas_level, main_category, middle_category, evaluator, ktas 로 거른 목록 (인덱스 조회).
+        evaluator 는 그 평가자가 평가한 대화 전부, ktas 는 최근 평가의 KTAS 응답 기준입니다.
+        """
+        where, params = "", []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            where += f" AND {FILTERS[key]}"
+            params.append(value)
+        return self._select(where, params)
+
+    def count(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM dialogues WHERE collection = ?", (self.collection,)).fetchone()[0]
+
+    def iter_chunks(self, chunk_size=1000):
+        """레코드를 chunk_size 개씩 조회해 돌려줍니다 (한 번에 한 묶음만 메모리에 올림)."""
+        seqs = [r[0] for r in self._conn().execute(
+            "SELECT seq FROM dialogues WHERE collection = ? ORDER BY seq", (self.collection,))]
+        for i in range(0, len(seqs), chunk_size):
+            yield self._select(" AND d.seq IN (SELECT value FROM json_each(?))",
+                               (json.dumps(seqs[i:i + chunk_size]),))
+
+    # ---------- 변경 추적 ----------
+    def change_stamp(self):
+        """지금 상태의 변경 위치 {"generation"} (변경분 내보내기 체크포인트에 저장)."""
+        return {"generation": self.version()}
+
+    def changes_since(self, stamp):
+        """
+        stamp 이후의 변경 [{"id", "change": insert|update|delete, "modified": ts}] 과 지금 stamp 를 돌려줍니다.
+        modified_gen/deleted_gen 인덱스 조회라 비용이 변경량에 비례합니다. 이어갈 수 없는 stamp 면 None.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")  # 아래 조회들이 같은 스냅숏을 보도록
+            current = self.change_stamp()
+            since = stamp.get("generation")
+            if since is None or since > current["generation"]:
+                return None, current
+            upserts = conn.execute(
+                "SELECT id, created_gen, updated_at FROM dialogues WHERE collection = ? AND modified_gen > ? "
+                "ORDER BY modified_gen, seq", (self.collection, since)).fetchall()
+            deleted = conn.execute(
+                "SELECT id, deleted_at FROM deletions WHERE collection = ? AND deleted_gen > ? "
+                "AND COALESCE(created_gen, 0) <= ? ORDER BY deleted_gen", (self.collection, since, since)).fetchall()
+        changes = [{"id": rid, "change": "insert" if (created or 0) > since else "update", "modified": ts}
+                   for rid, created, ts in upserts]
+        by_id = {c["id"]: c for c in changes}
+        removed = []
+        for rid, ts in deleted:
+            if rid in by_id:
+                by_id[rid]["change"] = "update"  # 지운 뒤 같은 id 로 다시 추가됨
+            else:
+                removed.append({"id": rid, "change": "delete", "modified": ts})
+        return removed + changes, current
+
+    # ---------- 유지보수 ----------
+    def compact(self):
+        conn = self._conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        return self.count()
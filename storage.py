@@ -0,0 +1,444 @@
+"""
+대화 저장소: append-only JSONL 연산 로그.
+
+전체 파일을 다시 쓰지 않고 한 줄씩 덧붙이므로 저장 비용이 코퍼스 크기와 무관합니다.
+각 줄은 하나의 연산이며, 읽을 때 순서대로 재생(replay)해 현재 상태를 만듭니다.
+
+    {"op": "add",    "id": "...", "ts": 1700000000.0, "data": {"persona": ..., "dialogue": ...}}
+    {"op": "update", "id": "...", "ts": 1700000000.0, "fields": {"evaluation": {...}}}
+    {"op": "evaluate", "id": "...", "ts": 1700000000.0, "evaluation": {..., "evaluator": "..."}}
+    {"op": "delete", "id": "...", "ts": 1700000000.0}
+
+compact()/replace_all() 로 다시 쓴 로그는 첫 줄에 epoch 머리줄을 둡니다 (재생할 때는 무시).
+
+    {"op": "epoch", "id": "...", "ts": ..., "previous": [{"epoch": "...", "offset": 123}], "end": "0000000000004567"}
+
+(epoch, 바이트 위치) 가 변경 위치(stamp)이며, changes_since(stamp) 는 그 뒤의 로그 끝부분만 읽어
+바뀐 id 를 돌려줍니다 (변경분 내보내기). compact 는 내용이 같으므로 다시 쓰기 직전 위치를 previous 에
+남겨 이전 stamp 를 새 로그의 end(다시 쓴 레코드 바로 뒤)로 이어 줍니다.
+
+load_all()이 돌려주는 각 레코드에는 안정적인 "id" 키가 포함됩니다.
+파싱된 상태는 프로세스 안에서 파일 식별자(inode, 크기, mtime)로 캐시되며, 파일이 뒤에
+덧붙여지기만 했다면 새로 추가된 줄만 읽어 갱신합니다. 반환되는 레코드는 읽기 전용으로 다뤄야 합니다.
+
+쓰기는 <로그>.lock 파일에 대한 배타 잠금(fcntl.flock) 안에서 하므로 여러 프로세스가 동시에
+덧붙이거나 로그를 다시 써도 줄이 섞이거나 사라지지 않습니다. 평가는 레코드를 읽어 고친 뒤 다시
+쓰지 않고 "evaluate" 연산 하나로 덧붙이며, 재생할 때 평가자별로 합치므로 여러 평가자가 동시에
+저장해도 서로의 평가를 덮어쓰지 않습니다.
+
+백엔드는 환경변수 DIALOGUE_STORE 로 고릅니다: "jsonl"(기본) 또는 "sqlite" (sqlite_store.py).
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 프로세스 안의 잠금만 사용
+    fcntl = None
+
+DATA_DIR = "data"
+SQLITE_PATH = os.path.join(DATA_DIR, "store.sqlite3")
+EPOCH_END_WIDTH = 16  # 머리줄의 end 자리 (레코드를 다 쓴 뒤 같은 길이로 덮어씀)
+MAX_PREVIOUS_EPOCHS = 50
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def evaluations_of(rec):
+    """{평가자: 평가}. evaluations 가 없는 이전 레코드는 evaluation 하나를 그 평가자의 것으로 봅니다."""
+    evaluations = rec.get("evaluations")
+    if evaluations:
+        return evaluations
+    evaluation = rec.get("evaluation")
+    if evaluation:
+        return {evaluation.get("evaluator", ""): evaluation}
+    return {}
+
+
+def merge_evaluation(rec, evaluation):
+    """평가자별 평가를 합친 필드 (같은 평가자의 이전 평가는 덮어씀). evaluation 은 최근 평가."""
+    evaluations = dict(evaluations_of(rec))
+    evaluations[evaluation.get("evaluator", "")] = evaluation
+    return {"evaluation": evaluation, "evaluations": evaluations}
+
+
+def replay(lines, state=None):
+    """연산 줄들을 재생해 {id: record} (삽입 순서 유지)를 만듭니다."""
+    state = {} if state is None else state
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            op = json.loads(line)
+        except ValueError:
+            # 쓰기 도중 중단된 마지막 줄 등은 건너뜀
+            continue
+        kind, rid = op.get("op"), op.get("id")
+        if kind == "add":
+            rec = dict(op.get("data", {}))
+            rec["id"] = rid
+            state[rid] = rec
+        elif kind == "update" and rid in state:
+            # 이미 반환된 레코드가 바뀌지 않도록 새 dict 로 교체
+            state[rid] = {**state[rid], **op.get("fields", {})}
+        elif kind == "evaluate" and rid in state:
+            state[rid] = {**state[rid], **merge_evaluation(state[rid], op.get("evaluation") or {})}
+        elif kind == "delete":
+            state.pop(rid, None)
+    return state
+
+
+def log_changes(lines):
+    """
+    연산 줄들에서 id 별 변경을 처음 나온 순서대로 모읍니다: [{"id", "change", "modified"}].
+    이 구간에서 추가됐으면 insert, 원래 있던 레코드면 update/delete (추가 후 삭제는 뺌).
+    """
+    seen = {}  # id → [처음 연산, 마지막 연산, 마지막 ts]
+    for line in lines:
+        try:
+            op = json.loads(line)
+        except ValueError:
+            continue
+        kind, rid = op.get("op"), op.get("id")
+        if kind not in ("add", "update", "evaluate", "delete") or rid is None:
+            continue
+        entry = seen.get(rid)
+        if entry is None:
+            seen[rid] = [kind, kind, op.get("ts")]
+        else:
+            entry[1], entry[2] = kind, op.get("ts")
+    changes = []
+    for rid, (first, last, ts) in seen.items():
+        if last == "delete":
+            if first != "add":
+                changes.append({"id": rid, "change": "delete", "modified": ts})
+        else:
+            changes.append({"id": rid, "change": "insert" if first == "add" else "update", "modified": ts})
+    return changes
+
+
+class _ParsedLog:
+    """한 로그 파일의 파싱 결과 캐시. offset 까지 읽은 상태를 들고 있습니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.key = None  # (st_ino, st_size, st_mtime_ns)
+        self.ino = None
+        self.offset = 0
+        self.state = {}
+
+
+_parsed_logs = {}
+_parsed_logs_lock = threading.Lock()
+
+
+def clear_parse_cache():
+    """프로세스 안의 파싱 캐시를 모두 비웁니다 (벤치마크의 콜드 측정용)."""
+    with _parsed_logs_lock:
+        _parsed_logs.clear()
+
+
+def _parsed_log(path):
+    path = os.path.abspath(path)
+    with _parsed_logs_lock:
+        return _parsed_logs.setdefault(path, _ParsedLog())
+
+
+class JsonlStore:
+    shares_records = True  # get_many/light_records 가 파싱 캐시의 레코드를 그대로 줌 (바뀐 레코드만 새 객체)
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+
+    # ---------- 내부 ----------
+    def _ensure_ready(self):
+        if os.path.exists(self.path):
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            migrate_json_array(self.legacy_path, self)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """로그 쓰기/교체를 프로세스 사이에서 직렬화합니다 (별도 .lock 파일이라 os.replace 후에도 유효)."""
+        with _parsed_log(self.path).write_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_ops(self, ops):
+        self._ensure_ready()
+        payload = "".join(_dumps(op) + "\n" for op in ops)
+        with self._locked():
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(payload)
+
+    def _read_state(self):
+        self._ensure_ready()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        cache = _parsed_log(self.path)
+        with cache.lock:
+            if cache.key == key:
+                return cache.state
+            appended = cache.ino == st.st_ino and st.st_size > cache.offset
+            if not appended:
+                cache.state, cache.offset = {}, 0
+            cache.ino = st.st_ino
+            with open(self.path, "rb") as f:
+                f.seek(cache.offset)
+                chunk = f.read(st.st_size - cache.offset)
+            # 다른 프로세스가 쓰는 중인 마지막 줄은 다음 번에 읽음
+            end = chunk.rfind(b"\n") + 1
+            state = dict(cache.state)
+            replay(chunk[:end].decode("utf-8").splitlines(), state)
+            cache.state = state
+            cache.offset += end
+            cache.key = key if end == len(chunk) else None
+            return state
+
+    def version(self):
+        """내용이 바뀌면 달라지는 값 (다른 캐시의 키로 사용)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    # ---------- 쓰기 ----------
+    def append(self, record):
+        return self.extend([record])[0]
+
+    def extend(self, records):
+        now = time.time()
+        ops = []
+        for rec in records:
+            data = {k: v for k, v in rec.items() if k != "id"}
+            ops.append({"op": "add", "id": rec.get("id") or new_id(), "ts": now, "data": data})
+        if ops:
+            self._append_ops(ops)
+        return [op["id"] for op in ops]
+
+    def update(self, record_id, fields):
+        self._append_ops([{"op": "update", "id": record_id, "ts": time.time(), "fields": fields}])
+
+    def update_many(self, updates):
+        """{id: fields} 를 한 번의 쓰기로 반영합니다 (검사 결과 일괄 저장 등)."""
+        now = time.time()
+        ops = [{"op": "update", "id": rid, "ts": now, "fields": fields} for rid, fields in updates.items()]
+        if ops:
+            self._append_ops(ops)
+
+    def add_evaluation(self, record_id, evaluation):
+        """평가자별 평가 추가 (읽지 않고 연산 한 줄만 덧붙이므로 동시 저장에도 유실 없음)."""
+        self._append_ops([{"op": "evaluate", "id": record_id, "ts": time.time(), "evaluation": evaluation}])
+
+    def delete(self, record_id):
+        self._append_ops([{"op": "delete", "id": record_id, "ts": time.time()}])
+
+    def replace_all(self, records):
+        """컬렉션 전체를 주어진 레코드로 교체합니다 (원자적 교체)."""
+        with self._locked():
+            return self._replace_locked(records)
+
+    def _replace_locked(self, records, previous=()):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        ids = []
+        tmp = self.path + ".tmp"
+        now = time.time()
+        placeholder = "0" * EPOCH_END_WIDTH
+        header = _dumps({"op": "epoch", "id": new_id(), "ts": now, "previous": list(previous),
+                         "end": placeholder}).encode("utf-8") + b"\n"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            for rec in records:
+                rid = rec.get("id") or new_id()
+                data = {k: v for k, v in rec.items() if k != "id"}
+                f.write((_dumps({"op": "add", "id": rid, "ts": now, "data": data}) + "\n").encode("utf-8"))
+                ids.append(rid)
+            end = f.tell()
+            f.seek(header.rindex(placeholder.encode("ascii")))  # end 는 머리줄의 마지막 키
+            f.write(f"{end:0{EPOCH_END_WIDTH}d}".encode("ascii"))
+        os.replace(tmp, self.path)
+        # 파일이 통째로 바뀌었으므로 파싱 캐시를 버림
+        cache = _parsed_log(self.path)
+        with cache.lock:
+            cache.key, cache.ino, cache.offset, cache.state = None, None, 0, {}
+        return ids
+
+    def delete_last(self):
+        ids = list(self._read_state())
+        if ids:
+            self.delete(ids[-1])
+            return ids[-1]
+        return None
+
+    # ---------- 읽기 ----------
+    def load_all(self):
+        return list(self._read_state().values())
+
+    def get(self, record_id):
+        return self._read_state().get(record_id)
+
+    def get_many(self, record_ids):
+        state = self._read_state()
+        return [state[rid] for rid in record_ids if rid in state]
+
+    def ids(self):
+        return list(self._read_state())
+
+    def unevaluated_ids(self):
+        return [rid for rid, rec in self._read_state().items() if not rec.get("evaluation")]
+
+    def light_records(self):
+        """
+        가벼운 필드(페르소나/평가/검사 결과)를 읽을 레코드 목록. 파싱 캐시의 레코드를 복사 없이 그대로 주므로
+        읽기만 해야 합니다. 바뀐 레코드만 새 dict 라 같은 객체인지로 변경 여부를 알 수 있습니다.
+        """
+        return list(self._read_state().values())
+
+    def invalid_ids(self):
+        """자동 규칙 검사(validation)에서 위반으로 표시된 대화 id."""
+        return [rid for rid, rec in self._read_state().items() if not (rec.get("validation") or {}).get("ok", True)]
+
+    def list(self, **filters):
+        """
+        ktas_level, main_category, middle_category, evaluator, ktas 로 거른 목록.
+        evaluator 는 그 평가자가 평가한 대화 전부, ktas 는 최근 평가의 KTAS 응답 기준입니다.
+        """
+        def match(rec):
+            persona = rec.get("persona") or {}
+            evaluation = rec.get("evaluation") or {}
+            for key, value in filters.items():
+                if value is None:
+                    continue
+                if key == "evaluator":
+                    if value not in evaluations_of(rec):
+                        return False
+                elif (evaluation if key == "ktas" else persona).get(key) != value:
+                    return False
+            return True
+        return [rec for rec in self.load_all() if match(rec)]
+
+    def count(self):
+        return len(self._read_state())
+
+    def iter_chunks(self, chunk_size=1000):
+        """레코드를 chunk_size 개씩 나눠 돌려줍니다 (전체 목록 사본을 만들지 않음)."""
+        values = iter(self._read_state().values())
+        while True:
+            chunk = list(itertools.islice(values, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    # ---------- 변경 추적 ----------
+    def _epoch_header(self):
+        """로그 첫 줄의 epoch 머리줄 (다시 쓴 적 없는 로그에는 없음 → {})."""
+        try:
+            with open(self.path, "rb") as f:
+                line = f.readline()
+        except FileNotFoundError:
+            return {}
+        try:
+            op = json.loads(line)
+        except ValueError:
+            return {}
+        return op if op.get("op") == "epoch" else {}
+
+    def _stamp_locked(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        header = self._epoch_header()
+        return header, {"epoch": header.get("id", ""), "offset": size}
+
+    def change_stamp(self):
+        """지금 상태의 변경 위치 {"epoch", "offset"} (변경분 내보내기 체크포인트에 저장)."""
+        self._ensure_ready()
+        with self._locked():
+            return self._stamp_locked()[1]
+
+    def changes_since(self, stamp):
+        """
+        stamp 이후의 변경 [{"id", "change": insert|update|delete, "modified": ts}] 과 지금 stamp 를 돌려줍니다.
+        로그에서 stamp 뒤의 끝부분만 읽으므로 비용이 변경량에 비례합니다. replace_all 로 통째로 바뀌었거나
+        다른 저장소의 stamp 라 이어갈 수 없으면 변경 목록 자리에 None 을 돌려줍니다.
+        """
+        self._ensure_ready()
+        with self._locked():
+            header, current = self._stamp_locked()
+            if "epoch" not in stamp or "offset" not in stamp:
+                return None, current
+            if stamp["epoch"] == current["epoch"] and stamp["offset"] <= current["offset"]:
+                start = stamp["offset"]
+            elif {"epoch": stamp["epoch"], "offset": stamp["offset"]} in header.get("previous", []):
+                start = int(header["end"])  # compact 직전 위치 → 다시 쓴 레코드 바로 뒤
+            else:
+                return None, current
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                tail = f.read(current["offset"] - start)
+        return log_changes(tail.decode("utf-8").splitlines()), current
+
+    # ---------- 유지보수 ----------
+    def compact(self):
+        """살아있는 레코드만 남기도록 로그를 다시 씁니다 (읽기부터 교체까지 잠금 안에서, 그 사이 쓰기 유실 없음)."""
+        self._ensure_ready()
+        with self._locked():
+            header, stamp = self._stamp_locked()
+            # 다시 쓴 직후 상태와 같은 이전 위치들도 이어받음 (그 뒤 변경이 없었던 경우)
+            inherited = header.get("previous", []) if int(header.get("end", -1)) == stamp["offset"] else []
+            previous = ([stamp] + inherited)[:MAX_PREVIOUS_EPOCHS]
+            return len(self._replace_locked(self.load_all(), previous))
+
+
+def migrate_json_array(json_path, store):
+    """
+    기존 JSON 배열 파일을 JSONL 로그로 한 번 옮기고, 원본은 .bak 으로 보존합니다.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    store.replace_all(records)
+    os.replace(json_path, json_path + ".bak")
+    return len(records)
+
+
+def open_store(name, backend=None):
+    """
+    이름으로 저장소를 엽니다. name: "dialogues"(생성 대화) 또는 "own_dialogues"(자체 대화).
+    """
+    backend = backend or os.environ.get("DIALOGUE_STORE", "jsonl")
+    jsonl_path = os.path.join(DATA_DIR, f"{name}.jsonl")
+    json_path = os.path.join(DATA_DIR, f"{name}.json")
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(SQLITE_PATH, collection=name, legacy_paths=(jsonl_path, json_path))
+    if backend != "jsonl":
+        raise ValueError(f"알 수 없는 저장소 백엔드: {backend}")
+    return JsonlStore(jsonl_path, legacy_path=json_path)
@@ -0,0 +1,127 @@
+"""
+스트리밍 생성: 토큰 스트림을 받으며 {turn, speaker, utterance} 객체를 하나씩 꺼냅니다.
+
+전체 응답을 기다린 뒤 json.loads 한 번으로 파싱하지 않으므로, 첫 턴을 바로 보여줄 수 있고
+중간 객체 하나가 깨져도 그 객체만 건너뛰고 나머지 턴은 살립니다.
+"""
+import json
+import time
+
+import telemetry
+from utils import MODEL, TEMPERATURE, build_system_prompt, create_completion, response_cache, cache_key
+
+
+class TurnStreamParser:
+    """JSON 배열 안의 최상위 객체를 완성되는 즉시 돌려주는 증분 파서."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.obj_start = None
+        self.errors = []
+
+    def feed(self, text):
+        """새로 받은 텍스트를 넣고, 이번에 완성된 턴 목록을 반환합니다."""
+        self.buffer += text
+        turns = []
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.obj_start = i
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    chunk = buf[self.obj_start:i + 1]
+                    try:
+                        turns.append(json.loads(chunk))
+                    except ValueError as e:
+                        self.errors.append({"text": chunk, "error": str(e)})
+                    self.obj_start = None
+            i += 1
+
+        # 완성된 객체 앞부분은 버려 버퍼가 계속 커지지 않게 함
+        keep = self.obj_start if self.obj_start is not None else i
+        self.buffer = buf[keep:]
+        self.pos = i - keep
+        if self.obj_start is not None:
+            self.obj_start = 0
+        return turns
+
+
+def _iter_completion_text(messages, request_timeout=None, call_info=None):
+    response, retries = create_completion(messages, request_timeout, stream=True)
+    if call_info is not None:
+        call_info["retries"] = retries
+    for chunk in response:
+        content = chunk.choices[0].delta.get("content")
+        if content:
+            yield content
+
+
+def stream_conversation(persona, on_turn=None, request_timeout=None, use_cache=True, sample=0):
+    """
+    턴이 완성될 때마다 on_turn(turn)을 호출하고, 끝나면 (result, metrics)를 반환합니다.
+    metrics: time_to_first_turn_sec, total_sec, turns, skipped(깨진 객체 수), from_cache
+    """
+    messages = [{"role": "system", "content": build_system_prompt(persona)}]
+    key = cache_key(MODEL, TEMPERATURE, messages, sample)
+    cached = response_cache.get(key) if use_cache else None
+    call_info = {}
+    pieces = [cached] if cached is not None else _iter_completion_text(messages, request_timeout, call_info)
+
+    parser = TurnStreamParser()
+    dialogue, raw = [], []
+    start = time.perf_counter()
+    first_turn = None
+    try:
+        for text in pieces:
+            raw.append(text)
+            for turn in parser.feed(text):
+                if first_turn is None:
+                    first_turn = time.perf_counter() - start
+                dialogue.append(turn)
+                if on_turn is not None:
+                    on_turn(turn)
+    except Exception as e:
+        telemetry.record_call(kind="stream", model=MODEL, persona=persona, cache_hit=cached is not None,
+                              latency_sec=time.perf_counter() - start, error=repr(e), **call_info)
+        raise
+    total = time.perf_counter() - start
+
+    # 응답 전체가 온전한 JSON일 때만 캐시에 저장
+    if cached is None and not parser.errors:
+        generated = "".join(raw)
+        try:
+            json.loads(generated)
+            response_cache.put(key, generated)
+        except ValueError:
+            pass
+
+    metrics = {
+        "time_to_first_turn_sec": round(first_turn, 3) if first_turn is not None else None,
+        "total_sec": round(total, 3),
+        "turns": len(dialogue),
+        "skipped": len(parser.errors),
+        "from_cache": cached is not None,
+    }
+    # 스트리밍 응답에는 토큰 사용량이 없으므로 지연과 파싱 결과만 기록
+    telemetry.record_call(kind="stream", model=MODEL, persona=persona, cache_hit=cached is not None,
+                          latency_sec=round(total, 4), ttft_sec=metrics["time_to_first_turn_sec"],
+                          parse_ok=bool(dialogue), turns=len(dialogue), skipped=len(parser.errors), **call_info)
+    return {"persona": persona, "dialogue": dialogue}, metrics
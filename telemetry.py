@@ -0,0 +1,87 @@
+"""
+생성 호출 계측: 호출마다 지연, 토큰 사용량, 파싱 실패, 재시도, 캐시 적중을 로컬 로그에 남깁니다.
+
+data/metrics.jsonl 에 한 줄씩 덧붙이며, 운영 탭(metrics_tab.py)과 CLI 에서 읽어 집계합니다.
+"""
+import json
+import os
+import threading
+import time
+
+METRICS_PATH = os.path.join("data", "metrics.jsonl")
+
+# 1M 토큰당 USD (입력, 출력)
+PRICES_PER_1M = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_lock = threading.Lock()
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    price_in, price_out = PRICES_PER_1M.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * price_in + (completion_tokens or 0) * price_out) / 1_000_000
+
+
+def record_call(**fields):
+    """
+    호출 1건을 기록합니다. 주요 필드:
+    kind, model, latency_sec, prompt_tokens, completion_tokens, parse_ok, error, retries, cache_hit
+    """
+    fields.setdefault("ts", time.time())
+    if "cost_usd" not in fields and fields.get("model"):
+        fields["cost_usd"] = round(call_cost(fields["model"], fields.get("prompt_tokens"),
+                                             fields.get("completion_tokens")), 6)
+    line = json.dumps(fields, ensure_ascii=False) + "\n"
+    with _lock:
+        os.makedirs(os.path.dirname(METRICS_PATH) or ".", exist_ok=True)
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def load_metrics(path=METRICS_PATH):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def summarize(records):
+    """지연 백분위, 파싱 실패율, 캐시 적중률, 토큰/비용 합계와 통과 대화당 비용."""
+    api_calls = [r for r in records if not r.get("cache_hit")]
+    latencies = sorted(r["latency_sec"] for r in api_calls if r.get("latency_sec") is not None)
+    accepted = sum(1 for r in records if r.get("parse_ok"))
+    failures = sum(1 for r in records if r.get("parse_ok") is False)
+    cost = sum(r.get("cost_usd") or 0 for r in records)
+    return {
+        "calls": len(records),
+        "api_calls": len(api_calls),
+        "cache_hits": len(records) - len(api_calls),
+        "accepted": accepted,
+        "parse_failures": failures,
+        "parse_failure_rate": round(failures / (accepted + failures), 4) if accepted + failures else 0.0,
+        "retries": sum(r.get("retries") or 0 for r in records),
+        "latency_p50_sec": _percentile(latencies, 50),
+        "latency_p90_sec": _percentile(latencies, 90),
+        "latency_p99_sec": _percentile(latencies, 99),
+        "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in records),
+        "completion_tokens": sum(r.get("completion_tokens") or 0 for r in records),
+        "cost_usd": round(cost, 4),
+        "cost_per_accepted_usd": round(cost / accepted, 6) if accepted else None,
+    }
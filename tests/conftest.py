@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_store import SqliteStore  # noqa: E402
+from storage import JsonlStore  # noqa: E402
+
+
+def make_record(i, n_turns=6):
+    dialogue = []
+    for t in range(1, n_turns + 1):
+        dialogue.append({"turn": t, "speaker": "I", "utterance": f"{i}번 환자분, 어디가 불편하세요? ({t})"})
+        dialogue.append({"turn": t, "speaker": "CHATGPT", "utterance": f"어제부터 숨이 찹니다. ({t})"})
+    return {
+        "persona": {"age": "15세 이상", "gender": "남성", "main_category": "호흡기",
+                    "middle_category": "호흡곤란", "ktas_level": i % 5 + 1},
+        "dialogue": dialogue,
+    }
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteStore(str(tmp_path / "store.sqlite3"), collection="dialogues")
+    return JsonlStore(str(tmp_path / "dialogues.jsonl"))
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from aggregates import fleiss_kappa, inter_rater_agreement, krippendorff_alpha_interval
+
+# Fleiss (1971) 예: 대화 10개, 평가자 14명, 범주 5개
+FLEISS_COUNTS = [
+    [0, 0, 0, 0, 14],
+    [0, 2, 6, 4, 2],
+    [0, 0, 3, 5, 6],
+    [0, 3, 9, 2, 0],
+    [2, 2, 8, 1, 1],
+    [7, 7, 0, 0, 0],
+    [3, 2, 6, 3, 0],
+    [2, 5, 3, 2, 2],
+    [6, 5, 2, 1, 0],
+    [0, 2, 2, 3, 7],
+]
+
+# Krippendorff, "Computing Krippendorff's Alpha-Reliability" 의 평가자 4명 x 단위 12개 예 (구간 척도 0.849)
+NAN = math.nan
+KRIPPENDORFF_VALUES = np.array([
+    [1, 2, 3, 3, 2, 1, 4, 1, 2, NAN, NAN, NAN],
+    [1, 2, 3, 3, 2, 2, 4, 1, 2, 5, NAN, 3],
+    [NAN, 3, 3, 3, 2, 3, 4, 2, 2, 5, 1, NAN],
+    [1, 2, 3, 3, 2, 4, 4, 1, 2, 5, 1, NAN],
+]).T
+
+
+def test_fleiss_kappa_reference():
+    kappa, observed = fleiss_kappa(FLEISS_COUNTS)
+    assert kappa == pytest.approx(0.210, abs=1e-3)
+    assert observed == pytest.approx(0.378, abs=1e-3)
+
+
+def test_fleiss_kappa_skips_single_ratings():
+    assert fleiss_kappa([[1, 0], [0, 1]]) == (None, None)
+    kappa, observed = fleiss_kappa([[2, 0], [0, 2], [1, 0]])
+    assert kappa == pytest.approx(1.0) and observed == pytest.approx(1.0)
+
+
+def test_krippendorff_alpha_reference():
+    assert krippendorff_alpha_interval(KRIPPENDORFF_VALUES) == pytest.approx(0.849, abs=1e-3)
+
+
+def test_krippendorff_alpha_edge_cases():
+    assert krippendorff_alpha_interval([[3, 3], [5, 5]]) == pytest.approx(1.0)
+    assert krippendorff_alpha_interval([[3, NAN], [5, NAN]]) is None
+    assert krippendorff_alpha_interval([[4, 4], [4, 4]]) is None  # 값이 하나뿐이면 기대 불일치가 0
+
+
+def test_inter_rater_agreement():
+    items = [
+        {"kim": {"ktas": "Y", "question": 7, "realism": 8}, "lee": {"ktas": "Y", "question": 5, "realism": 8}},
+        {"kim": {"ktas": "N", "question": 3, "realism": 2}, "lee": {"ktas": "N", "question": 3, "realism": 4},
+         "park": {"ktas": "N", "question": 4, "realism": 3}},
+    ]
+    result = inter_rater_agreement(items)
+    assert result["dialogues"] == 2 and result["ratings"] == 5
+    assert result["ktas_pairwise_agreement"] == 1.0
+    assert result["question_mean_abs_diff"] == pytest.approx((2 + 0 + 1 + 1) / 4, abs=1e-3)
+    assert result["realism_mean_abs_diff"] == pytest.approx((0 + 2 + 1 + 1) / 4, abs=1e-3)
+    assert inter_rater_agreement([]) == {"dialogues": 0, "ratings": 0}
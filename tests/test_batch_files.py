@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from batch_files import parse_result_line
+
+DIALOGUE = [{"turn": 1, "speaker": "I", "utterance": "들어오세요."},
+            {"turn": 1, "speaker": "CHATGPT", "utterance": "안녕하세요."}]
+
+
+def result_line(content=None, status_code=200, error=None, finish_reason="stop", custom_id="req-1"):
+    content = json.dumps(DIALOGUE, ensure_ascii=False) if content is None else content
+    body = {"choices": [{"message": {"content": content}, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20}}
+    return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body},
+                       "error": error}, ensure_ascii=False)
+
+
+def test_parse_ok():
+    custom_id, dialogue, usage, error = parse_result_line(result_line())
+    assert (custom_id, dialogue, error) == ("req-1", DIALOGUE, None)
+    assert usage == {"prompt_tokens": 10, "completion_tokens": 20}
+
+
+def test_parse_wrapped_dialogue():
+    content = json.dumps({"dialogue": DIALOGUE}, ensure_ascii=False)
+    assert parse_result_line(result_line(content))[1] == {"dialogue": DIALOGUE}
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("{not json", "결과 줄 JSON 파싱 실패"),
+    (result_line(error={"code": "server_error"}), "요청 오류"),
+    (result_line(status_code=500), "HTTP 500"),
+    (json.dumps({"custom_id": "req-1", "response": {"status_code": 200, "body": {"choices": []}}}),
+     "응답에 choices[0].message.content 없음"),
+    (result_line(finish_reason="length"), "응답이 길이 제한으로 잘림"),
+    (result_line("대화가 아님"), "대화 JSON 파싱 실패"),
+    (result_line("[]"), "턴이 없음"),
+    (result_line('[{"speaker": "I"}]'), "1번째 턴에 utterance 없음"),
+])
+def test_parse_errors(line, expected):
+    custom_id, dialogue, usage, error = parse_result_line(line)
+    assert dialogue is None and usage is None
+    assert error.startswith(expected)
+    if not line.startswith("{not"):
+        assert custom_id == "req-1"
+
+
+def test_rejected_near_duplicates_are_not_exported_again(tmp_path, monkeypatch):
+    import utils
+    from batch_files import export_batch_requests, import_batch_results, load_rejected, rejected_path
+    from batch_generation import persona_grid
+    from fake_openai import write_fake_batch_results
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(utils, "NEAR_DUP_MODE", "reject")
+    personas = persona_grid(["15세 이상"], ["남성", "여성"], [("호흡기", "호흡곤란")], [1, 2])
+    export_batch_requests(personas, "batch/b.jsonl")
+    write_fake_batch_results("batch/b.jsonl", "batch/r.jsonl")  # 모든 결과가 같은 대화
+
+    stats = import_batch_results("batch/r.jsonl", "batch/b.personas.jsonl")
+    assert (stats["saved"], stats["rejected_near_duplicates"]) == (1, 3)
+    assert rejected_path("batch/b.personas.jsonl") == "batch/b.rejected.jsonl"
+    assert len(load_rejected("batch/b.rejected.jsonl")) == 3
+
+    again = import_batch_results("batch/r.jsonl", "batch/b.personas.jsonl")
+    assert (again["saved"], again["skipped_existing"], again["skipped_rejected"]) == (0, 1, 3)
+    assert len(load_rejected("batch/b.rejected.jsonl")) == 3
+
+    plan = export_batch_requests(personas, "batch/b.jsonl")
+    assert (plan["requests"], plan["skipped_existing"], plan["skipped_rejected"]) == (0, 1, 3)
+    assert export_batch_requests(personas, "batch/b.jsonl", skip_existing=False)["requests"] == 4
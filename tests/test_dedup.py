@@ -0,0 +1,39 @@
+from conftest import make_record
+from dedup import content_hash, content_index, merge_into
+
+
+def full_index(store):
+    index = {}
+    for rec in store.load_all():
+        index.setdefault(rec.get("content_hash") or content_hash(rec["dialogue"]), rec["id"])
+    return index
+
+
+def test_merge_into_counts(store):
+    first = merge_into(store, [make_record(0), make_record(1), make_record(0)])
+    assert (first["added"], first["duplicate"], first["changed"]) == (2, 1, 0)
+
+    spaced = make_record(1)
+    spaced["dialogue"][0]["utterance"] += "  "
+    second = merge_into(store, [make_record(0), spaced, make_record(2)])
+    assert (second["added"], second["duplicate"], second["changed"]) == (1, 1, 1)
+    assert store.count() == 3
+
+
+def test_content_index_follows_changes(store):
+    ids = store.extend([make_record(i) for i in range(4)])
+    assert content_index(store) == full_index(store)
+
+    (twin,) = store.extend([make_record(0)])  # 같은 내용의 두 번째 레코드
+    store.update(ids[1], {"dialogue": make_record(9)["dialogue"]})
+    store.add_evaluation(ids[2], {"ktas": "Y", "question": 5, "realism": 5, "evaluator": "kim"})
+    store.delete(ids[3])
+    merge_into(store, [make_record(5)])
+    assert content_index(store) == full_index(store)
+
+    store.delete(ids[0])  # 색인이 가리키던 레코드가 지워지면 같은 내용의 남은 레코드로
+    assert content_index(store)[content_hash(make_record(0)["dialogue"])] == twin
+    assert content_index(store) == full_index(store)
+
+    store.replace_all([make_record(7)])
+    assert content_index(store) == full_index(store)
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+from conftest import make_record
+from delta_export import delete_checkpoint, export_changes, load_checkpoints, pending_changes
+
+
+def export_rows(store, path, **kwargs):
+    f = io.BytesIO()
+    stats = export_changes(store, "jsonl", f, path=path, **kwargs)
+    return stats, [json.loads(line) for line in f.getvalue().decode("utf-8").splitlines()]
+
+
+def test_full_then_delta(store, tmp_path):
+    path = str(tmp_path / "checkpoints.json")
+    ids = store.extend([make_record(i) for i in range(3)])
+
+    stats, rows = export_rows(store, path, checkpoint="base")
+    assert stats["full"] and stats["rows"] == 3 and stats["insert"] == 3
+    assert [row["id"] for row in rows] == ids
+    assert "base" in load_checkpoints(store, path)
+
+    (added,) = store.extend([make_record(3)])
+    store.update(ids[0], {"note": "x"})
+    store.delete(ids[1])
+    assert len(pending_changes(store, "base", path)) == 3
+
+    stats, rows = export_rows(store, path, since="base", checkpoint="next")
+    assert not stats["full"]
+    assert (stats["insert"], stats["update"], stats["delete"]) == (1, 1, 1)
+    by_id = {row["id"]: row for row in rows}
+    assert by_id[added]["change"] == "insert"
+    assert by_id[ids[0]]["change"] == "update" and by_id[ids[0]]["note"] == "x"
+    assert by_id[ids[1]] == {"id": ids[1], "change": "delete", "modified": by_id[ids[1]]["modified"]}
+
+    stats, rows = export_rows(store, path, since="next")
+    assert stats["rows"] == 0 and rows == []
+
+
+def test_checkpoint_saved_only_when_named(store, tmp_path):
+    path = str(tmp_path / "checkpoints.json")
+    store.extend([make_record(0)])
+    export_rows(store, path)
+    assert load_checkpoints(store, path) == {}
+
+    export_rows(store, path, checkpoint="base")
+    assert delete_checkpoint(store, "base", path)
+    assert not delete_checkpoint(store, "base", path)
+
+
+def test_unknown_checkpoint(store, tmp_path):
+    path = str(tmp_path / "checkpoints.json")
+    with pytest.raises(KeyError):
+        export_rows(store, path, since="missing")
+
+
+def test_replace_all_falls_back_to_full(store, tmp_path):
+    path = str(tmp_path / "checkpoints.json")
+    store.extend([make_record(i) for i in range(2)])
+    export_rows(store, path, checkpoint="base")
+    new_ids = store.replace_all([make_record(i) for i in range(5, 8)])
+
+    stats, rows = export_rows(store, path, since="base")
+    live = {row["id"] for row in rows if row["change"] != "delete"}
+    assert live == set(new_ids)
+    if stats["full"]:
+        assert stats["insert"] == 3 and stats["delete"] == 0
@@ -0,0 +1,28 @@
+import pytest
+
+from ingest import validate_turns
+
+TURN = {"turn": 1, "speaker": "I", "utterance": "들어오세요."}
+
+
+@pytest.mark.parametrize("dialogue", [
+    [TURN],
+    [TURN, {"speaker": "CHATGPT", "utterance": "네."}],  # turn 은 없어도 됨
+    [dict(TURN, extra="x")],
+    {"dialogue": [TURN]},
+])
+def test_valid(dialogue):
+    assert validate_turns(dialogue) is None
+
+
+@pytest.mark.parametrize("dialogue, expected", [
+    ({"turns": [TURN]}, "턴 목록이 아닌 JSON 객체"),
+    ("들어오세요.", "턴 목록이 아님"),
+    (None, "턴 목록이 아님"),
+    ([], "턴이 없음"),
+    ([TURN, "x"], "2번째 항목이 객체가 아님"),
+    ([TURN, {"turn": 1}], "2번째 턴에 speaker, utterance 없음"),
+    ([{"speaker": "I", "utterance": 3}], "1번째 턴의 utterance 가 문자열이 아님"),
+])
+def test_invalid(dialogue, expected):
+    assert validate_turns(dialogue) == expected
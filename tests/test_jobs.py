@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+import jobs
+from jobs import JobQueue
+
+PERSONA = {"age": "15세 이상", "gender": "남성", "main_category": "호흡기", "middle_category": "호흡곤란",
+           "ktas_level": 3}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def expire_leases(queue):
+    with queue._write() as conn:
+        conn.execute("UPDATE tasks SET lease_until = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def test_claim_is_exclusive(queue):
+    job_id = queue.enqueue([PERSONA, PERSONA])
+    a, b = queue.claim("w1"), queue.claim("w2")
+    assert {a["task_id"], b["task_id"]} == {1, 2}
+    assert (a["sample"], b["sample"]) == (0, 1)
+    assert queue.claim("w3") is None
+    assert queue.job(job_id)["running"] == 2
+
+
+def test_complete_only_by_owner(queue):
+    job_id = queue.enqueue([PERSONA])
+    task = queue.claim("w1")
+    assert not queue.complete(dict(task, worker="w2"), "d-1")
+    assert queue.complete(task, "d-1")
+    assert not queue.complete(task, "d-1")  # 이미 끝남
+    job = queue.job(job_id)
+    assert (job["done"], job["status"]) == (1, "done")
+
+
+def test_expired_lease_moves_to_other_worker(queue):
+    job_id = queue.enqueue([PERSONA])
+    stale = queue.claim("w1")
+    expire_leases(queue)
+    fresh = queue.claim("w2")
+    assert fresh["task_id"] == stale["task_id"] and fresh["attempt"] == 2
+
+    # 늦게 끝난 이전 워커의 기록은 무시됨
+    assert not queue.complete(stale, "stale")
+    assert not queue.fail(stale, "late error")
+    assert queue.complete(fresh, "d-2")
+    assert queue.job(job_id)["done"] == 1
+
+
+def test_heartbeat_extends_only_own_leases(queue):
+    queue.enqueue([PERSONA, PERSONA])
+    mine, other = queue.claim("w1"), queue.claim("w2")
+    expire_leases(queue)
+    queue.heartbeat("w1", done=3)
+
+    assert queue.claim("w3")["task_id"] == other["task_id"]  # w2 의 임대만 넘어감
+    assert queue.complete(mine, "d-1")
+    (worker,) = [w for w in queue.live_workers() if w["worker"] == "w1"]
+    assert worker["done"] == 3
+
+
+def test_fail_retries_then_gives_up(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "RETRY_BASE_SEC", 0)
+    job_id = queue.enqueue([PERSONA], max_attempts=2)
+    task = queue.claim("w1")
+    assert queue.fail(task, "timeout")
+    assert queue.job(job_id)["queued"] == 1
+
+    task = queue.claim("w1")
+    assert task["attempt"] == 2
+    assert queue.fail(task, "timeout again")
+    job = queue.job(job_id)
+    assert (job["failed"], job["status"]) == (1, "failed")
+    assert queue.claim("w1") is None
+    assert queue.task_errors(job_id)[0]["error"] == "timeout again"
+
+
+def test_expired_lease_on_last_attempt_fails(queue):
+    job_id = queue.enqueue([PERSONA], max_attempts=1)
+    queue.claim("w1")
+    expire_leases(queue)
+    assert queue.claim("w2") is None
+    assert queue.job(job_id)["status"] == "failed"
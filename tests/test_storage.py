@@ -0,0 +1,156 @@
+import pytest
+
+from conftest import make_record
+from storage import JsonlStore
+
+
+def apply_changes(replica, store, changes):
+    """changes_since 결과를 사본에 적용합니다 (변경분 내보내기를 받는 쪽과 같은 방식)."""
+    records = {rec["id"]: rec for rec in store.get_many([c["id"] for c in changes if c["change"] != "delete"])}
+    for change in changes:
+        if change["change"] == "delete":
+            replica.pop(change["id"], None)
+        else:
+            replica[change["id"]] = records[change["id"]]
+    return replica
+
+
+def snapshot(store):
+    return {rec["id"]: rec for rec in store.load_all()}
+
+
+def test_extend_get_and_order(store):
+    ids = store.extend([make_record(i) for i in range(3)])
+    assert store.ids() == ids
+    assert store.count() == 3
+    assert [rec["id"] for rec in store.load_all()] == ids
+    assert store.get(ids[1])["dialogue"] == make_record(1)["dialogue"]
+    assert store.get(ids[1])["persona"]["ktas_level"] == 2
+    assert [rec["id"] for rec in store.get_many([ids[2], ids[0], "missing"])] == [ids[2], ids[0]]
+
+
+def test_update_and_delete(store):
+    ids = store.extend([make_record(i) for i in range(3)])
+    version = store.version()
+    store.update(ids[0], {"validation": {"ok": False, "violations": ["turn_count"], "version": 1}})
+    store.update_many({ids[1]: {"note": "a"}, ids[2]: {"note": "b"}})
+    assert store.version() != version
+    assert store.get(ids[0])["validation"]["ok"] is False
+    assert store.get(ids[0])["dialogue"] == make_record(0)["dialogue"]
+    assert [store.get(rid).get("note") for rid in ids[1:]] == ["a", "b"]
+    assert store.invalid_ids() == [ids[0]]
+
+    store.delete(ids[1])
+    assert store.ids() == [ids[0], ids[2]]
+    assert store.delete_last() == ids[2]
+    assert store.ids() == [ids[0]]
+
+
+def test_evaluations_by_evaluator(store):
+    (rid,) = store.extend([make_record(0)])
+    store.add_evaluation(rid, {"ktas": "Y", "question": 7, "realism": 8, "evaluator": "kim"})
+    store.add_evaluation(rid, {"ktas": "N", "question": 3, "realism": 4, "evaluator": "lee"})
+    store.add_evaluation(rid, {"ktas": "Y", "question": 9, "realism": 9, "evaluator": "kim"})
+    rec = store.get(rid)
+    assert rec["evaluation"]["evaluator"] == "kim" and rec["evaluation"]["question"] == 9
+    assert set(rec["evaluations"]) == {"kim", "lee"}
+    assert rec["evaluations"]["lee"]["ktas"] == "N"
+    assert store.unevaluated_ids() == []
+
+
+def test_changes_since_collapses_per_id(store):
+    ids = store.extend([make_record(i) for i in range(4)])
+    replica = snapshot(store)
+    stamp = store.change_stamp()
+
+    (added,) = store.extend([make_record(10)])
+    store.update(added, {"note": "new"})
+    (gone,) = store.extend([make_record(11)])
+    store.delete(gone)
+    store.update(ids[0], {"note": "x"})
+    store.add_evaluation(ids[1], {"ktas": "Y", "question": 5, "realism": 5, "evaluator": "kim"})
+    store.delete(ids[2])
+
+    changes, current = store.changes_since(stamp)
+    kinds = {c["id"]: c["change"] for c in changes}
+    assert kinds == {added: "insert", ids[0]: "update", ids[1]: "update", ids[2]: "delete"}
+    assert all(c["modified"] is not None for c in changes)
+    assert apply_changes(replica, store, changes) == snapshot(store)
+
+    assert store.changes_since(current)[0] == []
+
+
+def test_changes_since_survives_compact(store):
+    ids = store.extend([make_record(i) for i in range(3)])
+    store.delete(ids[0])
+    replica = snapshot(store)
+    stamp = store.change_stamp()
+
+    assert store.compact() == 2
+    assert snapshot(store) == replica
+    assert store.changes_since(stamp)[0] == []
+
+    store.update(ids[1], {"note": "after compact"})
+    changes, _ = store.changes_since(stamp)
+    assert [(c["id"], c["change"]) for c in changes] == [(ids[1], "update")]
+    assert apply_changes(replica, store, changes) == snapshot(store)
+
+
+def test_changes_since_after_replace_all(store):
+    store.extend([make_record(i) for i in range(3)])
+    replica = snapshot(store)
+    stamp = store.change_stamp()
+
+    new_ids = store.replace_all([make_record(i) for i in range(5, 7)])
+    assert store.ids() == new_ids
+    changes, current = store.changes_since(stamp)
+    # 이어갈 수 없으면 None (받는 쪽은 전체 교체), 이어가면 변경만으로 지금 상태가 되어야 함
+    if changes is not None:
+        assert apply_changes(replica, store, changes) == snapshot(store)
+
+    store.update(new_ids[0], {"note": "y"})
+    assert [c["id"] for c in store.changes_since(current)[0]] == [new_ids[0]]
+
+
+def test_jsonl_epochs(tmp_path):
+    store = JsonlStore(str(tmp_path / "dialogues.jsonl"))
+    store.extend([make_record(i) for i in range(2)])
+    before_compact = store.change_stamp()
+    store.compact()
+    after_compact = store.change_stamp()
+    assert after_compact["epoch"] != before_compact["epoch"]
+    assert store.changes_since(before_compact)[0] == []
+
+    store.replace_all([make_record(9)])
+    changes, current = store.changes_since(after_compact)
+    assert changes is None
+    assert current["epoch"] != after_compact["epoch"]
+    assert store.changes_since(before_compact)[0] is None
+
+
+def test_changes_since_rejects_foreign_stamp(store):
+    store.extend([make_record(0)])
+    assert store.changes_since({"epoch": "other", "offset": 10**9, "generation": 10**9})[0] is None
+
+
+@pytest.mark.parametrize("count", [0, 5])
+def test_iter_chunks(store, count):
+    ids = store.extend([make_record(i) for i in range(count)])
+    chunks = list(store.iter_chunks(2))
+    assert [len(c) for c in chunks] == [2, 2, 1][:len(chunks)]
+    assert [rec["id"] for chunk in chunks for rec in chunk] == ids
+
+
+@pytest.mark.parametrize("dialogue", [
+    [{"speaker": "I", "utterance": "들어오세요."}],  # turn 없음
+    [{"turn": 1, "speaker": "I", "utterance": "들어오세요.", "note": "x"}],
+    [{"turn": 1, "speaker": "I", "utterance": "들어오세요."}, {"turn": 1, "speaker": "CHATGPT"}],
+    [{"utterance": "들어오세요.", "turn": 1, "speaker": "I"}],
+    "챗GPT와 대화한 원문",
+    [],
+])
+def test_dialogue_round_trip(store, dialogue):
+    (rid,) = store.extend([{"dialogue": dialogue}])
+    assert store.get(rid)["dialogue"] == dialogue
+    store.update(rid, {"dialogue": dialogue})
+    assert store.get(rid)["dialogue"] == dialogue
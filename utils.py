@@ -1,13 +1,32 @@
-import openai
 import json
 import os
-import streamlit as st
+import time
+import config
+import telemetry
+from near_duplicates import save_with_check, store_index
+from validation import attach_validation, validate_dialogue, validate_store
+from aggregates import add_evaluation
+from storage import open_store
+from corpus import corpus_view
+from response_cache import ResponseCache, cache_key
 
-DATA_PATH = "data/dialogues.json"
-openai.api_key = st.secrets["OPENAI_API_KEY"]
+MODEL = "gpt-4.1"
+TEMPERATURE = 0.7
+MAX_RETRIES = 2  # 일시적 API 오류(속도 제한, 타임아웃 등) 재시도 횟수
+NEAR_DUP_MODE = os.environ.get("NEAR_DUP_MODE", "flag")  # 유사 중복 대화: flag(표시 후 저장) | reject(저장 안 함) | off
+REGENERATE_INVALID = int(os.environ.get("REGENERATE_INVALID", 1))  # 규칙 검사에 걸리면 새로 생성해 보는 횟수
+store = open_store("dialogues")  # 기본: data/dialogues.jsonl (이전 data/dialogues.json 은 최초 실행 시 자동 이전)
+response_cache = ResponseCache()
 
-def generate_conversation(persona):
-  system_prompt = f"""You are a GPT that helps you create a multi-Turn conversation between the emergency room nurse and the patient. Create a conversation according to the following seven rules:
+def get_openai():
+  """openai 는 실제로 생성할 때 불러옵니다 (저장/내보내기만 쓰는 headless 경로의 import 비용 절감)."""
+  import openai
+  if not openai.api_key:
+    openai.api_key = config.get_openai_api_key()
+  return openai
+
+def build_system_prompt(persona):
+  return f"""You are a GPT that helps you create a multi-Turn conversation between the emergency room nurse and the patient. Create a conversation according to the following seven rules:
 
 1. ** You have to create a conversation based on the patient's persona. Persona, a patient to reflect it, is as follows:
    -Patient: {persona['age']} / {persona['gender']} / {persona['main_category']} / {persona['middle_category']}
@@ -78,51 +97,134 @@ Symptom expansion
 }}
 ]
 """
-  response = openai.ChatCompletion.create(
-        model="gpt-4.1",
-        messages=[{"role": "system", "content": system_prompt}],
-        temperature=0.7
-  )
 
-  generated = response.choices[0].message.content
-  conversation_json = json.loads(generated)
-  return {"persona": persona, "dialogue": conversation_json}
+def create_completion(messages, request_timeout=None, max_retries=MAX_RETRIES, **kwargs):
+  """
+  ChatCompletion 호출. 일시적 오류는 지수 백오프로 재시도하며 (response, retries)를 반환합니다.
+  """
+  openai = get_openai()
+  transient = (openai.error.RateLimitError, openai.error.APIError, openai.error.Timeout,
+               openai.error.ServiceUnavailableError, openai.error.APIConnectionError)
+  for attempt in range(max_retries + 1):
+    try:
+      response = openai.ChatCompletion.create(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            request_timeout=request_timeout,
+            **kwargs
+      )
+      return response, attempt
+    except transient:
+      if attempt == max_retries:
+        raise
+      time.sleep(2 ** attempt)
+
+def generate_conversation(persona, request_timeout=None, use_cache=True, sample=0, regenerate_invalid=REGENERATE_INVALID):
+  """
+  use_cache=False 이면 캐시를 건너뛰고 새로 생성합니다(결과는 캐시에 갱신).
+  sample: 같은 페르소나를 여러 번 생성할 때 서로 다른 캐시 항목을 쓰기 위한 번호.
+  호출마다 지연/토큰/파싱 결과가 telemetry 로그에 기록됩니다.
+  결과에는 규칙 검사 결과(validation)가 붙고, 위반이면 regenerate_invalid 번까지 캐시 없이 다시 생성합니다.
+  """
+  result = _generate_once(persona, request_timeout, use_cache, sample)
+  for _ in range(regenerate_invalid):
+    if result["validation"]["ok"]:
+      break
+    result = _generate_once(persona, request_timeout, False, sample)
+  return result
+
+def _generate_once(persona, request_timeout, use_cache, sample):
+  system_prompt = build_system_prompt(persona)
+  messages = [{"role": "system", "content": system_prompt}]
+  key = cache_key(MODEL, TEMPERATURE, messages, sample)
+
+  start = time.perf_counter()
+  metrics = {"kind": "generate", "model": MODEL, "persona": persona}
+  generated = response_cache.get(key) if use_cache else None
+  from_cache = generated is not None
+  metrics["cache_hit"] = from_cache
+  if not from_cache:
+    try:
+      response, metrics["retries"] = create_completion(messages, request_timeout)
+    except Exception as e:
+      telemetry.record_call(latency_sec=time.perf_counter() - start, error=repr(e), **metrics)
+      raise
+    generated = response.choices[0].message.content
+    usage = response.get("usage") or {}
+    metrics["prompt_tokens"] = usage.get("prompt_tokens")
+    metrics["completion_tokens"] = usage.get("completion_tokens")
+  metrics["latency_sec"] = round(time.perf_counter() - start, 4)
+
+  try:
+    conversation_json = json.loads(generated)
+  except ValueError as e:
+    telemetry.record_call(parse_ok=False, error=repr(e), **metrics)
+    raise
+  validation = validate_dialogue(conversation_json)
+  telemetry.record_call(parse_ok=True, turns=len(conversation_json), valid=validation["ok"], **metrics)
+  if not from_cache:
+    response_cache.put(key, generated)
+  return {"persona": persona, "dialogue": conversation_json, "validation": validation}
 
 def save_conversation_json(data):
-    os.makedirs("data", exist_ok=True)
-    all_data = []
-    if os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            all_data = json.load(f)
-    all_data.append(data)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=2)
+    """
+    저장한 대화의 id 를 반환합니다. 기존 대화와 거의 같으면 data["near_duplicate"] 가 붙고,
+    NEAR_DUP_MODE=reject 이면 저장하지 않고 None 을 반환합니다.
+    """
+    ids = save_conversations_json([data])
+    return ids[0] if ids else None
+
+def save_conversations_json(items):
+    """여러 대화를 한 번의 쓰기로 저장합니다 (일괄 생성용). 저장된 id 목록을 반환합니다."""
+    attach_validation(items)  # 규칙 검사 결과가 없는 대화(스트리밍/가져오기 등)는 여기서 검사
+    return save_with_check(store, items, NEAR_DUP_MODE)
+
+def warm_near_duplicate_index():
+    """유사 중복 색인을 미리 만들어 둡니다 (앱 시작 시 백그라운드 스레드에서 호출, 첫 저장이 기다리지 않도록)."""
+    if NEAR_DUP_MODE != "off":
+        store_index(store)
 
 def load_all_dialogues():
-    if not os.path.exists(DATA_PATH):
-        return []
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return store.load_all()
+
+def dialogue_corpus():
+    """목록/평가/내보내기 화면이 같이 쓰는 읽기 전용 압축 코퍼스 (저장소가 바뀐 만큼만 갱신)."""
+    return corpus_view(store)
+
+def list_dialogue_ids():
+    return store.ids()
+
+def list_unevaluated_ids():
+    return store.unevaluated_ids()
+
+def list_invalid_ids():
+    return store.invalid_ids()
+
+def validate_dialogues(revalidate=False):
+    """저장된 대화 전체를 규칙 검사하고 결과를 저장합니다 (검사한 적 없는 대화만, revalidate=True 면 전부)."""
+    return validate_store(store, revalidate=revalidate)
+
+def load_dialogues(ids):
+    """주어진 id의 대화만 (순서대로) 불러옵니다. 공유 코퍼스에서 매번 새 dict 로 만들어 줌."""
+    return dialogue_corpus().get_many(ids)
+
+def update_evaluation_by_id(record_id, ktas, question, realism, evaluator):
+    # 평가자별로 남기고 평가 집계도 함께 갱신
+    add_evaluation(store, record_id, {
+        "ktas": ktas,
+        "question": question,
+        "realism": realism,
+        "evaluator": evaluator
+    })
 
 def update_evaluation(idx, ktas, question, realism, evaluator):
-    data = load_all_dialogues()
-    if 0 <= idx < len(data):
-        data[idx]["evaluation"] = {
-            "ktas": ktas,
-            "question": question,
-            "realism": realism,
-            "evaluator": evaluator
-        }
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-
-def delete_last_conversation():
-    import os, json
-    if os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if data:
-            data.pop()
-            with open(DATA_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    ids = list_dialogue_ids()
+    if 0 <= idx < len(ids):
+        update_evaluation_by_id(ids[idx], ktas, question, realism, evaluator)
+
+
+def delete_conversation(record_id):
+    """방금 저장한 대화를 id 로 지웁니다 (저장되지 않았으면 None 이 와서 아무것도 지우지 않음)."""
+    if record_id:
+        store.delete(record_id)
@@ -0,0 +1,228 @@
+"""
+생성 대화의 규칙 기반 자동 사전 검사 (Streamlit 비의존).
+
+생성 프롬프트(utils.build_system_prompt)가 정한 규칙을 사람이 평가하기 전에 확인합니다.
+대화 전체를 턴 단위 표 하나로 펼친 뒤 pandas 문자열/그룹 연산으로 모든 규칙을 한 번에 계산하므로
+코퍼스 전체 검사도 대화마다 파이썬 루프를 도는 것보다 빠릅니다.
+다만 표를 만드는 고정 비용이 있어 생성 직후처럼 대화가 몇 개뿐이면 같은 규칙을 순수 파이썬으로 계산합니다.
+결과는 레코드의 "validation" = {"ok", "violations": [규칙 코드], "version"} 으로 저장됩니다.
+"""
+import re
+from collections import Counter
+
+RULES_VERSION = 1  # 규칙이 바뀌면 올려서 기존 검사 결과를 다시 계산하게 함
+MIN_TURNS, MAX_TURNS = 6, 10
+SPEAKERS = ("I", "CHATGPT")
+FIRST_UTTERANCE_SUFFIX = "들어오세요."
+KOREAN_MIN_RATIO = 0.5  # 글자(한글+영문 소문자) 중 한글 비율. COPD, NRS 같은 대문자 약어는 세지 않음
+CHUNK_SIZE = 20000
+SMALL_BATCH = 200  # 이보다 적으면 pandas 표를 만들지 않고 대화마다 직접 계산 (결과는 같음)
+
+RULES = {
+    "format": "턴 목록 형식이 아님",
+    "first_utterance": "첫 발화가 '…들어오세요.' 가 아님",
+    "turn_count": f"턴 수가 {MIN_TURNS}~{MAX_TURNS} 범위 밖",
+    "speaker_pairs": "한 턴에 간호사(I)/환자(CHATGPT) 발화가 한 쌍이 아님",
+    "turn_order": "turn 번호가 1부터 1씩 증가하지 않음",
+    "korean": "한국어가 아닌 발화가 있음",
+    "one_item": "한 질문에 의료 정보 두 가지 이상",
+}
+
+# 한 턴에 한 가지 의료 정보만 묻는지 (간호사 발화에서 서로 다른 항목이 둘 이상 나오면 위반으로 봄)
+MEDICAL_ITEMS = {
+    "vital_signs": r"혈압|맥박|체온|호흡수|산소포화도|활력\s*징후|바이탈",
+    "history": r"과거력|병력|기저\s*질환|진단\s*받",
+    "medication": r"복용|약물|드시는 약|먹는 약|처방",
+    "allergy": r"알레르기|알러지",
+    "pain_score": r"NRS|통증\s*점수|몇\s*점",
+    "onset": r"언제부터|언제\s*시작",
+    "associated": r"동반|다른 증상",
+}
+_HANGUL = r"[가-힣ㄱ-ㅎㅏ-ㅣ]"
+_LATIN_LOWER = r"[a-z]"  # 영어 문장은 대부분 소문자이므로 소문자만 세면 약어를 따로 지우지 않아도 됨
+_MEDICAL_RE = {name: re.compile(pattern) for name, pattern in MEDICAL_ITEMS.items()}
+_HANGUL_RE = re.compile(_HANGUL)
+_LATIN_LOWER_RE = re.compile(_LATIN_LOWER)
+
+
+def _flatten(records):
+    """레코드 목록 → 턴 단위 열 목록. 형식이 잘못된 대화는 표에서 빼고 따로 표시합니다."""
+    from ingest import validate_turns
+
+    rec, pos, turn, speaker, utterance = [], [], [], [], []
+    bad_format = set()
+    for i, record in enumerate(records):
+        dialogue = record.get("dialogue")
+        if isinstance(dialogue, dict):
+            dialogue = dialogue.get("dialogue")
+        if validate_turns(dialogue) is not None:
+            bad_format.add(i)
+            continue
+        for j, t in enumerate(dialogue):
+            rec.append(i)
+            pos.append(j)
+            turn.append(t.get("turn"))
+            speaker.append(t["speaker"])
+            utterance.append(t["utterance"])
+    return {"rec": rec, "pos": pos, "turn": turn, "speaker": speaker, "utterance": utterance}, bad_format
+
+
+def _turn_number(value):
+    """pd.to_numeric(errors="coerce") 와 같게: 숫자/숫자 문자열은 float, 나머지는 None."""
+    if isinstance(value, (int, float)):
+        return None if value != value else float(value)
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return None if number != number else number
+    return None
+
+
+def _validate_one(turns):
+    """형식 검사를 통과한 턴 목록 하나에 대해 위반 규칙 집합을 계산합니다 (validate_records 의 표 연산과 같은 규칙)."""
+    failed = set()
+    speakers = [str(t["speaker"]).strip().upper() for t in turns]
+    numbers = [_turn_number(t.get("turn")) for t in turns]
+
+    if not (speakers[0] == "I" and turns[0]["utterance"].strip().endswith(FIRST_UTTERANCE_SUFFIX)):
+        failed.add("first_utterance")
+
+    n_turns = len({n for n in numbers if n is not None})
+    if n_turns < MIN_TURNS or n_turns > MAX_TURNS:
+        failed.add("turn_count")
+
+    pairs = {}
+    for number, speaker in zip(numbers, speakers):
+        pairs.setdefault(number, []).append(speaker)
+    if any(len(group) != 2 or len(set(group)) != 2 for group in pairs.values()) \
+            or any(speaker not in SPEAKERS for speaker in speakers):
+        failed.add("speaker_pairs")
+
+    if None in numbers or numbers[0] != 1 or any(b - a not in (0, 1) for a, b in zip(numbers, numbers[1:])):
+        failed.add("turn_order")
+
+    for t, speaker in zip(turns, speakers):
+        utterance = t["utterance"]
+        hangul = len(_HANGUL_RE.findall(utterance))
+        letters = hangul + len(_LATIN_LOWER_RE.findall(utterance))
+        if letters > 0 and hangul < KOREAN_MIN_RATIO * letters:
+            failed.add("korean")
+        if speaker == "I" and sum(1 for pattern in _MEDICAL_RE.values() if pattern.search(utterance)) >= 2:
+            failed.add("one_item")
+    return failed
+
+
+def _validate_small(records):
+    from ingest import validate_turns
+
+    results = []
+    for record in records:
+        dialogue = record.get("dialogue")
+        if isinstance(dialogue, dict):
+            dialogue = dialogue.get("dialogue")
+        failed = {"format"} if validate_turns(dialogue) is not None else _validate_one(dialogue)
+        violations = [rule for rule in RULES if rule in failed]
+        results.append({"ok": not violations, "violations": violations, "version": RULES_VERSION})
+    return results
+
+
+def validate_records(records):
+    """레코드마다 {"ok", "violations", "version"} 을 같은 순서로 반환합니다."""
+    if len(records) < SMALL_BATCH:
+        return _validate_small(records)
+    return _validate_table(records)
+
+
+def _validate_table(records):
+    import numpy as np
+    import pandas as pd
+
+    columns, bad_format = _flatten(records)
+    df = pd.DataFrame(columns)
+    failed = {rule: np.zeros(len(records), dtype=bool) for rule in RULES}
+    failed["format"][list(bad_format)] = True
+
+    if len(df):
+        rec = df["rec"].to_numpy()
+        speaker = df["speaker"].astype(str).str.strip().str.upper()
+        utterance = df["utterance"]
+        turn = pd.to_numeric(df["turn"], errors="coerce")
+
+        first = df["pos"].to_numpy() == 0
+        first_ok = (speaker == "I") & utterance.str.strip().str.endswith(FIRST_UTTERANCE_SUFFIX)
+        failed["first_utterance"][rec[first & ~first_ok.to_numpy()]] = True
+
+        n_turns = turn.groupby(rec).nunique()
+        failed["turn_count"][n_turns.index[(n_turns < MIN_TURNS) | (n_turns > MAX_TURNS)]] = True
+
+        pairs = pd.DataFrame({"rec": rec, "turn": turn, "speaker": speaker}).groupby(["rec", "turn"], dropna=False)
+        pair_ok = (pairs["speaker"].size() == 2) & (pairs["speaker"].nunique() == 2)
+        failed["speaker_pairs"][pair_ok.index.get_level_values("rec")[~pair_ok.to_numpy()]] = True
+        failed["speaker_pairs"][rec[~speaker.isin(SPEAKERS).to_numpy()]] = True
+
+        step = turn.groupby(rec).diff()
+        order_bad = turn.isna() | (first & (turn != 1)) | (~first & ~step.isin([0, 1]))
+        failed["turn_order"][rec[order_bad.to_numpy()]] = True
+
+        hangul = utterance.str.count(_HANGUL)
+        letters = hangul + utterance.str.count(_LATIN_LOWER)
+        not_korean = (letters > 0) & (hangul < KOREAN_MIN_RATIO * letters)
+        failed["korean"][rec[not_korean.to_numpy()]] = True
+
+        nurse = (speaker == "I").to_numpy()
+        questions = utterance[nurse]
+        items = sum(questions.str.contains(pattern).astype(int) for pattern in _MEDICAL_RE.values())
+        failed["one_item"][rec[nurse][(items >= 2).to_numpy()]] = True
+
+    results = []
+    for i in range(len(records)):
+        violations = [rule for rule in RULES if failed[rule][i]]
+        results.append({"ok": not violations, "violations": violations, "version": RULES_VERSION})
+    return results
+
+
+def validate_dialogue(dialogue):
+    """대화 하나 검사 (생성 직후 인라인 검사용)."""
+    return validate_records([{"dialogue": dialogue}])[0]
+
+
+def attach_validation(records):
+    """검사 결과가 없거나 이전 규칙 버전인 레코드에 record["validation"] 을 채웁니다 (저장 직전)."""
+    missing = [rec for rec in records if (rec.get("validation") or {}).get("version") != RULES_VERSION]
+    if missing:
+        for rec, result in zip(missing, validate_records(missing)):
+            rec["validation"] = result
+    return records
+
+
+def is_valid(record):
+    """검사하지 않은 레코드는 통과로 봅니다."""
+    return (record.get("validation") or {}).get("ok", True)
+
+
+def violation_labels(record):
+    return [RULES.get(rule, rule) for rule in (record.get("validation") or {}).get("violations", [])]
+
+
+def validate_store(store, revalidate=False, chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    저장소 전체를 검사하고 결과를 레코드에 저장합니다 (chunk_size 개씩 한 번에 계산/저장).
+    revalidate=False 면 현재 규칙 버전으로 검사한 레코드는 건너뜁니다.
+    """
+    stats = {"checked": 0, "failed": 0, "skipped": 0, "violations": Counter()}
+    for chunk in store.iter_chunks(chunk_size):
+        todo = [rec for rec in chunk
+                if revalidate or (rec.get("validation") or {}).get("version") != RULES_VERSION]
+        stats["skipped"] += len(chunk) - len(todo)
+        if todo:
+            results = validate_records(todo)
+            store.update_many({rec["id"]: {"validation": result} for rec, result in zip(todo, results)})
+            stats["checked"] += len(todo)
+            stats["failed"] += sum(1 for r in results if not r["ok"])
+            stats["violations"].update(rule for r in results for rule in r["violations"])
+        if on_progress is not None:
+            on_progress(stats)
+    stats["violations"] = dict(stats["violations"])
+    return stats